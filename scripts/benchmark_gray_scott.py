@@ -0,0 +1,112 @@
+import os
+import time
+import numba
+import numpy as np
+
+from src.gray_scott import init_state, solve_gray_scott, solve_gray_scott_adaptive, solve_gray_scott_processes
+
+def run_gray_scott(n_steps, total_time, time_step_size=1, x_length=None, noise_boundry=0, **solver_options):
+    """
+    Runs solve_gray_scott from init_state for total_time and returns the final V state and the run time in seconds.
+    Without x_length the grid spacing is 1.
+    """
+    x_length = n_steps if x_length is None else x_length
+    # One extra step, since solve_gray_scott saves the initial state as the first of its time steps
+    num_steps = round(total_time/time_step_size)
+    chemical_U, chemical_V = init_state(n_steps)
+    start = time.perf_counter()
+    solve_gray_scott(chemical_U, chemical_V, (num_steps + 1.5)*time_step_size, time_step_size, x_length, n_steps,
+                     0.16, 0.08, 0.035, 0.060, noise_boundry, **solver_options)
+    return chemical_V, time.perf_counter() - start
+
+def time_gray_scott(n_steps, num_steps, noise_boundry=0, repeats=3, time_step_size=1, x_length=None, **solver_options):
+    """
+    Returns the best time per time step of solve_gray_scott on an n_steps x n_steps grid, in seconds.
+    The first run compiles the kernels and is not timed.
+    """
+    run_gray_scott(n_steps, 2*time_step_size, time_step_size, x_length, noise_boundry, **solver_options)
+    times = [run_gray_scott(n_steps, num_steps*time_step_size, time_step_size, x_length, noise_boundry, **solver_options)[1]
+             for _ in range(repeats)]
+    return min(times)/num_steps
+
+def spectral_accuracy(n_steps=400, x_length=100, total_time=300):
+    """
+    Prints the largest error of V after total_time and the run time of the explicit and spectral methods,
+    compared to ETDRK2 with a very small time step. The explicit method is run close to its stability limit.
+    """
+    reference, _ = run_gray_scott(n_steps, total_time, 0.05, x_length, method="etdrk2")
+    stability_limit = (x_length/n_steps)**2/(4*0.16)
+    run_gray_scott(n_steps, 2*stability_limit, 0.9*stability_limit, x_length)
+
+    for method, time_step_size in (("euler", 0.9*stability_limit), ("imex", 0.25), ("etdrk2", 0.5), ("etdrk2", 1), ("etdrk2", 2)):
+        final_V, run_time = run_gray_scott(n_steps, total_time, time_step_size, x_length, method=method)
+        print(f"{n_steps} x {n_steps}, dx {x_length/n_steps}, {method} dt {time_step_size:.3f}: error {np.max(np.abs(final_V - reference)):.2e}, {run_time:.2f} s")
+
+def adaptive_accuracy(n_steps=100, x_length=200, total_time=5000):
+    """
+    Prints the largest error of V after total_time, the number of steps and the run time of explicit Euler
+    and of the adaptive Heun-Euler stepper, compared to the adaptive stepper with a very small tolerance.
+    """
+    chemical_U, chemical_V = init_state(n_steps)
+    solve_gray_scott_adaptive(chemical_U, chemical_V, total_time, x_length, n_steps, 0.16, 0.08, 0.035, 0.060,
+                              relative_tolerance=1e-7, absolute_tolerance=1e-9)
+    reference = chemical_V
+    run_gray_scott(n_steps, 2, 1, x_length)
+
+    for time_step_size in (1, 0.25, 0.05):
+        final_V, run_time = run_gray_scott(n_steps, total_time, time_step_size, x_length)
+        print(f"{n_steps} x {n_steps}, dx {x_length/n_steps}, euler dt {time_step_size}: error {np.max(np.abs(final_V - reference)):.2e}, "
+              f"{round(total_time/time_step_size)} steps, {run_time:.2f} s")
+
+    for relative_tolerance in (1e-3, 1e-4):
+        chemical_U, chemical_V = init_state(n_steps)
+        start = time.perf_counter()
+        _, _, run_info = solve_gray_scott_adaptive(chemical_U, chemical_V, total_time, x_length, n_steps, 0.16, 0.08, 0.035, 0.060,
+                                                   relative_tolerance=relative_tolerance)
+        run_time = time.perf_counter() - start
+        print(f"{n_steps} x {n_steps}, dx {x_length/n_steps}, adaptive tolerance {relative_tolerance}: error {np.max(np.abs(chemical_V - reference)):.2e}, "
+              f"{run_info['num_steps']} steps from dt {run_info['smallest_step']:.3f} to {run_info['largest_step']:.3f}, {run_time:.2f} s")
+
+def thread_scaling(n_steps=2048, num_steps=10, noise_boundry=0.01):
+    """
+    Prints the time per step and the speedup of the parallel solver over one thread, doubling the threads up to all numba threads.
+    """
+    num_threads = 1
+    single_thread_time = None
+    while num_threads <= numba.config.NUMBA_NUM_THREADS:
+        step_time = time_gray_scott(n_steps, num_steps, noise_boundry, parallel=True, num_threads=num_threads, seed=0)
+        single_thread_time = step_time if single_thread_time is None else single_thread_time
+        print(f"{n_steps} x {n_steps}, {num_threads} threads: {step_time*1e3:.3f} ms per step, speedup {single_thread_time/step_time:.2f}")
+        num_threads *= 2
+
+def process_scaling(n_steps=8192, num_steps=20, noise_boundry=0.01):
+    """
+    Prints the time per step and the speedup of the strip processes over one process, doubling the processes
+    up to one per CPU core. The times include starting the processes and the halo exchanges. Starting a process takes
+    about 0.15 s once the strip kernel is in numba's on-disk cache, the first call also starts the forkserver.
+    """
+    num_processes = 1
+    single_process_time = None
+    while num_processes <= os.cpu_count():
+        chemical_U, chemical_V = init_state(n_steps)
+        start = time.perf_counter()
+        solve_gray_scott_processes(chemical_U, chemical_V, num_steps + 1.5, 1, n_steps, n_steps, 0.16, 0.08, 0.035, 0.060, noise_boundry,
+                                   num_processes=num_processes, seed=0)
+        step_time = (time.perf_counter() - start)/num_steps
+        single_process_time = step_time if single_process_time is None else single_process_time
+        print(f"{n_steps} x {n_steps}, {num_processes} processes: {step_time*1e3:.1f} ms per step, speedup {single_process_time/step_time:.2f}")
+        num_processes *= 2
+
+def main():
+    for n_steps, num_steps in ((100, 2000), (1024, 20)):
+        for noise_boundry in (0, 0.01):
+            step_time = time_gray_scott(n_steps, num_steps, noise_boundry)
+            print(f"{n_steps} x {n_steps}, noise {noise_boundry}: {step_time*1e3:.3f} ms per step, {step_time/n_steps**2*1e9:.2f} ns per cell")
+
+    thread_scaling()
+    spectral_accuracy()
+    adaptive_accuracy()
+    process_scaling()
+
+if __name__ == "__main__":
+    main()
@@ -6,20 +6,22 @@ import sys
 
 from src.dla_fin_diff import *
 from src.utils import *
+from src.catalog import ResultsCatalog
 
-def many_runs_experiment(num_runs = 10, eta =2, omega = 1.85):
+def many_runs_experiment(num_runs = 10, eta =2, omega = 1.85, accumulator=None):
     """
     simulates a number of runs of the dla model, saving the final growth after reaching the top
     params:
         num_runs:   num_runs
         eta:        dla model parameter
         omega:      finite difference solver parameter
+        accumulator: optional EnsembleAccumulator, updated after every run
         
     returns:
-        final grids saved as a numpy array
+        final grids added to the results catalog
     """  
-    np.random.seed(43)
-    set_numba_seed(np.random.randint(1000000000))
+    # Every run has its own seed, so rerunning the experiment does not add the same runs to the catalog again
+    seeds = spawn_seeds(43, num_runs)
     grid_size = 100
     initial_cond = np.zeros([grid_size, grid_size])
     initial_cond[-2, grid_size//2] = 1
@@ -27,11 +29,16 @@ def many_runs_experiment(num_runs = 10, eta =2, omega = 1.85):
     final_grids = np.zeros([num_runs, grid_size, grid_size])
     
     for run in range(num_runs):
+        set_numba_seed(int(seeds[run]))
         g, c , num_iter, total_sor_iter= dla_growth(eta, omega, initial_cond, growth_steps=10000)
         print(total_sor_iter)
         final_grids[run] = g[num_iter]
+        if accumulator is not None:
+            accumulator.add_grids(final_grids[run][None])
+            accumulator.add_scalars(sor_iterations=total_sor_iter)
         
-    np.save(os.path.join('data', 'many_runs_eta_{}'.format(eta)), final_grids)
+    with ResultsCatalog() as catalog:
+        catalog.add_runs('dla', {'grid_size': grid_size, 'eta': eta, 'omega': omega}, {'final_grids': final_grids != 0}, seeds=seeds)
     
     
 
@@ -39,7 +46,7 @@ def plot_many_runs_experiment(file, skip_ends=1):
     """
     plot the histogram of cell occupancy for a timeseries of dla runs with one constant set of parameters
     params:
-        file:   location where the list of grids is stored
+        file:   location where the list of grids is stored, or the grids themselves
         skip_ends: ignore the first / last n rows of the grid
         
         
@@ -48,9 +55,9 @@ def plot_many_runs_experiment(file, skip_ends=1):
         mean / mean abs difference from centerline plot
         mean number of cells in each row plot
     """  
-    grids = np.load(file)
+    grids = open_ensemble(file)
     num_runs, _, grid_size = grids.shape
-    sum_grid = np.sum(grids, axis=0)
+    sum_grid = occupancy_sum(grids)
     ys = np.linspace(0,1,grid_size)
     xs = ys.copy()
     center = xs[grid_size//2]
@@ -102,7 +109,9 @@ def main():
     #analyze data of the many runs experiment
     etas = [0., 0.125, 0.5, 1., 2., 4.]
 
-    array_of_arrays = [np.load(os.path.join('data', 'many_runs_eta_{}.npy'.format(eta))) for eta in etas]   
+    with ResultsCatalog() as catalog:
+        catalog.import_legacy_files()
+        array_of_arrays = [catalog.load('dla', 'final_grids', eta=eta) for eta in etas]
 
     plot_cross_section_and_deviation_multiple(etas,
                                               array_of_arrays,
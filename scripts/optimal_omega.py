@@ -6,6 +6,9 @@ import concurrent.futures
 
 from src.dla_fin_diff import *
 from src.utils import *
+from src.parallel import SharedArrays, attach_shared_arrays, worker_context
+
+OMEGAS = [1.5, 1.55, 1.6, 1.65, 1.7, 1.75, 1.8, 1.85, 1.9, 1.95, 2]
 
 
 
@@ -43,35 +46,21 @@ def count_non_converged(eta, omega_0, num_runs=100, grid_size=100, adaptive_SOR
     print(omega_0, (num_runs-non_converged), non_converged, mean_sor_iter, std_sor_iter)
     return non_converged, mean_sor_iter, std_sor_iter
 
-def non_conv_experiment(eta, file=os.path.join('data', 'opt_omega')):
+def non_conv_counts(eta, non_conv, mean_iters, std_iters, num_runs=100):
     """
-    run a number of growth experiments with varyious parameters and count in how many of them the finite difference method diverged 
-    all results are saved to a file
+    count the failed runs and SOR iterations for every omega in OMEGAS, with and without adaptive SOR
     :
         eta:        growth parameter
-        omegas:     array of initial omega (for SOR) to test
+        non_conv:   output array for the number of failed runs [len(OMEGAS) x 2]
+        mean_iters: output array for the mean number of SOR iterations [len(OMEGAS) x 2]
+        std_iters:  output array for the standard deviation of SOR iterations [len(OMEGAS) x 2]
         num_runs:   number of runs for each parameter set
-        file:       location for storing data
-        
-        
-    returns:
-    stored in file:
-        omegas:         copy of input
-        non_converged:  number of failed runs
-        mean_sor_iter:  mean number of finite-difference time steps of successful runs
-        std_sor_iter:   standard deviation of number of finite-difference time steps of successful runs
-    """      
+    """
     np.random.seed(42)
     set_numba_seed(np.random.randint(1000000000))
-    
-    omegas = [1.5, 1.55, 1.6, 1.65, 1.7, 1.75, 1.8, 1.85, 1.9, 1.95, 2]
-    num_runs = 100
-    
-    non_conv = np.zeros([len(omegas), 2])
-    mean_iters = np.zeros([len(omegas), 2])
-    std_iters = np.zeros([len(omegas), 2])
-    for i in range(len(omegas)):
-        omega_0 = omegas[i]
+
+    for i in range(len(OMEGAS)):
+        omega_0 = OMEGAS[i]
         print('adaptive')
         non_converged, mean_sor_iter, std_sor_iter= count_non_converged(eta, omega_0, num_runs=num_runs, adaptive_SOR=True)
         non_conv[i, 0] = non_converged
@@ -82,8 +71,37 @@ def non_conv_experiment(eta, file=os.path.join('data', 'opt_omega')):
         non_conv[i, 1] = non_converged
         mean_iters[i, 1] = mean_sor_iter
         std_iters[i, 1] = mean_sor_iter
+
+def non_conv_experiment(eta, file=os.path.join('data', 'opt_omega')):
+    """
+    run a number of growth experiments with varyious parameters and count in how many of them the finite difference method diverged 
+    all results are saved to a file
+    :
+        eta:        growth parameter
+        file:       location for storing data
+        
+        
+    returns:
+    stored in file:
+        omegas:         the tested initial omegas (for SOR)
+        non_converged:  number of failed runs
+        mean_sor_iter:  mean number of finite-difference time steps of successful runs
+        std_sor_iter:   standard deviation of number of finite-difference time steps of successful runs
+    """      
+    non_conv = np.zeros([len(OMEGAS), 2])
+    mean_iters = np.zeros([len(OMEGAS), 2])
+    std_iters = np.zeros([len(OMEGAS), 2])
+    non_conv_counts(eta, non_conv, mean_iters, std_iters)
         
-    np.savez((file + str(eta)), omegas, non_conv, mean_iters, std_iters)
+    np.savez((file + str(eta)), OMEGAS, non_conv, mean_iters, std_iters)
+
+def shared_non_conv_counts(eta, eta_index, result_specs):
+    """
+    worker of parallel_non_conv, writes the counts for one eta in place into the shared result arrays
+    """
+    results = attach_shared_arrays(result_specs)
+    non_conv_counts(eta, results['non_conv'][eta_index], results['mean_iters'][eta_index], results['std_iters'][eta_index])
+    return eta_index
         
 def plot_non_conv(file=os.path.join('data', 'opt_omega.npz'), num_runs=20, plot_file=None):
     """
@@ -125,12 +143,21 @@ def plot_non_conv(file=os.path.join('data', 'opt_omega.npz'), num_runs=20, plot_
         plt.savefig(plot_file, dpi=600)
     plt.show()
         
-def parallel_non_conv(etas):
+def parallel_non_conv(etas, file=os.path.join('data', 'opt_omega')):
     """
     run the non_conv_experiment function in parallel for different values of eta
+    the workers write their counts into shared memory, the results are saved to one file per eta
     """
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        future_f = [executor.submit(non_conv_experiment, eta, os.path.join('data', 'opt_omega')) for eta in etas]
+    with SharedArrays() as results:
+        results.create('non_conv', [len(etas), len(OMEGAS), 2], np.float64)
+        results.create('mean_iters', [len(etas), len(OMEGAS), 2], np.float64)
+        results.create('std_iters', [len(etas), len(OMEGAS), 2], np.float64)
+
+        with concurrent.futures.ProcessPoolExecutor(mp_context=worker_context()) as executor:
+            futures = [executor.submit(shared_non_conv_counts, eta, i, results.specs) for i, eta in enumerate(etas)]
+            for future in concurrent.futures.as_completed(futures):
+                i = future.result()
+                np.savez((file + str(etas[i])), OMEGAS, results['non_conv'][i], results['mean_iters'][i], results['std_iters'][i])
 
 
 def main():
@@ -3,6 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 from src.utils import *
+from src.catalog import ResultsCatalog
 
 def compare_seed_growth_states(eta, p_s, DLA_array, monte_carlo_array):
     DLA_grid = DLA_array[2]
@@ -21,13 +22,13 @@ def compare_DLA_and_monte_carlo_cross_sections(eta, p_s, DLA_array, monte_carlo_
     fig, axs = plt.subplots(1, 2, sharey=True, figsize=(8,8))
 
     DLA_num_runs, _, DLA_grid_size = DLA_array.shape
-    DLA_sum_grid = np.sum(DLA_array, axis=0)
+    DLA_sum_grid = occupancy_sum(DLA_array)
     DLA_ys = np.linspace(1, 0, DLA_grid_size)
     DLA_mabs = mean_abs_diff(DLA_array)
     DLA_num_cells_per_cross = np.sum(DLA_sum_grid, axis=1) / DLA_num_runs
 
     MC_num_runs, _, MC_grid_size = monte_carlo_array.shape
-    MC_sum_grid = np.sum(monte_carlo_array, axis=0)
+    MC_sum_grid = occupancy_sum(monte_carlo_array)
     MC_ys = np.linspace(1, 0, MC_grid_size)
     MC_mabs = mean_abs_diff(monte_carlo_array)
     MC_num_cells_per_cross = np.sum(MC_sum_grid, axis=1) / MC_num_runs
@@ -52,20 +53,16 @@ def compare_DLA_and_monte_carlo_cross_sections(eta, p_s, DLA_array, monte_carlo_
     plt.show()
 
 def main():
-    etas = [0., 0.125, 0.5, 1., 2., 4.]
-    sticking_prob_array = [0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9,1.0]
-
-    array_of_DLA_arrays = [np.load(os.path.join('data', 'many_runs_eta_{}.npy'.format(eta))) for eta in etas]  
-    array_of_monte_carlo_arrays = [load_data("final_seed_growth_states_" + str(str(sticking_prob).replace(".", "_")) + "_sp.npy") for sticking_prob in sticking_prob_array]
-
     """
     eta = 1.0
     p_s = 0.2
     """
     eta = 1.0
     p_s = 0.2
-    DLA_array = np.load(os.path.join('data', 'many_runs_eta_{}.npy'.format(eta)))
-    monte_carlo_array = load_data("final_seed_growth_states_" + str(str(p_s).replace(".", "_")) + "_sp.npy")
+    with ResultsCatalog() as catalog:
+        catalog.import_legacy_files()
+        DLA_array = catalog.load("dla", "final_grids", eta=eta)
+        monte_carlo_array = catalog.load("monte_carlo", "final_seed_growth_states", sticking_prob=p_s)
 
     compare_DLA_and_monte_carlo_cross_sections(eta, p_s, DLA_array, monte_carlo_array)
 
@@ -1,6 +1,9 @@
 import os
+import numpy as np
 
-from src.gray_scott import init_grids, solve_gray_scott, plot_animation, last_frame_gray_scott_save
+from src.gray_scott import init_state, num_snapshots, solve_gray_scott, solve_gray_scott_batch, plot_animation, last_frame_gray_scott_save
+from src.gray_scott_patterns import PatternMetricsRecorder, phase_map, plot_phase_map
+from src.snapshot_store import SnapshotWriter, SnapshotReader
     
 def animation(): 
     x_length = 100
@@ -13,9 +16,14 @@ def animation():
     k = 0.060
     noise_boundry = 0
 
-    chemical_U, chemical_V = init_grids(total_time, time_step_size, n_steps)
-    solve_gray_scott(chemical_U, chemical_V, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry)
-    plot_animation(chemical_V) 
+    # Every 10th time step is enough for the animation, streamed to 8-bit snapshot files instead of kept in memory
+    shape = (num_snapshots(total_time, time_step_size, 10), n_steps, n_steps)
+    file_U, file_V = [os.path.join("results", "gray_scott", f"animation_{chemical}.gsnap") for chemical in ("U", "V")]
+    chemical_U, chemical_V = init_state(n_steps)
+    with SnapshotWriter(file_U, shape, "uint8") as snapshots_U, SnapshotWriter(file_V, shape, "uint8") as snapshots_V:
+        solve_gray_scott(chemical_U, chemical_V, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry,
+                         snapshot_interval=10, snapshots_U=snapshots_U, snapshots_V=snapshots_V)
+    plot_animation(SnapshotReader(file_V))
 
 def script_gray_scott(total_time, noise_boundry, U_supply, k):
     x_length = 100
@@ -28,10 +36,44 @@ def script_gray_scott(total_time, noise_boundry, U_supply, k):
     k = k
     noise_boundry = noise_boundry
 
-    chemical_U, chemical_V = init_grids(total_time, time_step_size, n_steps)
+    # Only the final state is saved
+    chemical_U, chemical_V = init_state(n_steps)
     solve_gray_scott(chemical_U, chemical_V, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry)
     last_frame_gray_scott_save(chemical_V, os.path.join("results", "gray_scott", f"{total_time}, {noise_boundry}, f_{U_supply}, k_{k}.png"))
 
+def script_gray_scott_batch(total_time, parameters):
+    x_length = 100
+    n_steps = 100
+    time_step_size = 1
+    diffusion_coefficient_u =  0.16
+    diffusion_coefficient_v =  0.08
+    noise_boundry, U_supply, k = np.array(parameters).T
+
+    # All (noise, f, k) points run at once, only their final states are kept
+    _, states_V, _, _, _ = solve_gray_scott_batch(U_supply, k, noise_boundry, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v)
+    for (member_noise, member_U_supply, member_k), chemical_V in zip(parameters, states_V):
+        last_frame_gray_scott_save(chemical_V, os.path.join("results", "gray_scott", f"{total_time}, {member_noise}, f_{member_U_supply}, k_{member_k}.png"))
+
+def phase_diagram():
+    U_supply_values = np.linspace(0.01, 0.07, 25)
+    k_values = np.linspace(0.045, 0.07, 26)
+
+    classes, _ = phase_map(U_supply_values, k_values, 5000, 1, 100, 100, 0.16, 0.08)
+    plot_phase_map(U_supply_values, k_values, classes, os.path.join("results", "gray_scott", "phase_map.png"))
+
+def pattern_metrics_sweep(metrics_interval=100):
+    U_supply_grid, k_grid = np.meshgrid(np.linspace(0.01, 0.07, 13), np.linspace(0.045, 0.07, 11), indexing="ij")
+    U_supply, k = U_supply_grid.ravel(), k_grid.ravel()
+
+    # Only the metrics time series of every point are kept, one table row per point and record
+    recorders = [PatternMetricsRecorder(metrics_interval) for _ in U_supply]
+    solve_gray_scott_batch(U_supply, k, 0, 5000, 1, 100, 100, 0.16, 0.08, monitor_interval=metrics_interval, metrics_recorders=recorders)
+    np.savez_compressed(os.path.join("results", "gray_scott", "pattern_metrics.npz"),
+                        U_supply=U_supply,
+                        k=k,
+                        point=np.repeat(np.arange(len(recorders)), [len(recorder) for recorder in recorders]),
+                        metrics=np.concatenate([recorder.series for recorder in recorders]))
+
 def main():
     animation()
 
@@ -39,12 +81,11 @@ def main():
         script_gray_scott(time, 0, 0.035, 0.060)
 
     parameters = [(0.03,0.055), (0.018, 0.051), (0.035, 0.060),(0.026, 0.051)]
-    for U_supply, k in parameters: 
-        script_gray_scott(5000, 0, U_supply, k)
+    noise = [0.001, 0.01, 0.02, 0.1]
+    script_gray_scott_batch(5000, [(0, U_supply, k) for U_supply, k in parameters] + [(noise_boundry, 0.035, 0.060) for noise_boundry in noise])
 
-    noise = [0.001, 0.01, 0.02, 0.1]     
-    for noise_boundry in (noise):
-        script_gray_scott(5000, noise_boundry, 0.035, 0.060)
+    phase_diagram()
+    pattern_metrics_sweep()
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,8 @@
 import os
 import numpy as np
 
+from src.catalog import ResultsCatalog, MONTE_CARLO_QUANTITIES
 from src.utils import (
-    load_data, 
     generate_heatmap, 
     plot_histogram, 
     flat_histogram, 
@@ -24,14 +24,14 @@ def generate_save_names(sticking_prob_str):
         f"all_avg_successful_walk_lengths_{sticking_prob_str}_sp.npy"
     ]
 
-def load_data_files(save_names):
-    return [np.load(os.path.join("data", name)) for name in save_names]
+def load_catalog_quantities(catalog, sticking_prob, quantities=MONTE_CARLO_QUANTITIES):
+    return [catalog.load("monte_carlo", quantity, sticking_prob=sticking_prob) for quantity in quantities]
 
-def plot_monte_carlo_sp_single(sticking_prob):
+def plot_monte_carlo_sp_single(sticking_prob, catalog):
     sticking_prob_str = str(sticking_prob).replace(".", "_")
     save_names = generate_save_names(sticking_prob_str)
 
-    final_seed_growth_states, all_walk_counts, all_successful_walks, all_avg_walk_lengths, all_avg_successful_walk_lengths = load_data_files(save_names)
+    final_seed_growth_states, all_walk_counts, all_successful_walks, all_avg_walk_lengths, all_avg_successful_walk_lengths = load_catalog_quantities(catalog, sticking_prob)
 
     print("Average number of successful walks: ", np.mean(all_successful_walks))
     print("Average number of walks: ", np.mean(all_walk_counts))
@@ -83,13 +83,14 @@ def plot_monte_carlo_sp_single(sticking_prob):
                    save_plot=True, 
                    file_path=os.path.join("results", "monte_carlo", "histogram_" + save_names[4].replace(".npy", ".png")))
 
-def plot_mont_carlo_sp_range(sticking_prob_array):
-    data_array = [load_data("final_seed_growth_states_" + str(str(sticking_prob).replace(".", "_")) + "_sp.npy") for sticking_prob in sticking_prob_array]
+def plot_mont_carlo_sp_range(sticking_prob_array, catalog):
+    data_array = [catalog.load("monte_carlo", "final_seed_growth_states", sticking_prob=sticking_prob) for sticking_prob in sticking_prob_array]
 
-    average_successful_walks = [np.mean(load_data("all_successful_walks_" + str(str(sticking_prob).replace(".", "_")) + "_sp.npy")) for sticking_prob in sticking_prob_array]
-    average_walk_counts = [np.mean(load_data("all_walk_counts_" + str(str(sticking_prob).replace(".", "_")) + "_sp.npy")) for sticking_prob in sticking_prob_array]
-    average_avg_walk_lengths = [np.mean(load_data("all_avg_walk_lengths_" + str(str(sticking_prob).replace(".", "_")) + "_sp.npy")) for sticking_prob in sticking_prob_array]
-    average_avg_successful_walk_lengths = [np.mean(load_data("all_avg_successful_walk_lengths_" + str(str(sticking_prob).replace(".", "_")) + "_sp.npy")) for sticking_prob in sticking_prob_array]
+    (average_walk_counts, 
+     average_successful_walks, 
+     average_avg_walk_lengths, 
+     average_avg_successful_walk_lengths) = np.array([[np.mean(values) for values in load_catalog_quantities(catalog, sticking_prob, MONTE_CARLO_QUANTITIES[1:])] 
+                                                      for sticking_prob in sticking_prob_array]).T
     
     plot_line(sticking_prob_array,
               average_successful_walks,
@@ -149,14 +150,18 @@ def main():
     """
     sticking_prob = 1.0
 
-    plot_monte_carlo_sp_single(sticking_prob)
+    with ResultsCatalog() as catalog:
+        # Results saved as separate files by earlier versions are added to the catalog once
+        catalog.import_legacy_files()
 
-    """
-    Plot nultiple sticking probability results
-    """
-    sticking_prob_array = [0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9,1.0]
+        plot_monte_carlo_sp_single(sticking_prob, catalog)
+
+        """
+        Plot nultiple sticking probability results
+        """
+        sticking_prob_array = [0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9,1.0]
 
-    plot_mont_carlo_sp_range(sticking_prob_array)
+        plot_mont_carlo_sp_range(sticking_prob_array, catalog)
 
 if __name__ == "__main__":
     main()
@@ -1,57 +1,67 @@
-import os
 import numpy as np
 
-from src.monte_carlo import run_multiple_simulations
-from src.utils import save_data
-
-def generate_save_names(sticking_prob_str):
-    return [
-        f"final_seed_growth_states_{sticking_prob_str}_sp.npy",
-        f"all_walk_counts_{sticking_prob_str}_sp.npy",
-        f"all_successful_walks_{sticking_prob_str}_sp.npy",
-        f"all_avg_walk_lengths_{sticking_prob_str}_sp.npy",
-        f"all_avg_successful_walk_lengths_{sticking_prob_str}_sp.npy"
-    ]
-
-def load_data_files(save_names):
-    return [np.load(os.path.join("data", name)) for name in save_names]
-
-def scrpt_monte_carlo_multiple_simulations(grid_size, sticking_prob, num_simulations, save_names):
-    final_seed_growth_states_save_file, \
-    all_walk_counts_save_file, \
-    all_successful_walks_save_file, \
-    all_avg_walk_lengths_save_file, \
-    all_avg_successful_walk_lengths_save_file = save_names
-
-    (final_seed_growth_states, 
-     all_walk_counts, 
-     all_successful_walks, 
-     all_avg_walk_lengths, 
-     all_avg_successful_walk_lengths,
-     all_growth_over_time) = run_multiple_simulations(grid_size, sticking_prob, num_simulations)
-    
-    save_data(final_seed_growth_states, final_seed_growth_states_save_file)
-    save_data(all_walk_counts, all_walk_counts_save_file)
-    save_data(all_successful_walks, all_successful_walks_save_file)
-    save_data(all_avg_walk_lengths, all_avg_walk_lengths_save_file)
-    save_data(all_avg_successful_walk_lengths, all_avg_successful_walk_lengths_save_file)
-
-    print("All data saved successfully")
-
-def run_multiple_sticking_probs(grid_size, sticking_prob_array, num_simulations):
-    for sticking_prob in sticking_prob_array:
-        sticking_prob_str = str(sticking_prob).replace(".", "_")
-        save_names = generate_save_names(sticking_prob_str)
-        scrpt_monte_carlo_multiple_simulations(grid_size, sticking_prob, num_simulations, save_names)
+from functools import partial
+from src.monte_carlo import run_multiple_simulations, monte_carlo_sim_final_state_only, warm_up_worker
+from src.parallel import run_parameter_sweep
+from src.catalog import ResultsCatalog, MONTE_CARLO_QUANTITIES
+from src.utils import spawn_seeds
+
+def save_to_catalog(grid_size, sticking_prob, results, seeds=None):
+    results = dict(zip(MONTE_CARLO_QUANTITIES, results))
+    # Boolean grids are stored with one bit per cell
+    results["final_seed_growth_states"] = np.asarray(results["final_seed_growth_states"]) != 0
+
+    with ResultsCatalog() as catalog:
+        run_ids = catalog.add_runs("monte_carlo",
+                                   {"grid_size": grid_size, "sticking_prob": sticking_prob},
+                                   results,
+                                   seeds=seeds)
+
+    print(f"Saved {sum(run_id is not None for run_id in run_ids)} new runs for sticking probability {sticking_prob}")
+
+def scrpt_monte_carlo_multiple_simulations(grid_size, sticking_prob, num_simulations, seed=None):
+    # Every run is recorded with its task seed, like in run_multiple_sticking_probs. Without a root seed
+    # one is drawn here, so the task seeds of run_multiple_simulations are known
+    if seed is None:
+        seed = int(spawn_seeds(None, 1)[0])
+    results = run_multiple_simulations(grid_size, sticking_prob, num_simulations, seed=seed)
+
+    save_to_catalog(grid_size, sticking_prob, results[:len(MONTE_CARLO_QUANTITIES)], spawn_seeds(seed, num_simulations))
+
+def sweep_result_arrays(grid_size):
+    return {"seed": ((), np.uint32),
+            "final_seed_growth_states": ((grid_size, grid_size), np.int8),
+            "all_walk_counts": ((), np.int32),
+            "all_successful_walks": ((), np.int32),
+            "all_avg_walk_lengths": ((), np.float32),
+            "all_avg_successful_walk_lengths": ((), np.float32)}
+
+def simulate_sticking_prob(sticking_prob, seed, grid_size):
+    results = monte_carlo_sim_final_state_only(grid_size, sticking_prob, seed=seed)
+    return dict(zip(MONTE_CARLO_QUANTITIES, results), seed=seed)
+
+def save_sticking_prob_results(grid_size, sticking_prob, results):
+    save_to_catalog(grid_size, sticking_prob, [results[name] for name in MONTE_CARLO_QUANTITIES], results["seed"])
+
+def run_multiple_sticking_probs(grid_size, sticking_prob_array, num_simulations, seed=None):
+    # All sticking probabilities and replicates share one work queue,
+    # the slow low sticking probabilities are started first. The workers write
+    # their grids into shared memory instead of sending them back
+    run_parameter_sweep(partial(simulate_sticking_prob, grid_size=grid_size),
+                        list(sticking_prob_array),
+                        num_simulations,
+                        expected_cost=lambda sticking_prob: 1 / sticking_prob,
+                        seed=seed,
+                        initializer=warm_up_worker,
+                        on_parameter_done=partial(save_sticking_prob_results, grid_size),
+                        result_arrays=sweep_result_arrays(grid_size))
 
 def main():
     grid_size = 101
     sticking_prob = 1.0
     num_simulations = 20
-    sticking_prob_str = str(sticking_prob).replace(".", "_")
-    save_names = generate_save_names(sticking_prob_str)
 
-    scrpt_monte_carlo_multiple_simulations(grid_size, sticking_prob, num_simulations, save_names)
+    scrpt_monte_carlo_multiple_simulations(grid_size, sticking_prob, num_simulations)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,253 @@
+import os
+import json
+import lzma
+import zlib
+import numpy as np
+
+MAGIC = b"BGRID\x01"
+HEADER_SIZE = 4096
+
+COMPRESSORS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+# Number of set bits of every byte value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+def pack_grids(grids):
+    """
+    Packs binary grids into 8 cells per byte along the rows.
+
+    Parameters
+    ----------
+    grids : np.ndarray
+        The grids [num_runs x rows x columns], non-zero cells are occupied.
+
+    Returns
+    -------
+    packed : np.ndarray
+        The packed grids [num_runs x rows x ceil(columns / 8)] with dtype uint8.
+    """
+    return np.packbits(np.asarray(grids) != 0, axis=-1)
+
+def _write_header(file, header, header_size):
+    encoded = json.dumps(header).encode("ascii")
+    if len(MAGIC) + 8 + len(encoded) > header_size:
+        raise ValueError("The header does not fit in {} bytes".format(header_size))
+    file.seek(0)
+    file.write(MAGIC + np.uint64(header_size).tobytes() + encoded.ljust(header_size - len(MAGIC) - 8))
+
+def _read_header(file):
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("{} is not a binary grid file".format(file.name))
+    header_size = int(np.frombuffer(file.read(8), dtype=np.uint64)[0])
+    header = json.loads(file.read(header_size - len(MAGIC) - 8).decode("ascii"))
+    return header, header_size
+
+def write_binary_grids(file, grids, compression=None, chunk_runs=256):
+    """
+    Writes an ensemble of binary grids to a binary grid file with one bit per cell.
+    Uncompressed files can be memory-mapped and appended to. Compressed files store
+    chunks of chunk_runs grids that are decompressed one at a time when read.
+
+    Parameters
+    ----------
+    file : str
+        The path of the file.
+    grids : np.ndarray
+        The grids [num_runs x rows x columns], non-zero cells are occupied.
+    compression : str
+        None, "zlib" or "lzma".
+    chunk_runs : int
+        The number of grids per compressed chunk.
+    """
+    packed = pack_grids(grids)
+    header = {"shape": list(np.shape(grids)), "compression": compression, "chunk_runs": chunk_runs, "chunks": []}
+
+    if compression is None:
+        data = [packed.tobytes()]
+    else:
+        compress, _ = COMPRESSORS[compression]
+        data = [compress(packed[start:start + chunk_runs].tobytes()) for start in range(0, len(packed), chunk_runs)]
+        header["chunks"] = [len(chunk) for chunk in data]
+
+    # Compressed files need room for the chunk lengths
+    header_size = max(HEADER_SIZE, -(-(len(json.dumps(header)) + 64) // HEADER_SIZE) * HEADER_SIZE)
+    with open(file, "wb") as open_file:
+        _write_header(open_file, header, header_size)
+        for chunk in data:
+            open_file.write(chunk)
+
+def append_binary_grids(file, grids):
+    """
+    Appends grids to an uncompressed binary grid file, or creates the file.
+    Only the new grids are written, and the run count in the header is updated in place.
+
+    Parameters
+    ----------
+    file : str
+        The path of the file.
+    grids : np.ndarray
+        The grids [num_runs x rows x columns], with the same grid shape as the stored grids.
+
+    Returns
+    -------
+    first_run : int
+        The index of the first appended grid in the file.
+    """
+    if not os.path.exists(file):
+        write_binary_grids(file, grids)
+        return 0
+
+    with open(file, "r+b") as open_file:
+        header, header_size = _read_header(open_file)
+        if header["compression"] is not None:
+            raise ValueError("Cannot append to the compressed file {}".format(file))
+        if list(np.shape(grids)[1:]) != header["shape"][1:]:
+            raise ValueError("Cannot append grids of shape {} to grids of shape {}".format(np.shape(grids)[1:], header["shape"][1:]))
+
+        first_run = header["shape"][0]
+        packed = pack_grids(grids)
+        # Write the grids before the header, so an interrupted append leaves the old grids intact
+        grid_bytes = header["shape"][1] * ((header["shape"][2] + 7) // 8)
+        open_file.seek(header_size + first_run * grid_bytes)
+        open_file.write(packed.tobytes())
+        header["shape"][0] += len(packed)
+        _write_header(open_file, header, header_size)
+
+    return first_run
+
+class BinaryGridReader:
+    """
+    Reads an ensemble of grids from a binary grid file, optionally only a subset of the runs.
+    Uncompressed files are memory-mapped. Row sums are counted on the packed bytes with a popcount
+    table, and occupancy sums unpack one chunk of runs at a time, so whole ensembles are never unpacked.
+    Works in place of a [num_runs x rows x columns] array with the plotting functions in utils,
+    which use its shape and np.sum(grids, axis=0).
+
+    Parameters
+    ----------
+    file : str
+        The path of the file.
+    runs : np.ndarray
+        Optional indices of the runs to read, in the order they are returned.
+    chunk_runs : int
+        The number of runs unpacked at once.
+    """
+    dtype = np.dtype(np.int8)
+
+    def __init__(self, file, runs=None, chunk_runs=256):
+        self.file = file
+        with open(file, "rb") as open_file:
+            self.header, self.header_size = _read_header(open_file)
+
+        num_runs, self.rows, self.columns = self.header["shape"]
+        self.row_bytes = (self.columns + 7) // 8
+        self.runs = np.arange(num_runs) if runs is None else np.asarray(runs, dtype=np.int64)
+        self.chunk_runs = chunk_runs
+
+        self.packed = None
+        if self.header["compression"] is None and num_runs > 0:
+            self.packed = np.memmap(file, dtype=np.uint8, mode="r", offset=self.header_size,
+                                    shape=(num_runs, self.rows, self.row_bytes))
+        else:
+            self.chunk_offsets = self.header_size + np.concatenate(([0], np.cumsum(self.header["chunks"])))
+
+    @property
+    def shape(self):
+        return (len(self.runs), self.rows, self.columns)
+
+    def __len__(self):
+        return len(self.runs)
+
+    def _read_chunk(self, chunk_index):
+        _, decompress = COMPRESSORS[self.header["compression"]]
+        with open(self.file, "rb") as open_file:
+            open_file.seek(self.chunk_offsets[chunk_index])
+            data = decompress(open_file.read(self.header["chunks"][chunk_index]))
+        return np.frombuffer(data, dtype=np.uint8).reshape(-1, self.rows, self.row_bytes)
+
+    def packed_chunks(self):
+        """
+        Yields the positions of the selected runs and their packed grids, chunk by chunk.
+        """
+        if self.packed is not None:
+            for start in range(0, len(self.runs), self.chunk_runs):
+                positions = np.arange(start, min(start + self.chunk_runs, len(self.runs)))
+                yield positions, self.packed[self.runs[positions]]
+            return
+
+        file_chunks = self.runs // self.header["chunk_runs"]
+        for chunk_index in np.unique(file_chunks):
+            positions = np.flatnonzero(file_chunks == chunk_index)
+            chunk = self._read_chunk(chunk_index)
+            yield positions, chunk[self.runs[positions] - chunk_index * self.header["chunk_runs"]]
+
+    def unpack(self, packed):
+        return np.unpackbits(packed, axis=-1, count=self.columns).astype(np.int8)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.subset([index]).to_array()[0]
+        return self.subset(np.arange(len(self.runs))[index]).to_array()
+
+    def subset(self, positions):
+        """
+        Returns a reader of the selected runs at the given positions.
+        """
+        return BinaryGridReader(self.file, self.runs[np.asarray(positions, dtype=np.int64)], self.chunk_runs)
+
+    def to_array(self):
+        """
+        Unpacks all selected runs into an int8 array [num_runs x rows x columns].
+        """
+        grids = np.zeros(self.shape, dtype=np.int8)
+        for positions, packed in self.packed_chunks():
+            grids[positions] = self.unpack(packed)
+        return grids
+
+    def __array__(self, dtype=None, copy=None):
+        grids = self.to_array()
+        return grids if dtype is None else grids.astype(dtype)
+
+    def row_sums(self, weights=None):
+        """
+        Sums every row of every selected run.
+
+        Parameters
+        ----------
+        weights : np.ndarray
+            Optional weight of every column. Without weights the occupied cells are counted
+            on the packed bytes.
+
+        Returns
+        -------
+        row_sums : np.ndarray
+            The row sums [num_runs x rows].
+        """
+        row_sums = np.zeros((len(self.runs), self.rows), dtype=np.int64 if weights is None else np.float64)
+        for positions, packed in self.packed_chunks():
+            if weights is None:
+                row_sums[positions] = np.sum(POPCOUNT[packed], axis=-1, dtype=np.int64)
+            else:
+                row_sums[positions] = self.unpack(packed) @ weights
+        return row_sums
+
+    def sum(self, axis=None, dtype=None, out=None, **kwargs):
+        """
+        Sums the grids. Over the runs (axis=0) the grids are unpacked one chunk at a time,
+        other axes unpack all selected runs.
+        """
+        if axis == 0 and out is None and not kwargs:
+            total = np.zeros((self.rows, self.columns), dtype=np.int64)
+            for _, packed in self.packed_chunks():
+                total += np.sum(self.unpack(packed), axis=0, dtype=np.int64)
+            return total if dtype is None else total.astype(dtype)
+        return np.sum(self.to_array(), axis=axis, dtype=dtype, out=out, **kwargs)
+
+    def occupancy_mean(self):
+        """
+        Returns the fraction of runs in which each cell is occupied [rows x columns].
+        """
+        return self.sum(axis=0) / max(len(self.runs), 1)
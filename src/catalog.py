@@ -0,0 +1,316 @@
+import os
+import re
+import json
+import sqlite3
+import subprocess
+import numpy as np
+
+from src.utils import append_npy
+from src.binary_grids import BinaryGridReader, append_binary_grids
+
+CATALOG_DIRECTORY = os.path.join("data", "catalog")
+
+MONTE_CARLO_QUANTITIES = ["final_seed_growth_states",
+                          "all_walk_counts",
+                          "all_successful_walks",
+                          "all_avg_walk_lengths",
+                          "all_avg_successful_walk_lengths"]
+
+def get_code_version():
+    """
+    Returns the git commit of the code, with a -dirty suffix for uncommitted changes, or "unknown" outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"],
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True,
+                              text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+class ResultsCatalog:
+    """
+    Index of experiment results, keyed by model, parameters, seed and code version.
+    The runs are indexed in a SQLite database, and the results of all runs are appended as rows
+    to one consolidated .npy file per model, quantity, dtype and shape. Boolean grids are stored
+    with one bit per cell in a binary grid file instead.
+    Queries only read the index, and loading a quantity only reads the rows of the selected runs
+    from the memory-mapped files. A seeded run that is already in the catalog is not added again.
+    Several processes can add runs to the same catalog at once.
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the index and the array files.
+    code_version : str
+        The code version recorded with new runs. If None, the current git commit.
+    """
+    def __init__(self, directory=CATALOG_DIRECTORY, code_version=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.code_version = code_version if code_version is not None else get_code_version()
+        # Array files are appended while the index is locked for writing, so other processes wait for their turn
+        self.connection = sqlite3.connect(os.path.join(directory, "catalog.sqlite"), timeout=600)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY,
+                model TEXT NOT NULL,
+                parameters TEXT NOT NULL,
+                seed INTEGER,
+                code_version TEXT NOT NULL,
+                source TEXT
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS runs_key ON runs (model, parameters, seed, code_version) WHERE seed IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS runs_model ON runs (model, parameters);
+            CREATE TABLE IF NOT EXISTS arrays (
+                run_id INTEGER NOT NULL REFERENCES runs (run_id),
+                quantity TEXT NOT NULL,
+                file TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (run_id, quantity)
+            );
+            CREATE TABLE IF NOT EXISTS imported_files (
+                file TEXT PRIMARY KEY
+            );
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def _array_file(self, model, quantity, array):
+        shape = "x".join(str(size) for size in array.shape[1:]) or "scalar"
+        # Boolean grids are stored with one bit per cell
+        if array.dtype == bool:
+            return "{}_{}_bits_{}.bgrid".format(model, quantity, shape)
+        return "{}_{}_{}_{}.npy".format(model, quantity, array.dtype.name, shape)
+
+    def _open_array(self, file):
+        if file.endswith(".bgrid"):
+            return BinaryGridReader(os.path.join(self.directory, file))
+        return np.load(os.path.join(self.directory, file), mmap_mode="r")
+
+    def _append_rows(self, file, array):
+        """
+        Appends rows to a consolidated array file and returns the index of the first new row.
+        """
+        file_location = os.path.join(self.directory, file)
+        if file.endswith(".bgrid"):
+            return append_binary_grids(file_location, array)
+        if not os.path.exists(file_location):
+            np.save(file_location, array)
+            return 0
+
+        num_rows = np.load(file_location, mmap_mode="r").shape[0]
+        if not append_npy(file_location, array):
+            raise ValueError("Cannot append to {}".format(file_location))
+        return num_rows
+
+    def add_runs(self, model, parameters, results, seeds=None, code_version=None, source=None):
+        """
+        Adds a batch of runs with the same parameters.
+
+        Parameters
+        ----------
+        model : str
+            The name of the model, e.g. "monte_carlo" or "dla".
+        parameters : dict
+            The parameters of the runs, stored as JSON.
+        results : dict
+            The results by quantity name, each with one row per run.
+        seeds : list
+            Optional seed of each run. Seeded runs already in the catalog are skipped.
+        code_version : str
+            The code version of the runs. If None, the version of the catalog.
+        source : str
+            Optional description of where the runs came from, e.g. an imported file.
+
+        Returns
+        -------
+        run_ids : list
+            The id of each run, None for skipped duplicates.
+        """
+        results = {quantity: np.asarray(array) for quantity, array in results.items()}
+        num_runs = {len(array) for array in results.values()}
+        if len(num_runs) != 1:
+            raise ValueError("All quantities need the same number of runs, got {}".format(sorted(num_runs)))
+        num_runs = num_runs.pop()
+
+        # numpy scalars are stored as plain numbers
+        parameters = json.dumps(parameters, sort_keys=True, default=lambda value: value.item())
+        code_version = code_version if code_version is not None else self.code_version
+        seeds = [None] * num_runs if seeds is None else [None if seed is None else int(seed) for seed in seeds]
+
+        with self.connection:
+            run_ids = []
+            for seed in seeds:
+                cursor = self.connection.execute(
+                    "INSERT OR IGNORE INTO runs (model, parameters, seed, code_version, source) VALUES (?, ?, ?, ?, ?)",
+                    (model, parameters, seed, code_version, source))
+                run_ids.append(cursor.lastrowid if cursor.rowcount else None)
+
+            new_runs = [run for run, run_id in enumerate(run_ids) if run_id is not None]
+            if new_runs:
+                for quantity, array in results.items():
+                    file = self._array_file(model, quantity, array)
+                    first_row = self._append_rows(file, array[new_runs])
+                    self.connection.executemany(
+                        "INSERT INTO arrays (run_id, quantity, file, row) VALUES (?, ?, ?, ?)",
+                        [(run_ids[run], quantity, file, first_row + i) for i, run in enumerate(new_runs)])
+
+        return run_ids
+
+    def _where(self, model, code_version, parameters):
+        clauses = ["model = ?"]
+        values = [model]
+        if code_version is not None:
+            clauses.append("code_version = ?")
+            values.append(code_version)
+        for name, value in parameters.items():
+            clauses.append("json_extract(parameters, ?) = ?")
+            values.extend(["$." + name, value.item() if isinstance(value, np.generic) else value])
+        return " AND ".join(clauses), values
+
+    def query(self, model, code_version=None, **parameters):
+        """
+        Finds the runs of a model with the given parameter values.
+
+        Parameters
+        ----------
+        model : str
+            The name of the model.
+        code_version : str
+            Optional code version of the runs.
+        **parameters
+            Parameter values the runs must have, e.g. sticking_prob=0.3.
+
+        Returns
+        -------
+        runs : list
+            A dict with the run_id, parameters, seed, code_version and source of each matching run.
+        """
+        where, values = self._where(model, code_version, parameters)
+        rows = self.connection.execute(
+            "SELECT run_id, parameters, seed, code_version, source FROM runs WHERE {} ORDER BY run_id".format(where), values)
+        return [{"run_id": run_id, "parameters": json.loads(run_parameters), "seed": seed, "code_version": run_code_version, "source": source}
+                for run_id, run_parameters, seed, run_code_version, source in rows]
+
+    def parameter_values(self, model, name):
+        """
+        Returns the sorted distinct values of a parameter over all runs of a model.
+        """
+        rows = self.connection.execute(
+            "SELECT DISTINCT json_extract(parameters, ?) FROM runs WHERE model = ?", ("$." + name, model))
+        return sorted(value for value, in rows if value is not None)
+
+    def load(self, model, quantity, code_version=None, **parameters):
+        """
+        Loads a quantity for all runs of a model with the given parameter values.
+        Only the rows of the matching runs are read from the memory-mapped array files.
+
+        Parameters
+        ----------
+        model : str
+            The name of the model.
+        quantity : str
+            The name of the quantity.
+        code_version : str
+            Optional code version of the runs.
+        **parameters
+            Parameter values the runs must have, e.g. sticking_prob=0.3.
+
+        Returns
+        -------
+        array : np.ndarray
+            The quantity of the matching runs in the order they were added, one row per run.
+            Boolean grids stored in a single file are returned as a BinaryGridReader.
+        """
+        where, values = self._where(model, code_version, parameters)
+        rows = self.connection.execute(
+            """SELECT arrays.file, arrays.row FROM runs JOIN arrays ON runs.run_id = arrays.run_id
+               WHERE {} AND arrays.quantity = ? ORDER BY runs.run_id""".format(where), values + [quantity]).fetchall()
+        if not rows:
+            raise KeyError("No {} results for {} with {}".format(model, quantity, parameters))
+
+        files = {file for file, _ in rows}
+        if len(files) == 1 and rows[0][0].endswith(".bgrid"):
+            # Binary grids are returned packed, they are only unpacked chunk by chunk when used
+            return BinaryGridReader(os.path.join(self.directory, rows[0][0]), runs=[row for _, row in rows])
+
+        arrays = {file: self._open_array(file) for file in files}
+        shapes = {array.shape[1:] for array in arrays.values()}
+        if len(shapes) > 1:
+            raise ValueError("The selected runs have different shapes, stored in {}".format(sorted(arrays)))
+
+        # Runs stored with different dtypes are combined in their common dtype
+        result = np.empty((len(rows),) + shapes.pop(), dtype=np.result_type(*[array.dtype for array in arrays.values()]))
+        for file, array in arrays.items():
+            positions = [i for i, (row_file, _) in enumerate(rows) if row_file == file]
+            result[positions] = array[[rows[i][1] for i in positions]]
+        return result
+
+    def import_legacy_files(self, directory="data"):
+        """
+        Adds the results saved with parameter-encoded file names to the catalog, each file only once.
+        Monte Carlo files like all_walk_counts_0_3_sp.npy are grouped by sticking probability,
+        and DLA files like many_runs_eta_0.5.npy become runs of the "dla" model with quantity "final_grids".
+        Binary grids are converted to boolean grids, so they are stored with one bit per cell.
+        Imported runs have the code version "legacy".
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the legacy files.
+
+        Returns
+        -------
+        num_runs : int
+            The number of runs added.
+        """
+        if not os.path.isdir(directory):
+            return 0
+
+        imported = {file for file, in self.connection.execute("SELECT file FROM imported_files")}
+        monte_carlo_pattern = re.compile(r"^({})_(\d+)_(\d+)_sp\.npy$".format("|".join(MONTE_CARLO_QUANTITIES)))
+        dla_pattern = re.compile(r"^many_runs_eta_(.+)\.npy$")
+
+        batches = {}
+        for file in sorted(os.listdir(directory)):
+            if file in imported:
+                continue
+            match = monte_carlo_pattern.match(file)
+            if match:
+                sticking_prob = float("{}.{}".format(match.group(2), match.group(3)))
+                batches.setdefault(("monte_carlo", sticking_prob), {})[match.group(1)] = file
+                continue
+            match = dla_pattern.match(file)
+            if match:
+                batches[("dla", float(match.group(1)))] = {"final_grids": file}
+
+        num_runs = 0
+        for (model, value), files in batches.items():
+            results = {quantity: np.load(os.path.join(directory, file), mmap_mode="r") for quantity, file in files.items()}
+            parameters = {"sticking_prob": value} if model == "monte_carlo" else {"eta": value}
+            grid_quantity = "final_seed_growth_states" if model == "monte_carlo" else "final_grids"
+            if grid_quantity in results:
+                parameters["grid_size"] = results[grid_quantity].shape[-1]
+                # The legacy grids only hold 0 and 1, stored as int8 or float64
+                if np.all((results[grid_quantity] == 0) | (results[grid_quantity] == 1)):
+                    results[grid_quantity] = results[grid_quantity] != 0
+
+            if len({len(array) for array in results.values()}) != 1:
+                print("Skipping {}, the files have different numbers of runs".format(sorted(files.values())))
+                continue
+
+            self.add_runs(model, parameters, results, code_version="legacy", source=",".join(sorted(files.values())))
+            with self.connection:
+                self.connection.executemany("INSERT INTO imported_files (file) VALUES (?)", [(file,) for file in files.values()])
+            num_runs += len(next(iter(results.values())))
+
+        return num_runs
@@ -19,13 +19,6 @@ def neighbors_grid(g):
     neighbors_grid = (top+down+left+right) > 0
     return np.maximum(0, neighbors_grid - g)
 
-@njit
-def set_numba_seed(seed):
-    """
-    To set the seed for calls to np.random inside numba jit, the seed also needs to be set inside a jit function
-    """
-    np.random.seed(seed)
-
 @njit
 def grow_g(g, p_g, neighbors):
     """
@@ -67,7 +60,7 @@ def grow_g(g, p_g, neighbors):
     assert(False)
 
 
-def dla_growth(eta, omega, initial_condition, growth_steps=1000, diffusion_tolerance=1e-4, adaptive_SOR=True, verbose=True):    
+def dla_growth(eta, omega, initial_condition, growth_steps=1000, diffusion_tolerance=1e-4, adaptive_SOR=True, verbose=True, growth_recorder=None):    
     """Diffusion Limited Aggregation model with a uniform source at top and sink at the bottom
     The nutrient concentration is computed using the finite difference Successive over-relaxation (SOR) method
     The simulation is always stopped when the top row is reached
@@ -79,6 +72,7 @@ def dla_growth(eta, omega, initial_condition, growth_steps=1000, diffusion_toler
         diffusion_tolerance:stop SOR when changes between iterations are smaller than tolerance
         adaptive_SOR:       decide if omega is automatically reduced, if False, SOR can become unstable
         verbose:            decide if progress bar should be printed to stdout
+        growth_recorder:    optional GrowthRecorder that receives the cluster size after each growth step
         
     returns:
         g:      grid of live cells at each timestep [growth_steps x grid_size x grid_size]
@@ -96,6 +90,10 @@ def dla_growth(eta, omega, initial_condition, growth_steps=1000, diffusion_toler
     c[0] = basic_gradient[:, None]
     c[0], sor_iter,_ = SOR_top_down(c[0], omega, tolerance=diffusion_tolerance, mask=1-g[0])
     total_sor_iter = sor_iter
+    # every growth step adds one cell to the cluster
+    cluster_size = np.sum(g[0])
+    if growth_recorder is not None:
+        growth_recorder.record(0, cluster_size)
     for t in range(0, growth_steps-1):
         
         if verbose and (t%(growth_steps//100)==0):
@@ -113,6 +111,9 @@ def dla_growth(eta, omega, initial_condition, growth_steps=1000, diffusion_toler
         # plot_grid(c[t])
         
         reached_top = grow_g(g[t+1], p_g, neighbors)
+        cluster_size += 1
+        if growth_recorder is not None:
+            growth_recorder.record(t+1, cluster_size)
         if reached_top:
             break
         # plot_grid(neighbors)
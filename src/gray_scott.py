@@ -1,7 +1,13 @@
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from numba import njit
+import numba
+import scipy.fft
+from numba import njit, prange
+
+from src.utils import spawn_seeds
+from src.parallel import SharedArrays, attach_shared_arrays, worker_context
 
 
 def init_grids(total_time, time_step_size, n_steps):
@@ -40,10 +46,318 @@ def init_grids(total_time, time_step_size, n_steps):
     return chemical_U, chemical_V
 
 
-@njit   
-def solve_gray_scott(chemical_U, chemical_V, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry):
+def init_state(n_steps):
     """
-    Simulates gray_scott model in two dimensions. Both horizontally and vertically the grids have periodic boundries. Noise can be introduced into the model.  
+    Initiallizes the U and V states of a single time step, with the same initial conditions as init_grids.
+    U is set to 0.5 everywhere, V has a small square equal to 0.25 in the middle.
+
+    Parameters
+    ----------
+    n_steps : int
+        The size of the grid.
+
+    Returns
+    -------
+    chemical_U : np.ndarray
+        The state of chemical U [n_steps x n_steps].
+    chemical_V : np.ndarray
+        The state of chemical V [n_steps x n_steps].
+    """
+    chemical_U = np.full((n_steps, n_steps), 0.5)
+    chemical_V = np.zeros((n_steps, n_steps))
+
+    # Same square as init_grids on a 100 x 100 grid, scaled with the grid size
+    center = n_steps//2
+    half_width = max(n_steps//20, 1)
+    chemical_V[center - half_width:center + half_width, center - half_width:center + half_width] = 0.25
+
+    return chemical_U, chemical_V
+
+
+def num_snapshots(total_time, time_step_size, snapshot_interval):
+    """
+    Returns the number of snapshots solve_gray_scott saves, the initial state and every snapshot_interval-th step.
+
+    Parameters
+    ----------
+    total_time : int
+        Total time of the simulation.
+    time_step_size : int
+        The size of time step size.
+    snapshot_interval : int
+        The number of time steps between snapshots.
+
+    Returns
+    -------
+    num_snapshots : int
+        The number of snapshots.
+    """
+    time_step_num = int(total_time/time_step_size)
+    return (time_step_num - 1)//snapshot_interval + 1
+
+
+@njit(cache=True)
+def update_cell(old_U, old_V, new_U, new_V, noise_U, noise_V, rows, up, down, columns, left, right, time_step_size, diffusion_rate_u, diffusion_rate_v, U_supply, k):
+    """
+    Updates U and V of one cell from the neighbours at rows up and down and columns left and right.
+    """
+    chemical_U = old_U[rows, columns]
+    chemical_V = old_V[rows, columns]
+    reaction = chemical_U*chemical_V**2
+
+    #changes in chemical U
+    difussion_component_U = diffusion_rate_u*(old_U[down, columns] + old_U[up, columns] + old_U[rows, right] + old_U[rows, left] - 4*chemical_U)
+    reaction_component_U = - reaction + U_supply * (1-chemical_U)
+    new_U[rows, columns] = chemical_U + time_step_size*(difussion_component_U + reaction_component_U + noise_U)
+
+    #changes in chemical V
+    difussion_component_V = diffusion_rate_v*(old_V[down, columns] + old_V[up, columns] + old_V[rows, right] + old_V[rows, left] - 4*chemical_V)
+    reaction_component_V = reaction - (U_supply + k)* chemical_V
+    new_V[rows, columns] = chemical_V + time_step_size*(difussion_component_V + reaction_component_V + noise_V)
+
+
+@njit
+def gray_scott_steps(chemical_U, chemical_V, buffer_U, buffer_V, num_steps, time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, snapshot_interval, snapshots_U, snapshots_V, first_step=0):
+    """
+    Advances the U and V states by num_steps time steps, alternating between the states and the buffers.
+    The noise of all cells is drawn once per time step, in the same order as drawing it cell by cell,
+    and not at all without noise. The periodic neighbours of the edge rows and columns are looked up
+    once per row and outside of the column loop, so the cells need no modulo indexing.
+    The initial state and every snapshot_interval-th step are copied to the snapshots, if there is room for them,
+    counting the steps from first_step when a run is continued.
+    The final state is always left in chemical_U and chemical_V.
+    """
+    num_snapshots = snapshots_U.shape[0]
+    n_steps = chemical_U.shape[0]
+    if num_snapshots > 0 and first_step == 0:
+        snapshots_U[0] = chemical_U
+        snapshots_V[0] = chemical_V
+
+    diffusion_rate_u = diffusion_coefficient_u/(x_step_size**2)
+    diffusion_rate_v = diffusion_coefficient_v/(x_step_size**2)
+    # Noise of U and V for every cell
+    noise = np.zeros((n_steps, n_steps, 2))
+    noise_flat = noise.reshape(-1)
+
+    old_U, old_V = chemical_U, chemical_V
+    new_U, new_V = buffer_U, buffer_V
+    for time in range(num_steps):
+        if noise_boundry != 0:
+            for i in range(noise_flat.shape[0]):
+                noise_flat[i] = np.random.uniform(-noise_boundry, noise_boundry)
+
+        for rows in range(n_steps):
+            up = rows - 1 if rows > 0 else n_steps - 1
+            down = rows + 1 if rows < n_steps - 1 else 0
+            update_cell(old_U, old_V, new_U, new_V, noise[rows, 0, 0], noise[rows, 0, 1], rows, up, down, 0, n_steps - 1, 1%n_steps,
+                        time_step_size, diffusion_rate_u, diffusion_rate_v, U_supply, k)
+            for columns in range(1, n_steps - 1):
+                update_cell(old_U, old_V, new_U, new_V, noise[rows, columns, 0], noise[rows, columns, 1], rows, up, down, columns, columns - 1, columns + 1,
+                            time_step_size, diffusion_rate_u, diffusion_rate_v, U_supply, k)
+            if n_steps > 1:
+                update_cell(old_U, old_V, new_U, new_V, noise[rows, n_steps - 1, 0], noise[rows, n_steps - 1, 1], rows, up, down, n_steps - 1, n_steps - 2, 0,
+                            time_step_size, diffusion_rate_u, diffusion_rate_v, U_supply, k)
+
+        old_U, new_U = new_U, old_U
+        old_V, new_V = new_V, old_V
+
+        snapshot = (first_step + time + 1)//snapshot_interval
+        if (first_step + time + 1)%snapshot_interval == 0 and snapshot < num_snapshots:
+            snapshots_U[snapshot] = old_U
+            snapshots_V[snapshot] = old_V
+
+    # After an odd number of steps the final state is in the buffers
+    if num_steps%2 == 1:
+        chemical_U[:] = old_U
+        chemical_V[:] = old_V
+
+
+@njit(cache=True)
+def splitmix64(state):
+    """
+    Returns the splitmix64 hash of a uint64 counter.
+    """
+    z = state + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+@njit(cache=True)
+def counter_uniform(key, counter, noise_boundry):
+    """
+    Returns a uniform number in [-noise_boundry, noise_boundry) that only depends on the key and the counter.
+    """
+    bits = splitmix64(np.uint64(key) ^ splitmix64(np.uint64(counter)))
+    return noise_boundry*(2*(float(bits >> np.uint64(11))*2.0**-53) - 1)
+
+
+def laplacian_symbol(n_steps, x_step_size):
+    """
+    Returns the eigenvalues of the periodic five-point Laplacian for the Fourier modes of numpy's rfft2 [n_steps x n_steps//2 + 1].
+    These are the same finite differences as the explicit solver, so the spectral solver only changes the time stepping.
+
+    Parameters
+    ----------
+    n_steps : int
+        The size of the grid.
+    x_step_size : float
+        The distance between grid points.
+
+    Returns
+    -------
+    symbol : np.ndarray
+        The eigenvalue of every Fourier mode.
+    """
+    row_waves = np.sin(np.pi*np.fft.fftfreq(n_steps))**2
+    column_waves = np.sin(np.pi*np.fft.rfftfreq(n_steps))**2
+    return -4/x_step_size**2*(row_waves[:, None] + column_waves[None, :])
+
+
+def etd_coefficients(linear, time_step_size):
+    """
+    Returns the exponential exp(L dt) and the ETDRK2 weights dt phi_1(L dt) and dt phi_2(L dt) of a diagonal linear operator L.
+    Near zero, phi_1 and phi_2 are evaluated from their Taylor series, which avoids the cancellation in the closed forms.
+    """
+    z = linear*time_step_size
+    small = np.abs(z) < 1e-3
+    z_safe = np.where(small, 1, z)
+    phi_1 = np.where(small, 1 + z/2 + z**2/6, np.expm1(z_safe)/z_safe)
+    phi_2 = np.where(small, 1/2 + z/6 + z**2/24, (np.expm1(z_safe) - z_safe)/z_safe**2)
+    return np.exp(z), time_step_size*phi_1, time_step_size*phi_2
+
+
+def gray_scott_steps_spectral(chemical_U, chemical_V, num_steps, time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, snapshot_interval, snapshots_U, snapshots_V, method, rng, first_step=0, workers=-1):
+    """
+    Advances the U and V states by num_steps time steps with a pseudo-spectral integrator.
+    Diffusion is solved exactly or implicitly in Fourier space, the reaction terms and the noise are explicit. The noise of a step is drawn once for all cells from rng.
+    "imex" is the semi-implicit Euler scheme, "etdrk2" the second order exponential time differencing Runge-Kutta scheme of Cox and Matthews.
+    The FFTs use the given number of workers, -1 for all cores.
+    The initial state and every snapshot_interval-th step, counted from first_step, are copied to the snapshots, if there is room for them.
+    The final state is left in chemical_U and chemical_V.
+    """
+    n_steps = chemical_U.shape[0]
+    num_snapshots = snapshots_U.shape[0]
+    if num_snapshots > 0 and first_step == 0:
+        snapshots_U[0] = chemical_U
+        snapshots_V[0] = chemical_V
+
+    symbol = laplacian_symbol(n_steps, x_step_size)
+    linear_U = diffusion_coefficient_u*symbol
+    linear_V = diffusion_coefficient_v*symbol
+    if method == "imex":
+        implicit_U = 1/(1 - time_step_size*linear_U)
+        implicit_V = 1/(1 - time_step_size*linear_V)
+    elif method == "etdrk2":
+        exponential_U, phi_1_U, phi_2_U = etd_coefficients(linear_U, time_step_size)
+        exponential_V, phi_1_V, phi_2_V = etd_coefficients(linear_V, time_step_size)
+    else:
+        raise ValueError(f"Unknown method {method}, use euler, imex or etdrk2")
+
+    def nonlinear_terms(state_U, state_V, noise_U, noise_V):
+        reaction = state_U*state_V**2
+        return scipy.fft.rfft2(U_supply*(1 - state_U) - reaction + noise_U, workers=workers), scipy.fft.rfft2(reaction - (U_supply + k)*state_V + noise_V, workers=workers)
+
+    state_U, state_V = chemical_U.copy(), chemical_V.copy()
+    spectrum_U, spectrum_V = scipy.fft.rfft2(state_U, workers=workers), scipy.fft.rfft2(state_V, workers=workers)
+    noise_U = noise_V = 0
+    for time in range(num_steps):
+        if noise_boundry != 0:
+            noise_U, noise_V = rng.uniform(-noise_boundry, noise_boundry, (2, n_steps, n_steps))
+
+        nonlinear_U, nonlinear_V = nonlinear_terms(state_U, state_V, noise_U, noise_V)
+        if method == "imex":
+            spectrum_U = implicit_U*(spectrum_U + time_step_size*nonlinear_U)
+            spectrum_V = implicit_V*(spectrum_V + time_step_size*nonlinear_V)
+        else:
+            # Exponential Euler predictor, corrected with the nonlinear terms at the predicted state
+            predicted_U = exponential_U*spectrum_U + phi_1_U*nonlinear_U
+            predicted_V = exponential_V*spectrum_V + phi_1_V*nonlinear_V
+            corrected_U, corrected_V = nonlinear_terms(scipy.fft.irfft2(predicted_U, s=state_U.shape, workers=workers),
+                                                       scipy.fft.irfft2(predicted_V, s=state_V.shape, workers=workers), noise_U, noise_V)
+            spectrum_U = predicted_U + phi_2_U*(corrected_U - nonlinear_U)
+            spectrum_V = predicted_V + phi_2_V*(corrected_V - nonlinear_V)
+
+        state_U = scipy.fft.irfft2(spectrum_U, s=state_U.shape, workers=workers)
+        state_V = scipy.fft.irfft2(spectrum_V, s=state_V.shape, workers=workers)
+
+        snapshot = (first_step + time + 1)//snapshot_interval
+        if (first_step + time + 1)%snapshot_interval == 0 and snapshot < num_snapshots:
+            snapshots_U[snapshot] = state_U
+            snapshots_V[snapshot] = state_V
+
+    chemical_U[:] = state_U
+    chemical_V[:] = state_V
+
+
+def convergence_state(previous_U, previous_V, chemical_U, chemical_V, elapsed_time, steady_tolerance, decay_tolerance):
+    """
+    Checks whether states have converged since the previous check. The rates of change are the largest changes
+    of U and V over the elapsed time. Works on single states and on stacks of states [members x n_steps x n_steps].
+
+    Parameters
+    ----------
+    previous_U : np.ndarray
+        The U states at the previous check.
+    previous_V : np.ndarray
+        The V states at the previous check.
+    chemical_U : np.ndarray
+        The current U states.
+    chemical_V : np.ndarray
+        The current V states.
+    elapsed_time : float
+        The time since the previous check.
+    steady_tolerance : float
+        The largest rate of change of U and V of a steady pattern.
+    decay_tolerance : float
+        The largest value of V of a pattern that has decayed to the trivial state.
+
+    Returns
+    -------
+    stop_reason : np.ndarray
+        "diverged" for states that are no longer finite, "decayed", "steady", or "" for states that still change.
+    rate_U : np.ndarray
+        The rate of change of U.
+    rate_V : np.ndarray
+        The rate of change of V.
+    """
+    rate_U = np.max(np.abs(chemical_U - previous_U), axis=(-2, -1))/elapsed_time
+    rate_V = np.max(np.abs(chemical_V - previous_V), axis=(-2, -1))/elapsed_time
+    diverged = ~(np.isfinite(rate_U) & np.isfinite(rate_V))
+    decayed = np.max(np.abs(chemical_V), axis=(-2, -1)) < decay_tolerance
+    steady = (rate_U < steady_tolerance) & (rate_V < steady_tolerance)
+    stop_reason = np.where(diverged, "diverged", np.where(decayed, "decayed", np.where(steady, "steady", "")))
+    return stop_reason, rate_U, rate_V
+
+
+def next_stop_step(step, total_steps, intervals):
+    """
+    Returns the next time step after step that is a multiple of one of the intervals, or total_steps if that comes first.
+    """
+    return min([(step//interval + 1)*interval for interval in intervals] + [total_steps])
+
+
+def solve_gray_scott(chemical_U, chemical_V, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, snapshot_interval=None, snapshots_U=None, snapshots_V=None, parallel=False, num_threads=None, seed=None, method="euler", monitor_interval=None, steady_tolerance=1e-6, decay_tolerance=1e-6, metrics_recorder=None):
+    """
+    Simulates gray_scott model in two dimensions. Both horizontally and vertically the grids have periodic boundries. Noise can be introduced into the model.
+    The model runs on the current U and V states and one buffer for each, so the memory does not grow with the number of time steps.
+    Snapshots of the states can be saved every snapshot_interval time steps, to arrays or memory maps of the caller,
+    or streamed to snapshot files with SnapshotWriter.
+
+    With grids from init_grids [time steps x n_steps x n_steps], every time step is saved into the grids as before.
+    With states from init_state [n_steps x n_steps], the states are updated in place to the final state.
+
+    The parallel solver divides the rows over the numba threads. Its noise comes from counter-based random
+    streams of the seed instead of np.random, so a seeded run gives the same result with any number of threads.
+
+    The explicit Euler method is only stable for 4*dt*D/dx^2 <= 1. The spectral methods "imex" and "etdrk2" solve
+    the diffusion in Fourier space without this limit, which allows much larger time steps, especially on fine grids.
+
+    With a monitor_interval the run stops early once the pattern is steady or has decayed, see convergence_state.
+    The snapshots after the stop are not written, except in grids from init_grids, where the time steps after
+    the stop hold the final state.
+    A metrics_recorder, e.g. a PatternMetricsRecorder, records summary metrics of V every few time steps,
+    which follow the pattern without keeping any snapshots.
 
     Parameters
     ----------
@@ -69,62 +383,762 @@ def solve_gray_scott(chemical_U, chemical_V, total_time, time_step_size, x_lengt
         k parameter. The sum (f + k) controls the rate at which chemical V decays. 
     noise_boundry : float
         The boudry of the uniform distribution from which the noise comes form. If set to zero, no noise is introduced into the model. 
+    snapshot_interval : int
+        Optional number of time steps between snapshots of states from init_state. If None, only the final state is kept.
+    snapshots_U : np.ndarray
+        Optional array, memory map or SnapshotWriter for the snapshots of U [num_snapshots x n_steps x n_steps], see num_snapshots.
+        If None, it is allocated.
+    snapshots_V : np.ndarray
+        Optional array, memory map or SnapshotWriter for the snapshots of V, like snapshots_U.
+    parallel : bool
+        Whether to use the parallel solver.
+    num_threads : int
+        Optional number of threads of the parallel solver, at most numba.config.NUMBA_NUM_THREADS, or of the FFTs of the spectral solvers.
+        If None, all of them.
+    seed : int
+        Optional seed of the noise of the parallel and spectral solvers. If None, fresh entropy from the OS.
+        The serial solver draws the noise from np.random, which is seeded with set_numba_seed.
+    method : str
+        The time stepping, "euler" for explicit Euler, "imex" for semi-implicit Euler or "etdrk2" for
+        exponential time differencing, see gray_scott_steps_spectral.
+    monitor_interval : int
+        Optional number of time steps between convergence checks. If None, all time steps are run.
+    steady_tolerance : float
+        The largest rate of change of U and V of a steady pattern.
+    decay_tolerance : float
+        The largest value of V of a pattern that has decayed to the trivial state U = 1, V = 0.
+    metrics_recorder : PatternMetricsRecorder
+        Optional recorder, called as record(step, time, chemical_V, x_length) at the initial state, every
+        metrics_recorder.interval time steps and at the final state.
+
+    Returns
+    -------
+    snapshots_U : np.ndarray
+        The snapshots of U, None without a snapshot_interval or for grids from init_grids.
+    snapshots_V : np.ndarray
+        The snapshots of V, None without a snapshot_interval or for grids from init_grids.
+    run_info : dict
+        The stop_reason ("completed", "steady", "decayed", "diverged" or "unstable"), the num_steps run, the stop_time,
+        and the rates of change rate_U and rate_V at the last convergence check.
+    """
+    # Grids with every time step are snapshots of every step after the initial state
+    if chemical_U.ndim == 3:
+        state_U, state_V = chemical_U[0].copy(), chemical_V[0].copy()
+        _, _, run_info = solve_gray_scott(state_U, state_V, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry,
+                                          snapshot_interval=1, snapshots_U=chemical_U, snapshots_V=chemical_V, parallel=parallel, num_threads=num_threads, seed=seed, method=method,
+                                          monitor_interval=monitor_interval, steady_tolerance=steady_tolerance, decay_tolerance=decay_tolerance,
+                                          metrics_recorder=metrics_recorder)
+        if run_info["stop_reason"] != "unstable":
+            # After an early stop the state no longer changes, so the remaining time steps keep the final state
+            chemical_U[run_info["num_steps"] + 1:] = state_U
+            chemical_V[run_info["num_steps"] + 1:] = state_V
+        return None, None, run_info
+
+    x_step_size = x_length/n_steps
+    time_step_num = int(total_time/time_step_size)
+    run_info = {"stop_reason": "completed", "num_steps": 0, "stop_time": 0.0, "rate_U": np.nan, "rate_V": np.nan}
+
+    if snapshot_interval is not None:
+        shape = (num_snapshots(total_time, time_step_size, snapshot_interval), n_steps, n_steps)
+        snapshots_U = np.zeros(shape) if snapshots_U is None else snapshots_U
+        snapshots_V = np.zeros(shape) if snapshots_V is None else snapshots_V
+        if snapshots_U.shape != shape or snapshots_V.shape != shape:
+            raise ValueError(f"The snapshots need the shape {shape}, got {snapshots_U.shape} and {snapshots_V.shape}")
+
+    if method == "euler":
+        stability_value_u = 4*time_step_size*diffusion_coefficient_u/x_step_size**2
+        stability_value_v = 4*time_step_size*diffusion_coefficient_v/x_step_size**2
+        if (stability_value_u > 1):
+            print(f"{stability_value_u }.Stability issue with chemical U, the solution is not stable. Choose different values for U")
+            run_info["stop_reason"] = "unstable"
+            return snapshots_U, snapshots_V, run_info
+        elif (stability_value_v > 1): 
+            print(f"{stability_value_v}.Stability issue with chemical V, the solution is not stable. Choose different values for V")
+            run_info["stop_reason"] = "unstable"
+            return snapshots_U, snapshots_V, run_info
+
+    # Snapshot stores that are not arrays, like a quantized SnapshotWriter, are written between the kernel calls
+    streamed = snapshot_interval is not None and not (isinstance(snapshots_U, np.ndarray) and isinstance(snapshots_V, np.ndarray))
+    kernel_snapshots = snapshot_interval is not None and not streamed
+    no_snapshots = np.zeros((0, n_steps, n_steps))
+    arguments = (time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry,
+                 snapshot_interval if kernel_snapshots else 1,
+                 snapshots_U if kernel_snapshots else no_snapshots,
+                 snapshots_V if kernel_snapshots else no_snapshots)
+    buffer_U, buffer_V = np.empty_like(chemical_U), np.empty_like(chemical_V)
+    rng = np.random.default_rng(seed)
+    noise_key = int(spawn_seeds(seed, 1)[0])
+    # The parallel solver runs the state as a batch of one member
+    batch_arguments = (time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v,
+                       np.array([U_supply], dtype=np.float64), np.array([k], dtype=np.float64), np.array([noise_boundry], dtype=np.float64),
+                       arguments[7], arguments[8][:, None], arguments[9][:, None], np.array([noise_key], dtype=np.int64), np.zeros(1, dtype=np.int64))
+
+    def advance(num_steps, first_step):
+        if method != "euler":
+            gray_scott_steps_spectral(chemical_U, chemical_V, num_steps, *arguments, method, rng, first_step, num_threads if num_threads is not None else -1)
+        elif not parallel:
+            gray_scott_steps(chemical_U, chemical_V, buffer_U, buffer_V, num_steps, *arguments, first_step)
+        else:
+            gray_scott_batch_steps(chemical_U[None], chemical_V[None], buffer_U[None], buffer_V[None], num_steps, *batch_arguments, first_step)
+
+    # Without a monitor, metrics or streamed snapshots all time steps run at once
+    total_steps = time_step_num - 1
+    intervals = [interval for interval in (monitor_interval, metrics_recorder.interval if metrics_recorder is not None else None,
+                                           snapshot_interval if streamed else None) if interval is not None]
+    if streamed:
+        snapshots_U[0], snapshots_V[0] = chemical_U, chemical_V
+    if metrics_recorder is not None:
+        metrics_recorder.record(0, 0.0, chemical_V, x_length)
+    if monitor_interval is not None:
+        previous_U, previous_V, previous_check = chemical_U.copy(), chemical_V.copy(), 0
+
+    previous_num_threads = numba.get_num_threads()
+    if num_threads is not None and parallel:
+        numba.set_num_threads(num_threads)
+    try:
+        while run_info["num_steps"] < total_steps:
+            step = run_info["num_steps"]
+            next_step = next_stop_step(step, total_steps, intervals)
+            advance(next_step - step, step)
+            run_info["num_steps"] = step = next_step
+
+            if streamed and step%snapshot_interval == 0 and step//snapshot_interval < len(snapshots_U):
+                snapshots_U[step//snapshot_interval], snapshots_V[step//snapshot_interval] = chemical_U, chemical_V
+
+            if metrics_recorder is not None and (step%metrics_recorder.interval == 0 or step == total_steps):
+                metrics_recorder.record(step, step*time_step_size, chemical_V, x_length)
+
+            if monitor_interval is not None and (step%monitor_interval == 0 or step == total_steps):
+                stop_reason, rate_U, rate_V = convergence_state(previous_U, previous_V, chemical_U, chemical_V, (step - previous_check)*time_step_size,
+                                                                steady_tolerance, decay_tolerance)
+                run_info.update(rate_U=float(rate_U), rate_V=float(rate_V))
+                if stop_reason:
+                    run_info["stop_reason"] = str(stop_reason)
+                    if metrics_recorder is not None:
+                        metrics_recorder.record(step, step*time_step_size, chemical_V, x_length)
+                    break
+                previous_U[:], previous_V[:], previous_check = chemical_U, chemical_V, step
+    finally:
+        numba.set_num_threads(previous_num_threads)
+
+    run_info["stop_time"] = run_info["num_steps"]*time_step_size
+    return snapshots_U, snapshots_V, run_info
+
+
+@njit
+def gray_scott_rates(chemical_U, chemical_V, rate_U, rate_V, diffusion_rate_u, diffusion_rate_v, U_supply, k):
+    """
+    Computes the rates of change dU/dt and dV/dt of every cell, with periodic boundries.
+    """
+    n_steps = chemical_U.shape[0]
+    for rows in range(n_steps):
+        up = rows - 1 if rows > 0 else n_steps - 1
+        down = rows + 1 if rows < n_steps - 1 else 0
+        for columns in range(n_steps):
+            left = columns - 1 if columns > 0 else n_steps - 1
+            right = columns + 1 if columns < n_steps - 1 else 0
+            cell_U = chemical_U[rows, columns]
+            cell_V = chemical_V[rows, columns]
+            reaction = cell_U*cell_V**2
+            rate_U[rows, columns] = (diffusion_rate_u*(chemical_U[down, columns] + chemical_U[up, columns] + chemical_U[rows, right] + chemical_U[rows, left] - 4*cell_U)
+                                     - reaction + U_supply*(1 - cell_U))
+            rate_V[rows, columns] = (diffusion_rate_v*(chemical_V[down, columns] + chemical_V[up, columns] + chemical_V[rows, right] + chemical_V[rows, left] - 4*cell_V)
+                                     + reaction - (U_supply + k)*cell_V)
 
 
+@njit
+def gray_scott_adaptive_steps(chemical_U, chemical_V, total_time, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k,
+                              snapshot_times, snapshots_U, snapshots_V, initial_step, max_step, relative_tolerance, absolute_tolerance):
+    """
+    Advances the U and V states from time 0 to total_time with the embedded Heun-Euler pair.
+    A step takes the Euler predictor and the Heun corrector, their difference estimates the local error of the Euler step.
+    Steps with a scaled error above 1 are repeated with a smaller step, and the next step size follows the error
+    with a safety factor. Steps are shortened to end exactly at the snapshot_times and at total_time.
+    Returns the number of accepted and rejected steps and the smallest and largest accepted step.
+    """
+    n_steps = chemical_U.shape[0]
+    diffusion_rate_u = diffusion_coefficient_u/(x_step_size**2)
+    diffusion_rate_v = diffusion_coefficient_v/(x_step_size**2)
+    rate_U, rate_V = np.empty_like(chemical_U), np.empty_like(chemical_V)
+    predicted_U, predicted_V = np.empty_like(chemical_U), np.empty_like(chemical_V)
+    predicted_rate_U, predicted_rate_V = np.empty_like(chemical_U), np.empty_like(chemical_V)
+
+    snapshot = 0
+    while snapshot < len(snapshot_times) and snapshot_times[snapshot] <= 0:
+        snapshots_U[snapshot] = chemical_U
+        snapshots_V[snapshot] = chemical_V
+        snapshot += 1
+
+    time = 0.0
+    step_size = min(initial_step, max_step)
+    num_accepted = 0
+    num_rejected = 0
+    smallest_step = np.inf
+    largest_step = 0.0
+    gray_scott_rates(chemical_U, chemical_V, rate_U, rate_V, diffusion_rate_u, diffusion_rate_v, U_supply, k)
+    while time < total_time:
+        # The step ends at the next output time if it would pass it
+        end_time = snapshot_times[snapshot] if snapshot < len(snapshot_times) else total_time
+        this_step = min(step_size, end_time - time)
+        reaches_end = this_step == end_time - time
+
+        for rows in range(n_steps):
+            for columns in range(n_steps):
+                predicted_U[rows, columns] = chemical_U[rows, columns] + this_step*rate_U[rows, columns]
+                predicted_V[rows, columns] = chemical_V[rows, columns] + this_step*rate_V[rows, columns]
+        gray_scott_rates(predicted_U, predicted_V, predicted_rate_U, predicted_rate_V, diffusion_rate_u, diffusion_rate_v, U_supply, k)
+
+        # The scaled difference between the Euler and the Heun step
+        error = 0.0
+        for rows in range(n_steps):
+            for columns in range(n_steps):
+                difference_U = this_step/2*abs(predicted_rate_U[rows, columns] - rate_U[rows, columns])
+                difference_V = this_step/2*abs(predicted_rate_V[rows, columns] - rate_V[rows, columns])
+                scale_U = absolute_tolerance + relative_tolerance*abs(predicted_U[rows, columns])
+                scale_V = absolute_tolerance + relative_tolerance*abs(predicted_V[rows, columns])
+                error = max(error, difference_U/scale_U, difference_V/scale_V)
+
+        if not np.isfinite(error):
+            break
+
+        # The error of the first order step shrinks with the square of the step size
+        factor = 0.9/np.sqrt(error) if error > 0 else 5.0
+        if error <= 1:
+            for rows in range(n_steps):
+                for columns in range(n_steps):
+                    chemical_U[rows, columns] += this_step/2*(rate_U[rows, columns] + predicted_rate_U[rows, columns])
+                    chemical_V[rows, columns] += this_step/2*(rate_V[rows, columns] + predicted_rate_V[rows, columns])
+            time = end_time if reaches_end else time + this_step
+            num_accepted += 1
+            smallest_step = min(smallest_step, this_step)
+            largest_step = max(largest_step, this_step)
+            gray_scott_rates(chemical_U, chemical_V, rate_U, rate_V, diffusion_rate_u, diffusion_rate_v, U_supply, k)
+
+            while snapshot < len(snapshot_times) and snapshot_times[snapshot] <= time:
+                snapshots_U[snapshot] = chemical_U
+                snapshots_V[snapshot] = chemical_V
+                snapshot += 1
+
+            # A step shortened for an output time does not limit the next step
+            if this_step == step_size:
+                step_size = min(step_size*min(factor, 5.0), max_step)
+        else:
+            num_rejected += 1
+            step_size = this_step*max(factor, 0.2)
+            if step_size < 1e-12*total_time:
+                break
+
+    return time, num_accepted, num_rejected, smallest_step, largest_step
+
+
+def solve_gray_scott_adaptive(chemical_U, chemical_V, total_time, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, snapshot_times=None, snapshots_U=None, snapshots_V=None, relative_tolerance=1e-3, absolute_tolerance=1e-6, initial_step=0.1, max_step=None):
+    """
+    Simulates the gray_scott model with adaptive time steps, on a state from init_state with periodic boundries and without noise.
+    Every step is a second order Heun step, and the error estimate of the embedded Euler step controls the step size,
+    so the run takes large steps while the pattern evolves slowly and small steps during fast transients.
+    The step size never exceeds the stability bound dx^2/(4*D) of the explicit methods, or max_step.
+
+    Snapshots are saved at physical times instead of every few time steps. The run ends exactly at total_time,
+    while solve_gray_scott runs int(total_time/time_step_size) - 1 steps.
+
+    Parameters
+    ----------
+    chemical_U : np.ndarray
+        The state of U [n_steps x n_steps], updated in place to the final state.
+    chemical_V : np.ndarray
+        The state of V [n_steps x n_steps], updated in place to the final state.
+    total_time : float
+        Total time of the simulation.
+    x_length : int
+        The max value of X.
+    n_steps : int
+        The size of the grid.
+    diffusion_coefficient_u: float
+        Diffusion coefficient for chemical U.
+    diffusion_coefficient_v: float
+        Diffusion coefficient for chemical V.
+    U_supply : float
+        The rate at which U is supplied.
+    k : float
+        k parameter. The sum (f + k) controls the rate at which chemical V decays.
+    snapshot_times : np.ndarray
+        Optional increasing times between 0 and total_time at which the states are saved. If None, only the final state is kept.
+    snapshots_U : np.ndarray
+        Optional array or memory map for the snapshots of U [len(snapshot_times) x n_steps x n_steps]. If None, it is allocated.
+    snapshots_V : np.ndarray
+        Optional array or memory map for the snapshots of V, like snapshots_U.
+    relative_tolerance : float
+        The local error allowed per step relative to the values of U and V.
+    absolute_tolerance : float
+        The local error allowed per step for values close to zero.
+    initial_step : float
+        The size of the first time step, it is reduced if its error is too large.
+    max_step : float
+        Optional largest time step. If None, only the stability bound.
+
     Returns
     -------
-    None
+    snapshots_U : np.ndarray
+        The snapshots of U, None without snapshot_times.
+    snapshots_V : np.ndarray
+        The snapshots of V, None without snapshot_times.
+    run_info : dict
+        The stop_reason ("completed" or "diverged"), the num_steps accepted, the num_rejected steps, the stop_time,
+        and the smallest_step and largest_step accepted.
+    """
+    x_step_size = x_length/n_steps
+    stability_bound = x_step_size**2/(4*max(diffusion_coefficient_u, diffusion_coefficient_v))
+    max_step = stability_bound if max_step is None else min(max_step, stability_bound)
+
+    snapshot_times = np.zeros(0) if snapshot_times is None else np.asarray(snapshot_times, dtype=np.float64)
+    if np.any(np.diff(snapshot_times) <= 0) or np.any(snapshot_times < 0) or np.any(snapshot_times > total_time):
+        raise ValueError("The snapshot times need to increase from 0 to at most total_time")
+    if len(snapshot_times) > 0:
+        shape = (len(snapshot_times), n_steps, n_steps)
+        snapshots_U = np.zeros(shape) if snapshots_U is None else snapshots_U
+        snapshots_V = np.zeros(shape) if snapshots_V is None else snapshots_V
+        if snapshots_U.shape != shape or snapshots_V.shape != shape:
+            raise ValueError(f"The snapshots need the shape {shape}, got {snapshots_U.shape} and {snapshots_V.shape}")
+    no_snapshots = np.zeros((0, n_steps, n_steps))
+
+    stop_time, num_steps, num_rejected, smallest_step, largest_step = gray_scott_adaptive_steps(
+        chemical_U, chemical_V, float(total_time), x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, snapshot_times,
+        snapshots_U if len(snapshot_times) > 0 else no_snapshots, snapshots_V if len(snapshot_times) > 0 else no_snapshots,
+        float(initial_step), float(max_step), relative_tolerance, absolute_tolerance)
+
+    run_info = {"stop_reason": "completed" if stop_time >= total_time else "diverged", "num_steps": num_steps, "num_rejected": num_rejected,
+                "stop_time": stop_time, "smallest_step": smallest_step, "largest_step": largest_step}
+    return snapshots_U, snapshots_V, run_info
+
+
+@njit(cache=True)
+def gray_scott_strip_step(old_U, old_V, new_U, new_V, first_row, n_steps, time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, noise_key, step):
+    """
+    Advances a strip of rows by one time step. The strips [rows + 2 x n_steps] have a halo row above and below
+    the rows of the strip, which hold the neighbouring rows of the grid. The strip starts at row first_row of the grid,
+    and the noise of a cell is the same as in gray_scott_batch_steps.
+    """
+    diffusion_rate_u = diffusion_coefficient_u/(x_step_size**2)
+    diffusion_rate_v = diffusion_coefficient_v/(x_step_size**2)
+    key = splitmix64(np.uint64(noise_key))
+    first_counter = step*n_steps*n_steps*2
+    # The noise of a row is drawn in one loop before the row is updated, which keeps the update loop tight
+    noise = np.zeros(2*n_steps)
+    for rows in range(1, old_U.shape[0] - 1):
+        if noise_boundry != 0:
+            row_counter = first_counter + (first_row + rows - 1)*n_steps*2
+            for i in range(2*n_steps):
+                noise[i] = counter_uniform(key, row_counter + i, noise_boundry)
+        for columns in range(n_steps):
+            left = columns - 1 if columns > 0 else n_steps - 1
+            right = columns + 1 if columns < n_steps - 1 else 0
+            update_cell(old_U, old_V, new_U, new_V, noise[2*columns], noise[2*columns + 1], rows, rows - 1, rows + 1, columns, left, right,
+                        time_step_size, diffusion_rate_u, diffusion_rate_v, U_supply, k)
+
+
+def gray_scott_strip_worker(specs, strip, row_bounds, barrier, num_steps, time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, noise_key, snapshot_interval):
+    """
+    Runs the time steps of one strip in a worker process of solve_gray_scott_processes.
+    Before every step the worker waits for all strips to finish the previous step, and copies the edge rows
+    of the neighbouring strips into its halo rows. The worker reads its rows of the initial state from the shared
+    state arrays, and writes its rows of the final state back into them.
+    """
+    try:
+        arrays = attach_shared_arrays(specs)
+        num_strips = len(row_bounds) - 1
+        state_U, state_V = arrays["state_U"], arrays["state_V"]
+        n_steps = state_U.shape[0]
+        first_row, last_row = row_bounds[strip], row_bounds[strip + 1]
+        strips_U = [[arrays[f"U{buffer}_{index}"] for buffer in range(2)] for index in range(num_strips)]
+        strips_V = [[arrays[f"V{buffer}_{index}"] for buffer in range(2)] for index in range(num_strips)]
+        above, below = (strip - 1)%num_strips, (strip + 1)%num_strips
+
+        # The strip is first written by its own process, so its memory is allocated on the NUMA node of the process
+        strips_U[strip][0][1:-1] = state_U[first_row:last_row]
+        strips_V[strip][0][1:-1] = state_V[first_row:last_row]
+        strips_U[strip][1][:] = 0
+        strips_V[strip][1][:] = 0
+        if "snapshots_U" in arrays:
+            arrays["snapshots_U"][0, first_row:last_row] = state_U[first_row:last_row]
+            arrays["snapshots_V"][0, first_row:last_row] = state_V[first_row:last_row]
+
+        for step in range(num_steps):
+            old, new = step%2, (step + 1)%2
+            barrier.wait()
+            for strips in (strips_U, strips_V):
+                strips[strip][old][0] = strips[above][old][-2]
+                strips[strip][old][-1] = strips[below][old][1]
+
+            gray_scott_strip_step(strips_U[strip][old], strips_V[strip][old], strips_U[strip][new], strips_V[strip][new], first_row, n_steps,
+                                  time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, noise_key, step)
+
+            snapshot = (step + 1)//snapshot_interval
+            if "snapshots_U" in arrays and (step + 1)%snapshot_interval == 0 and snapshot < arrays["snapshots_U"].shape[0]:
+                arrays["snapshots_U"][snapshot, first_row:last_row] = strips_U[strip][new][1:-1]
+                arrays["snapshots_V"][snapshot, first_row:last_row] = strips_V[strip][new][1:-1]
+
+        # After an odd number of steps the final state is in the second buffer
+        state_U[first_row:last_row] = strips_U[strip][num_steps%2][1:-1]
+        state_V[first_row:last_row] = strips_V[strip][num_steps%2][1:-1]
+    except BaseException:
+        # Release the other workers from the barrier
+        barrier.abort()
+        raise
+
+
+def solve_gray_scott_processes(chemical_U, chemical_V, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, num_processes=None, snapshot_interval=None, snapshots_U=None, snapshots_V=None, seed=None):
+    """
+    Simulates the gray_scott model on a state from init_state like solve_gray_scott, split over a group of local processes
+    for very large grids, where a single process is limited by the memory bandwidth of one socket.
+    The rows are divided into one strip per process. Every strip lives in its own shared memory array, first written by
+    its process, so on a NUMA machine the strips are spread over the memory of the sockets the processes run on.
+    Each step the processes wait at a barrier and copy the neighbouring rows into the halo rows of their strips.
+
+    The noise is the counter-based noise of the parallel solver, so a seeded run gives the same result as
+    solve_gray_scott(..., parallel=True) with the same seed, with any number of processes.
+
+    Parameters
+    ----------
+    chemical_U : np.ndarray
+        The state of U [n_steps x n_steps], updated in place to the final state.
+    chemical_V : np.ndarray
+        The state of V [n_steps x n_steps], updated in place to the final state.
+    total_time : int
+        Total time of the simulation.
+    time_step_size : int
+        The size of time step size.
+    x_length : int
+        The max value of X.
+    n_steps : int
+        The size of the grid.
+    diffusion_coefficient_u: float
+        Diffusion coefficient for chemical U.
+    diffusion_coefficient_v: float
+        Diffusion coefficient for chemical V.
+    U_supply : float
+        The rate at which U is supplied.
+    k : float
+        k parameter. The sum (f + k) controls the rate at which chemical V decays.
+    noise_boundry : float
+        The boundry of the uniform noise. If set to zero, no noise is introduced into the model.
+    num_processes : int
+        Optional number of processes, at most n_steps. If None, one per CPU core.
+    snapshot_interval : int
+        Optional number of time steps between snapshots. If None, only the final state is kept.
+    snapshots_U : np.ndarray
+        Optional array or memory map for the snapshots of U [num_snapshots x n_steps x n_steps], see num_snapshots.
+        If None, the snapshots are returned in shared memory arrays.
+    snapshots_V : np.ndarray
+        Optional array or memory map for the snapshots of V, like snapshots_U.
+    seed : int
+        Optional seed of the noise. If None, fresh entropy from the OS.
+
+    Returns
+    -------
+    snapshots_U : np.ndarray
+        The snapshots of U, None without a snapshot_interval.
+    snapshots_V : np.ndarray
+        The snapshots of V, None without a snapshot_interval.
+    run_info : dict
+        The stop_reason ("completed" or "unstable"), the num_steps run and the stop_time, like solve_gray_scott.
     """
-    # Solve 
     x_step_size = x_length/n_steps
     time_step_num = int(total_time/time_step_size)
+    run_info = {"stop_reason": "completed", "num_steps": 0, "stop_time": 0.0}
+    stability_value_u = 4*time_step_size*diffusion_coefficient_u/x_step_size**2
+    stability_value_v = 4*time_step_size*diffusion_coefficient_v/x_step_size**2
+    if (stability_value_u > 1):
+        print(f"{stability_value_u }.Stability issue with chemical U, the solution is not stable. Choose different values for U")
+        run_info["stop_reason"] = "unstable"
+        return snapshots_U, snapshots_V, run_info
+    elif (stability_value_v > 1):
+        print(f"{stability_value_v}.Stability issue with chemical V, the solution is not stable. Choose different values for V")
+        run_info["stop_reason"] = "unstable"
+        return snapshots_U, snapshots_V, run_info
+
+    num_processes = min(num_processes if num_processes is not None else os.cpu_count(), n_steps)
+    row_bounds = np.linspace(0, n_steps, num_processes + 1).astype(np.int64)
+    num_steps = max(time_step_num - 1, 0)
+    noise_key = int(spawn_seeds(seed, 1)[0])
+
+    if snapshot_interval is not None:
+        shape = (num_snapshots(total_time, time_step_size, snapshot_interval), n_steps, n_steps)
+        for snapshots in (snapshots_U, snapshots_V):
+            if snapshots is not None and snapshots.shape != shape:
+                raise ValueError(f"The snapshots need the shape {shape}, got {snapshots.shape}")
+
+    # Compile the kernel once into numba's on-disk cache, the workers load it from there instead of compiling it again
+    tiny = np.zeros((3, 1))
+    gray_scott_strip_step(tiny, tiny, tiny.copy(), tiny.copy(), 0, 1, time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, noise_key, 0)
+
+    with SharedArrays() as shared:
+        shared.create("state_U", chemical_U.shape, np.float64)[:] = chemical_U
+        shared.create("state_V", chemical_V.shape, np.float64)[:] = chemical_V
+        for strip in range(num_processes):
+            for buffer in range(2):
+                shared.create(f"U{buffer}_{strip}", (row_bounds[strip + 1] - row_bounds[strip] + 2, n_steps), np.float64)
+                shared.create(f"V{buffer}_{strip}", (row_bounds[strip + 1] - row_bounds[strip] + 2, n_steps), np.float64)
+        if snapshot_interval is not None:
+            shared.create("snapshots_U", shape, np.float64)
+            shared.create("snapshots_V", shape, np.float64)
+
+        # The workers fork from a forkserver that already imported this module
+        context = worker_context(preload=[__name__])
+        barrier = context.Barrier(num_processes)
+        processes = [context.Process(target=gray_scott_strip_worker,
+                                     args=(shared.specs, strip, row_bounds, barrier, num_steps, time_step_size, x_step_size,
+                                           diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, noise_key,
+                                           snapshot_interval if snapshot_interval is not None else 1))
+                     for strip in range(num_processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        if any(process.exitcode != 0 for process in processes):
+            raise RuntimeError(f"A strip process failed, exit codes {[process.exitcode for process in processes]}")
+
+        chemical_U[:] = shared["state_U"]
+        chemical_V[:] = shared["state_V"]
+
+        if snapshot_interval is not None:
+            if snapshots_U is not None:
+                snapshots_U[:] = shared["snapshots_U"]
+            else:
+                snapshots_U = shared.collect("snapshots_U")
+            if snapshots_V is not None:
+                snapshots_V[:] = shared["snapshots_V"]
+            else:
+                snapshots_V = shared.collect("snapshots_V")
+
+    run_info["num_steps"], run_info["stop_time"] = num_steps, num_steps*time_step_size
+    return snapshots_U, snapshots_V, run_info
+
+
+@njit(parallel=True)
+def gray_scott_batch_steps(states_U, states_V, buffers_U, buffers_V, num_steps, time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply, k, noise_boundry, snapshot_interval, snapshots_U, snapshots_V, noise_keys, snapshot_members, first_step):
+    """
+    Advances a stack of U and V states [members x n_steps x n_steps] by num_steps time steps, every member with its own
+    U_supply, k, noise_boundry and noise key. The rows of all members are divided over the numba threads.
+    The noise of a cell is a counter-based random number of the member's noise key, the time step (counted from first_step),
+    the cell and the chemical, so it does not depend on the number of threads or on which thread updates the cell.
+    Without noise a member gives the same result as gray_scott_steps with its parameters. solve_gray_scott(..., parallel=True)
+    runs its state as a batch of one member.
+    The initial states and every snapshot_interval-th step, counted from first_step, are copied to the snapshots
+    [num_snapshots x all members x n_steps x n_steps] at the members given by snapshot_members.
+    The final states are always left in states_U and states_V.
+    """
+    num_snapshots = snapshots_U.shape[0]
+    num_members = states_U.shape[0]
+    n_steps = states_U.shape[1]
+    if num_snapshots > 0 and first_step == 0:
+        for member in range(num_members):
+            snapshots_U[0, snapshot_members[member]] = states_U[member]
+            snapshots_V[0, snapshot_members[member]] = states_V[member]
+
+    diffusion_rate_u = diffusion_coefficient_u/(x_step_size**2)
+    diffusion_rate_v = diffusion_coefficient_v/(x_step_size**2)
+    keys = np.empty(num_members, dtype=np.uint64)
+    for member in range(num_members):
+        keys[member] = splitmix64(np.uint64(noise_keys[member]))
+
+    old_U, old_V = states_U, states_V
+    new_U, new_V = buffers_U, buffers_V
+    for time in range(num_steps):
+        first_counter = (first_step + time)*n_steps*n_steps*2
+        for task in prange(num_members*n_steps):
+            member = task//n_steps
+            rows = task%n_steps
+            up = rows - 1 if rows > 0 else n_steps - 1
+            down = rows + 1 if rows < n_steps - 1 else 0
+            for columns in range(n_steps):
+                left = columns - 1 if columns > 0 else n_steps - 1
+                right = columns + 1 if columns < n_steps - 1 else 0
+                noise_U = 0.0
+                noise_V = 0.0
+                if noise_boundry[member] != 0:
+                    counter = first_counter + (rows*n_steps + columns)*2
+                    noise_U = counter_uniform(keys[member], counter, noise_boundry[member])
+                    noise_V = counter_uniform(keys[member], counter + 1, noise_boundry[member])
+                update_cell(old_U[member], old_V[member], new_U[member], new_V[member], noise_U, noise_V, rows, up, down, columns, left, right,
+                            time_step_size, diffusion_rate_u, diffusion_rate_v, U_supply[member], k[member])
+
+        old_U, new_U = new_U, old_U
+        old_V, new_V = new_V, old_V
+
+        snapshot = (first_step + time + 1)//snapshot_interval
+        if (first_step + time + 1)%snapshot_interval == 0 and snapshot < num_snapshots:
+            for member in range(num_members):
+                snapshots_U[snapshot, snapshot_members[member]] = old_U[member]
+                snapshots_V[snapshot, snapshot_members[member]] = old_V[member]
+
+    # After an odd number of steps the final states are in the buffers
+    if num_steps%2 == 1:
+        states_U[:] = old_U
+        states_V[:] = old_V
+
+
+def solve_gray_scott_batch(U_supply, k, noise_boundry, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, snapshot_interval=None, snapshots_U=None, snapshots_V=None, num_threads=None, seed=None, monitor_interval=None, steady_tolerance=1e-6, decay_tolerance=1e-6, metrics_recorders=None):
+    """
+    Simulates a batch of Gray-Scott models with different parameters at once, e.g. the points of an (f, k) phase diagram
+    or a set of noise levels. All members start from init_state and run in one compiled loop on the multi-core solver,
+    with the memory of two states per member. With a monitor_interval, members stop as soon as their pattern
+    is steady or has decayed, like in solve_gray_scott, and the batch continues with the remaining members.
+
+    Parameters
+    ----------
+    U_supply : np.ndarray
+        The rate at which U is supplied, for every member.
+    k : np.ndarray
+        The k parameter of every member, broadcast to the members of U_supply.
+    noise_boundry : np.ndarray
+        The boundry of the uniform noise of every member, broadcast to the members of U_supply.
+    total_time : int
+        Total time of the simulation.
+    time_step_size : int
+        The size of time step size.
+    x_length : int
+        The max value of X.
+    n_steps : int
+        The size of the grid.
+    diffusion_coefficient_u: float
+        Diffusion coefficient for chemical U.
+    diffusion_coefficient_v: float
+        Diffusion coefficient for chemical V.
+    snapshot_interval : int
+        Optional number of time steps between snapshots. If None, only the final states are kept.
+    snapshots_U : np.ndarray
+        Optional array or memory map for the snapshots of U [num_snapshots x members x n_steps x n_steps]. If None, it is allocated.
+    snapshots_V : np.ndarray
+        Optional array or memory map for the snapshots of V, like snapshots_U.
+    num_threads : int
+        Optional number of threads, at most numba.config.NUMBA_NUM_THREADS. If None, all of them.
+    seed : int or np.ndarray
+        Optional seed of the noise, or the seed of every member. Member i has the noise of solve_gray_scott(..., parallel=True)
+        with its own seed, by default the i-th seed of spawn_seeds(seed, members).
+    monitor_interval : int
+        Optional number of time steps between convergence checks. If None, all time steps are run.
+    steady_tolerance : float
+        The largest rate of change of U and V of a steady pattern.
+    decay_tolerance : float
+        The largest value of V of a pattern that has decayed to the trivial state U = 1, V = 0.
+    metrics_recorders : list
+        Optional PatternMetricsRecorder of every member, see solve_gray_scott.
+
+    Returns
+    -------
+    states_U : np.ndarray
+        The final states of U [members x n_steps x n_steps].
+    states_V : np.ndarray
+        The final states of V [members x n_steps x n_steps].
+    snapshots_U : np.ndarray
+        The snapshots of U, None without a snapshot_interval.
+    snapshots_V : np.ndarray
+        The snapshots of V, None without a snapshot_interval.
+    run_info : dict
+        Like the run_info of solve_gray_scott, with an array of every value with one entry per member.
+    """
+    U_supply, k, noise_boundry = [np.ascontiguousarray(values, dtype=np.float64) for values in np.broadcast_arrays(U_supply, k, noise_boundry)]
+    if U_supply.ndim != 1:
+        raise ValueError(f"The parameters need to be one value or one value per member, got the shape {U_supply.shape}")
+    num_members = len(U_supply)
+
+    x_step_size = x_length/n_steps
+    time_step_num = int(total_time/time_step_size)
+
+    initial_U, initial_V = init_state(n_steps)
+    states_U = np.repeat(initial_U[None], num_members, axis=0)
+    states_V = np.repeat(initial_V[None], num_members, axis=0)
+
+    if snapshot_interval is not None:
+        shape = (num_snapshots(total_time, time_step_size, snapshot_interval), num_members, n_steps, n_steps)
+        snapshots_U = np.zeros(shape) if snapshots_U is None else snapshots_U
+        snapshots_V = np.zeros(shape) if snapshots_V is None else snapshots_V
+        if snapshots_U.shape != shape or snapshots_V.shape != shape:
+            raise ValueError(f"The snapshots need the shape {shape}, got {snapshots_U.shape} and {snapshots_V.shape}")
+
+    # The first seed of a member's own seed sequence, like the noise key of solve_gray_scott
+    member_seeds = spawn_seeds(seed, num_members) if np.ndim(seed) == 0 else seed
+    if len(member_seeds) != num_members:
+        raise ValueError(f"Need one seed per member, got {len(member_seeds)} seeds for {num_members} members")
+    noise_keys = np.array([spawn_seeds(int(member_seed), 1)[0] for member_seed in member_seeds], dtype=np.int64)
+
+    run_info = {"stop_reason": np.full(num_members, "completed", dtype="<U9"),
+                "num_steps": np.zeros(num_members, dtype=np.int64),
+                "rate_U": np.full(num_members, np.nan),
+                "rate_V": np.full(num_members, np.nan)}
 
     stability_value_u = 4*time_step_size*diffusion_coefficient_u/x_step_size**2
     stability_value_v = 4*time_step_size*diffusion_coefficient_v/x_step_size**2
     if (stability_value_u > 1):
         print(f"{stability_value_u }.Stability issue with chemical U, the solution is not stable. Choose different values for U")
-    elif (stability_value_v > 1): 
+    elif (stability_value_v > 1):
         print(f"{stability_value_v}.Stability issue with chemical V, the solution is not stable. Choose different values for V")
-    else: 
-        for time in range(time_step_num-1): 
-            chemical_U_new = chemical_U[time].copy()
-            chemical_V_new = chemical_V[time].copy()
-            for rows in range(n_steps):
-                for columns in range(n_steps):
-                    #changes in chemical U
-                    difussion_component_U = ((diffusion_coefficient_u/(x_step_size**2))*(
-                    chemical_U[time, (rows + 1)%n_steps, columns] + chemical_U[time, (rows -1)%n_steps, columns]
-                    + chemical_U[time, rows, (columns + 1)%n_steps] + chemical_U[time, rows, (columns -1)%n_steps] 
-                    - 4*chemical_U[time, rows, columns])
-                    )
-
-                    reaction_component_U = (
-                    - chemical_U[time, rows, columns]*chemical_V[time, rows, columns]**2 
-                    + U_supply * (1-chemical_U[time, rows, columns])
-                    )
-                    noise = np.random.uniform(-noise_boundry,noise_boundry,1)
-                    noise_U = noise.item()
-
-                    chemical_U_new[rows, columns] = chemical_U_new[rows, columns] + time_step_size*(difussion_component_U + reaction_component_U + noise_U)
-
-                    #changes in chemical V 
-                    difussion_component_V = ((diffusion_coefficient_v/(x_step_size**2))*(
-                    chemical_V[time, (rows + 1)%n_steps, columns] + chemical_V[time, (rows -1)%n_steps, columns]
-                    + chemical_V[time, rows, (columns + 1)%n_steps] + chemical_V[time, rows, (columns -1)%n_steps] 
-                    - 4*chemical_V[time, rows, columns])
-                    )
-
-                    reaction_component_V = (
-                    chemical_U[time, rows, columns]*chemical_V[time, rows, columns]**2 
-                    - (U_supply + k)* (chemical_V[time, rows, columns])
-                    )
-                    noise = np.random.uniform(-noise_boundry,noise_boundry,1)
-                    noise_V = noise.item()
-
-                    chemical_V_new[rows, columns] = chemical_V_new[rows, columns] + time_step_size*(difussion_component_V + reaction_component_V + noise_V)
-
-            chemical_U[time + 1] = chemical_U_new
-            chemical_V[time + 1] = chemical_V_new
+    if stability_value_u > 1 or stability_value_v > 1:
+        run_info["stop_reason"][:] = "unstable"
+        run_info["stop_time"] = np.zeros(num_members)
+        return states_U, states_V, snapshots_U, snapshots_V, run_info
+
+    # The members that are still running, converged members are removed from the batch
+    active = np.arange(num_members)
+    active_U, active_V = states_U, states_V
+    buffers_U, buffers_V = np.empty_like(states_U), np.empty_like(states_V)
+    no_snapshots = np.zeros((0, num_members, n_steps, n_steps))
+    total_steps = time_step_num - 1
+    intervals = [monitor_interval] if monitor_interval is not None else []
+    if metrics_recorders is not None:
+        if len(metrics_recorders) != num_members:
+            raise ValueError(f"Need one metrics recorder per member, got {len(metrics_recorders)} recorders for {num_members} members")
+        intervals += sorted({recorder.interval for recorder in metrics_recorders})
+        for recorder, chemical_V in zip(metrics_recorders, states_V):
+            recorder.record(0, 0.0, chemical_V, x_length)
+    if monitor_interval is not None:
+        previous_U, previous_V, previous_check = states_U.copy(), states_V.copy(), 0
+    step = 0
+
+    previous_num_threads = numba.get_num_threads()
+    if num_threads is not None:
+        numba.set_num_threads(num_threads)
+    try:
+        while step < total_steps and len(active) > 0:
+            next_step = next_stop_step(step, total_steps, intervals)
+            gray_scott_batch_steps(active_U, active_V, buffers_U, buffers_V, next_step - step,
+                                   time_step_size, x_step_size, diffusion_coefficient_u, diffusion_coefficient_v, U_supply[active], k[active], noise_boundry[active],
+                                   snapshot_interval if snapshot_interval is not None else 1,
+                                   snapshots_U if snapshot_interval is not None else no_snapshots,
+                                   snapshots_V if snapshot_interval is not None else no_snapshots,
+                                   noise_keys[active], active, step)
+            step = next_step
+            run_info["num_steps"][active] = step
+
+            if metrics_recorders is not None:
+                for member, chemical_V in zip(active, active_V):
+                    if step%metrics_recorders[member].interval == 0 or step == total_steps:
+                        metrics_recorders[member].record(step, step*time_step_size, chemical_V, x_length)
+
+            if monitor_interval is not None and (step%monitor_interval == 0 or step == total_steps):
+                stop_reason, run_info["rate_U"][active], run_info["rate_V"][active] = convergence_state(previous_U, previous_V, active_U, active_V, (step - previous_check)*time_step_size,
+                                                                                                      steady_tolerance, decay_tolerance)
+                stopped = stop_reason != ""
+                if np.any(stopped):
+                    run_info["stop_reason"][active[stopped]] = stop_reason[stopped]
+                    states_U[active[stopped]] = active_U[stopped]
+                    states_V[active[stopped]] = active_V[stopped]
+                    if metrics_recorders is not None:
+                        for member in active[stopped]:
+                            metrics_recorders[member].record(step, step*time_step_size, states_V[member], x_length)
+                    active, active_U, active_V = active[~stopped], active_U[~stopped], active_V[~stopped]
+                    buffers_U, buffers_V = buffers_U[:len(active)], buffers_V[:len(active)]
+                previous_U, previous_V, previous_check = active_U.copy(), active_V.copy(), step
+    finally:
+        numba.set_num_threads(previous_num_threads)
+
+    if active_U is not states_U:
+        states_U[active] = active_U
+        states_V[active] = active_V
+
+    run_info["stop_time"] = run_info["num_steps"]*time_step_size
+    return states_U, states_V, snapshots_U, snapshots_V, run_info
+
 
 def plot_animation(c):
     """
@@ -133,7 +1147,7 @@ def plot_animation(c):
     Parameters
     ----------
     c : np.ndarray
-        The final gray scott concentration grid.
+        The final gray scott concentration grid, or a SnapshotReader that reads the frames as they are shown.
     -------
     None
     """
@@ -165,7 +1179,7 @@ def last_frame_gray_scott_save(c, filename):
     Parameters
     ----------
     c : np.ndarray
-        The final Gray-Scott concentration grid.
+        The Gray-Scott concentration grids of every time step, or only the final state.
     filename : str, optional
         The name of the output image file.
     dpi : int, optional
@@ -176,7 +1190,7 @@ def last_frame_gray_scott_save(c, filename):
     np.ndarray
         The last frame of the simulation.
     """
-    last_frame = c[-1]  # Get the last time step
+    last_frame = c[-1] if c.ndim == 3 else c  # Get the last time step, or the final state
 
     fig, ax = plt.subplots(figsize = (12,10))
     image = ax.imshow(last_frame, cmap="hot", extent=[0, 1, 0, 1])
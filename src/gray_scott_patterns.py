@@ -0,0 +1,358 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from enum import IntEnum
+from matplotlib.colors import ListedColormap
+from matplotlib.patches import Patch
+import scipy.fft
+from scipy import ndimage
+
+from src.gray_scott import solve_gray_scott_batch
+from src.utils import spawn_seeds
+
+class EnumPatternClass(IntEnum):
+    UNIFORM = 0
+    SPOTS = 1
+    STRIPES = 2
+    HOLES = 3
+    MIXED = 4
+
+PATTERN_COLORS = ["lightgrey", "tab:red", "tab:blue", "tab:green", "tab:purple"]
+
+# One row of the pattern metrics time series of a run
+PATTERN_METRICS_DTYPE = np.dtype([("step", np.int64),
+                                  ("time", np.float64),
+                                  ("spot_count", np.int32),
+                                  ("dominant_wavelength", np.float64),
+                                  ("mean_V", np.float64),
+                                  ("variance_V", np.float64)])
+
+
+def label_periodic(mask):
+    """
+    Labels the connected regions of a mask on a periodic grid. Regions are connected through their edges,
+    and regions touching opposite sides of the grid are the same region.
+
+    Parameters
+    ----------
+    mask : np.ndarray
+        The boolean mask [rows x columns].
+
+    Returns
+    -------
+    labels : np.ndarray
+        The label of every cell, 1 to num_labels inside the regions and 0 outside.
+    num_labels : int
+        The number of regions.
+    """
+    labels, num_labels = ndimage.label(mask)
+    parents = np.arange(num_labels + 1)
+
+    def find(label):
+        while parents[label] != label:
+            parents[label] = parents[parents[label]]
+            label = parents[label]
+        return label
+
+    # Merge the regions on both sides of the periodic boundaries
+    for first_side, second_side in ((labels[0], labels[-1]), (labels[:, 0], labels[:, -1])):
+        for first, second in zip(first_side, second_side):
+            if first and second:
+                first_root, second_root = find(first), find(second)
+                if first_root != second_root:
+                    parents[max(first_root, second_root)] = min(first_root, second_root)
+
+    roots = np.array([find(label) for label in range(num_labels + 1)])
+    unique_roots, relabeled = np.unique(roots, return_inverse=True)
+    return relabeled[labels], len(unique_roots) - 1
+
+
+def region_circularities(mask):
+    """
+    Returns the area and the circularity 4 pi A / P^2 of every periodic region of a mask, with the perimeter P
+    counted in cell edges. Discs have a circularity of about 0.6, a straight stripe of width w across a grid
+    of size N of about pi w / N.
+
+    Parameters
+    ----------
+    mask : np.ndarray
+        The boolean mask [rows x columns].
+
+    Returns
+    -------
+    areas : np.ndarray
+        The number of cells of every region.
+    circularities : np.ndarray
+        The circularity of every region.
+    """
+    labels, num_labels = label_periodic(mask)
+    areas = np.bincount(labels.ravel(), minlength=num_labels + 1)[1:]
+
+    perimeters = np.zeros(num_labels + 1, dtype=np.int64)
+    for shift, axis in ((1, 0), (-1, 0), (1, 1), (-1, 1)):
+        boundary = mask & ~np.roll(mask, shift, axis=axis)
+        perimeters += np.bincount(labels[boundary], minlength=num_labels + 1)
+
+    return areas, 4*np.pi*areas/np.maximum(perimeters[1:], 1)**2
+
+
+def pattern_mask(chemical_V, uniform_tolerance=0.05):
+    """
+    Returns the regions of a Gray-Scott state that form its pattern. The state is split at the middle of its range of V.
+    If less than half of the grid is high in V the high regions are the pattern, otherwise the low regions are, which then form holes.
+
+    Parameters
+    ----------
+    chemical_V : np.ndarray
+        The state of chemical V [n_steps x n_steps].
+    uniform_tolerance : float
+        States with a smaller range of V are uniform and have no pattern.
+
+    Returns
+    -------
+    mask : np.ndarray
+        The boolean mask of the pattern regions, None for uniform states.
+    holes : bool
+        Whether the pattern regions are low in V.
+    """
+    low, high = np.min(chemical_V), np.max(chemical_V)
+    if high - low < uniform_tolerance:
+        return None, False
+
+    mask = chemical_V > (low + high)/2
+    holes = np.mean(mask) > 0.5
+    return (~mask if holes else mask), holes
+
+
+def classify_pattern(chemical_V, uniform_tolerance=0.05, round_threshold=0.3):
+    """
+    Classifies a Gray-Scott state into the pattern classes of Pearson's phase diagram, from the regions of pattern_mask.
+    Patterns of mostly round regions are spots or holes, patterns of mostly elongated regions,
+    including labyrinths that span the grid, are stripes.
+
+    Parameters
+    ----------
+    chemical_V : np.ndarray
+        The state of chemical V [n_steps x n_steps].
+    uniform_tolerance : float
+        States with a smaller range of V are uniform, e.g. after the pattern decayed. Patterns range over about 0.25 or more.
+    round_threshold : float
+        The smallest circularity of a round region, about that of a stripe 8 times longer than it is wide.
+
+    Returns
+    -------
+    pattern_class : EnumPatternClass
+        The class of the pattern.
+    """
+    mask, holes = pattern_mask(chemical_V, uniform_tolerance)
+    if mask is None:
+        return EnumPatternClass.UNIFORM
+
+    areas, circularities = region_circularities(mask)
+
+    # The fraction of the pattern in round regions
+    round_fraction = np.sum(areas[circularities >= round_threshold])/np.sum(areas)
+    if round_fraction >= 0.8:
+        return EnumPatternClass.HOLES if holes else EnumPatternClass.SPOTS
+    if round_fraction <= 0.2:
+        return EnumPatternClass.STRIPES
+    return EnumPatternClass.MIXED
+
+
+def radial_power_spectrum(chemical_V):
+    """
+    Returns the power spectrum of the fluctuations of V, averaged over rings of integer wavenumber.
+    The rings go up to half the grid size, where they are still complete.
+
+    Parameters
+    ----------
+    chemical_V : np.ndarray
+        The state of chemical V [n_steps x n_steps].
+
+    Returns
+    -------
+    wavenumbers : np.ndarray
+        The wavenumber of every ring, the number of waves across the grid.
+    power : np.ndarray
+        The mean power of every ring.
+    """
+    n_steps = chemical_V.shape[0]
+    # The real FFT holds half of the symmetric spectrum, which has the same mean power per ring
+    power = np.abs(scipy.fft.rfft2(chemical_V - np.mean(chemical_V)))**2
+    row_waves = scipy.fft.fftfreq(n_steps, 1/n_steps)
+    column_waves = scipy.fft.rfftfreq(n_steps, 1/n_steps)
+    rings = np.rint(np.hypot(row_waves[:, None], column_waves[None, :])).astype(np.int64).ravel()
+
+    num_rings = n_steps//2 + 1
+    inside = rings < num_rings
+    ring_power = np.bincount(rings[inside], weights=power.ravel()[inside], minlength=num_rings)
+    ring_sizes = np.bincount(rings[inside], minlength=num_rings)
+    return np.arange(num_rings), ring_power/np.maximum(ring_sizes, 1)
+
+
+def pattern_metrics(chemical_V, x_length, uniform_tolerance=0.05):
+    """
+    Computes cheap summary metrics of a Gray-Scott state, to follow a run or compare the runs of a sweep
+    without keeping the states.
+
+    Parameters
+    ----------
+    chemical_V : np.ndarray
+        The state of chemical V [n_steps x n_steps].
+    x_length : float
+        The length of the grid, the unit of the wavelength.
+    uniform_tolerance : float
+        States with a smaller range of V are uniform, without spots and without a wavelength.
+
+    Returns
+    -------
+    spot_count : int
+        The number of periodic connected regions of the pattern, spots or holes, see pattern_mask.
+    dominant_wavelength : float
+        The wavelength at the peak of the radially averaged power spectrum, NaN for uniform states.
+    mean_V : float
+        The mean of V.
+    variance_V : float
+        The variance of V.
+    """
+    mask, _ = pattern_mask(chemical_V, uniform_tolerance)
+    if mask is None:
+        return 0, np.nan, np.mean(chemical_V), np.var(chemical_V)
+
+    _, num_labels = label_periodic(mask)
+    wavenumbers, power = radial_power_spectrum(chemical_V)
+    dominant_wavenumber = wavenumbers[1 + np.argmax(power[1:])]
+    return num_labels, x_length/dominant_wavenumber, np.mean(chemical_V), np.var(chemical_V)
+
+
+class PatternMetricsRecorder:
+    """
+    Time series of the pattern_metrics of a run, recorded by the solvers every interval time steps,
+    including the initial and the final state. The series is a compact structured array of
+    PATTERN_METRICS_DTYPE that grows geometrically, so runs and sweeps can be analysed without their states.
+
+    Parameters
+    ----------
+    interval : int
+        The number of time steps between records.
+    uniform_tolerance : float
+        States with a smaller range of V are uniform, see pattern_metrics.
+    """
+    def __init__(self, interval, uniform_tolerance=0.05):
+        self.interval = interval
+        self.uniform_tolerance = uniform_tolerance
+        self.count = 0
+        self._series = np.zeros(64, dtype=PATTERN_METRICS_DTYPE)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def series(self):
+        return self._series[:self.count]
+
+    def record(self, step, time, chemical_V, x_length):
+        """
+        Records the metrics of the state at a time step, unless that step is already recorded.
+        """
+        if self.count > 0 and self._series[self.count - 1]["step"] == step:
+            return
+        if self.count == len(self._series):
+            self._series = np.concatenate((self._series, np.zeros(self.count, dtype=PATTERN_METRICS_DTYPE)))
+        self._series[self.count] = (step, time) + tuple(pattern_metrics(chemical_V, x_length, self.uniform_tolerance))
+        self.count += 1
+
+    def save(self, file):
+        """
+        Saves the time series as a .npy file of PATTERN_METRICS_DTYPE.
+        """
+        np.save(file, self.series)
+
+
+def phase_map(U_supply_values, k_values, total_time, time_step_size, x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v, noise_boundry=0, batch_size=64, num_threads=None, seed=None, monitor_interval=100):
+    """
+    Simulates every (U_supply, k) point of a grid of parameters and classifies the final patterns, like Pearson's phase diagram.
+    The points run in batches of batch_size members on solve_gray_scott_batch, only the final states are kept.
+    Points stop as soon as their pattern is steady or has decayed, which is most of the diagram long before total_time.
+
+    Parameters
+    ----------
+    U_supply_values : np.ndarray
+        The values of U_supply (f).
+    k_values : np.ndarray
+        The values of k.
+    total_time : int
+        Total time of the simulation.
+    time_step_size : int
+        The size of time step size.
+    x_length : int
+        The max value of X.
+    n_steps : int
+        The size of the grid.
+    diffusion_coefficient_u: float
+        Diffusion coefficient for chemical U.
+    diffusion_coefficient_v: float
+        Diffusion coefficient for chemical V.
+    noise_boundry : float
+        The boundry of the uniform noise of all points.
+    batch_size : int
+        The number of points simulated at once.
+    num_threads : int
+        Optional number of threads. If None, all numba threads.
+    seed : int
+        Optional seed of the noise. Every point gets its own seed, independent of the batch size.
+    monitor_interval : int
+        The number of time steps between convergence checks. If None, every point runs for the total_time.
+
+    Returns
+    -------
+    classes : np.ndarray
+        The EnumPatternClass of every point [len(U_supply_values) x len(k_values)].
+    final_V : np.ndarray
+        The final state of V of every point [len(U_supply_values) x len(k_values) x n_steps x n_steps].
+    """
+    U_supply_grid, k_grid = np.meshgrid(U_supply_values, k_values, indexing="ij")
+    U_supply_points, k_points = U_supply_grid.ravel(), k_grid.ravel()
+    point_seeds = spawn_seeds(seed, len(U_supply_points))
+
+    final_V = np.zeros((len(U_supply_points), n_steps, n_steps))
+    for start in range(0, len(U_supply_points), batch_size):
+        batch = slice(start, start + batch_size)
+        _, final_V[batch], _, _, _ = solve_gray_scott_batch(U_supply_points[batch], k_points[batch], noise_boundry, total_time, time_step_size,
+                                                            x_length, n_steps, diffusion_coefficient_u, diffusion_coefficient_v,
+                                                            num_threads=num_threads, seed=point_seeds[batch], monitor_interval=monitor_interval)
+
+    classes = np.array([classify_pattern(chemical_V) for chemical_V in final_V], dtype=np.int8)
+    return classes.reshape(U_supply_grid.shape), final_V.reshape(U_supply_grid.shape + (n_steps, n_steps))
+
+
+def plot_phase_map(U_supply_values, k_values, classes, filename=None):
+    """
+    Plots the pattern class of every (U_supply, k) point, with k on the horizontal axis like Pearson's phase diagram.
+
+    Parameters
+    ----------
+    U_supply_values : np.ndarray
+        The values of U_supply (f).
+    k_values : np.ndarray
+        The values of k.
+    classes : np.ndarray
+        The EnumPatternClass of every point [len(U_supply_values) x len(k_values)], from phase_map.
+    filename : str, optional
+        The name of the output image file. If None, the plot is shown.
+    """
+    fig, ax = plt.subplots(figsize=(8, 6))
+    k_step = k_values[1] - k_values[0] if len(k_values) > 1 else 1e-3
+    U_supply_step = U_supply_values[1] - U_supply_values[0] if len(U_supply_values) > 1 else 1e-3
+    ax.imshow(classes, cmap=ListedColormap(PATTERN_COLORS), vmin=0, vmax=len(PATTERN_COLORS) - 1, origin="lower", aspect="auto",
+              extent=[k_values[0] - k_step/2, k_values[-1] + k_step/2, U_supply_values[0] - U_supply_step/2, U_supply_values[-1] + U_supply_step/2])
+    ax.set_xlabel("k", fontsize=16)
+    ax.set_ylabel("f", fontsize=16)
+    ax.legend(handles=[Patch(color=PATTERN_COLORS[pattern_class], label=pattern_class.name.lower()) for pattern_class in EnumPatternClass],
+              loc="upper left", bbox_to_anchor=(1, 1))
+    plt.tight_layout()
+
+    if filename is None:
+        plt.show()
+    else:
+        plt.savefig(filename, dpi=300)
+        plt.close(fig)
@@ -0,0 +1,496 @@
+import os
+import json
+import numpy as np
+
+class ChunkedBuffer:
+    """
+    Append-only one dimensional buffer stored as a list of fixed-size chunks.
+    The buffer grows one chunk at a time without copying earlier values.
+    If a directory is given, every full chunk is written to disk and dropped from memory,
+    so at most one chunk is held in memory while appending.
+
+    Parameters
+    ----------
+    dtype : np.dtype
+        The dtype of the stored values, can be a structured dtype.
+    chunk_size : int
+        The number of values per chunk.
+    directory : str
+        Optional directory that full chunks are streamed to.
+    name : str
+        The prefix of the chunk files in the directory.
+    """
+    def __init__(self, dtype, chunk_size=65536, directory=None, name="buffer"):
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self.name = name
+        self.chunks = []
+        self.current = np.empty(chunk_size, dtype=self.dtype)
+        self.current_length = 0
+        self.length = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return self.length
+
+    def _chunk_file(self, chunk_index):
+        return os.path.join(self.directory, "{}_{:06d}.npy".format(self.name, chunk_index))
+
+    def _finish_chunk(self):
+        if self.directory is None:
+            self.chunks.append(self.current)
+        else:
+            chunk_file = self._chunk_file(len(self.chunks))
+            np.save(chunk_file, self.current)
+            self.chunks.append(chunk_file)
+        self.current = np.empty(self.chunk_size, dtype=self.dtype)
+        self.current_length = 0
+
+    def append_value(self, value):
+        """
+        Appends a single value to the buffer.
+        """
+        self.current[self.current_length] = value
+        self.current_length += 1
+        self.length += 1
+        if self.current_length == self.chunk_size:
+            self._finish_chunk()
+
+    def append(self, values):
+        """
+        Appends a single value or an array of values to the buffer.
+        """
+        values = np.atleast_1d(np.asarray(values, dtype=self.dtype))
+        start = 0
+        while start < len(values):
+            count = min(len(values) - start, self.chunk_size - self.current_length)
+            self.current[self.current_length:self.current_length + count] = values[start:start + count]
+            self.current_length += count
+            self.length += count
+            start += count
+            if self.current_length == self.chunk_size:
+                self._finish_chunk()
+
+    def _load_chunk(self, chunk_index):
+        if chunk_index == len(self.chunks):
+            return self.current[:self.current_length]
+        chunk = self.chunks[chunk_index]
+        if isinstance(chunk, str):
+            return np.load(chunk, mmap_mode="r")
+        return chunk
+
+    def read(self, start, stop):
+        """
+        Reads the values in [start, stop) into a new array, loading only the chunks involved.
+        """
+        start = max(0, start)
+        stop = min(stop, self.length)
+        values = np.empty(max(0, stop - start), dtype=self.dtype)
+        position = start
+        while position < stop:
+            chunk_index, offset = divmod(position, self.chunk_size)
+            count = min(stop - position, self.chunk_size - offset)
+            values[position - start:position - start + count] = self._load_chunk(chunk_index)[offset:offset + count]
+            position += count
+        return values
+
+    def to_array(self):
+        """
+        Returns all stored values as a single array.
+        """
+        return self.read(0, self.length)
+
+    def flush(self):
+        """
+        Writes the partially filled chunk to disk, so the directory holds the whole buffer.
+        """
+        if self.directory is not None and self.current_length > 0:
+            np.save(self._chunk_file(len(self.chunks)), self.current[:self.current_length])
+
+    @classmethod
+    def open(cls, directory, name, dtype, chunk_size, length):
+        """
+        Opens a buffer previously streamed to a directory, for reading or for appending further values.
+        """
+        buffer = cls(dtype, chunk_size, directory, name)
+        num_full_chunks, remainder = divmod(length, chunk_size)
+        buffer.chunks = [buffer._chunk_file(i) for i in range(num_full_chunks)]
+        if remainder:
+            # The partial chunk is copied into a full-sized chunk, so appending can continue filling it
+            buffer.current[:remainder] = np.load(buffer._chunk_file(num_full_chunks))[:remainder]
+        buffer.current_length = remainder
+        buffer.length = length
+        return buffer
+
+
+class WalkerRecordLog:
+    """
+    Columnar log with one compact record per walker.
+    Every column is a ChunkedBuffer, so appending never copies earlier records
+    and the log can be streamed to a directory. The log is saved as a single
+    .npz file with one array per column, so aggregate queries only load the
+    columns they need and never touch any grids. A loaded log keeps its file
+    open until it is closed, or used as a context manager.
+
+    Parameters
+    ----------
+    chunk_size : int
+        The number of records per chunk.
+    directory : str
+        Optional directory that full chunks are streamed to.
+    """
+    RECORD_DTYPE = np.dtype([("start_x", np.int32),
+                             ("outcome", np.int8),
+                             ("walk_length", np.int32),
+                             ("stick_row", np.int32),
+                             ("stick_col", np.int32),
+                             ("cluster_size", np.int32)])
+
+    def __init__(self, chunk_size=65536, directory=None):
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self.saved_file = None
+        self.saved_columns = None
+        self.columns = {name: ChunkedBuffer(self.RECORD_DTYPE[name], chunk_size, directory, "record_" + name)
+                        for name in self.RECORD_DTYPE.names}
+
+    def __len__(self):
+        if self.saved_columns is not None:
+            return len(self.column("outcome"))
+        return len(self.columns["outcome"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, start_x, outcome, walk_length, stick_row, stick_col, cluster_size):
+        """
+        Appends the record of a single walker. Walkers that did not stick use -1 for the stick row and column.
+
+        Parameters
+        ----------
+        start_x : int
+            The x position the walker started at in the top row.
+        outcome : int
+            The EnumWalkOutcome that ended the walk.
+        walk_length : int
+            The number of steps the walker took before sticking or failing.
+        stick_row : int
+            The row the walker stuck at.
+        stick_col : int
+            The column the walker stuck at.
+        cluster_size : int
+            The number of cells in the seed growth when the walker was launched.
+        """
+        if self.saved_columns is not None:
+            raise ValueError("Records can not be appended to a saved log.")
+        self.columns["start_x"].append_value(start_x)
+        self.columns["outcome"].append_value(outcome)
+        self.columns["walk_length"].append_value(walk_length)
+        self.columns["stick_row"].append_value(stick_row)
+        self.columns["stick_col"].append_value(stick_col)
+        self.columns["cluster_size"].append_value(cluster_size)
+
+    def column(self, name):
+        """
+        Returns a single column of the log as an array.
+        """
+        if self.saved_columns is not None:
+            if name not in self.saved_columns:
+                self.saved_columns[name] = self.saved_file[name]
+            return self.saved_columns[name]
+        return self.columns[name].to_array()
+
+    def records(self):
+        """
+        Returns the whole log as a structured array with one record per walker.
+        """
+        records = np.empty(len(self), dtype=self.RECORD_DTYPE)
+        for name in self.RECORD_DTYPE.names:
+            records[name] = self.column(name)
+        return records
+
+    def select(self, outcome):
+        """
+        Returns the records of all walkers with the given outcome.
+        """
+        return self.records()[self.column("outcome") == outcome]
+
+    def outcome_counts(self):
+        """
+        Returns the number of walkers for each outcome code.
+        """
+        codes, counts = np.unique(self.column("outcome"), return_counts=True)
+        return dict(zip(codes.tolist(), counts.tolist()))
+
+    def mean_walk_length(self, outcome=None):
+        """
+        Returns the average walk length of all walkers, or of the walkers with the given outcome.
+        """
+        walk_lengths = self.column("walk_length")
+        if outcome is not None:
+            walk_lengths = walk_lengths[self.column("outcome") == outcome]
+        return np.mean(walk_lengths)
+
+    def save(self, file):
+        """
+        Saves the log as a single .npz file with one array per column.
+        """
+        np.savez(file, **{name: self.column(name) for name in self.RECORD_DTYPE.names})
+
+    @classmethod
+    def load(cls, file):
+        """
+        Loads a saved log. The columns are only read from the file when they are queried,
+        so the file stays open until the log is closed.
+        """
+        log = cls.__new__(cls)
+        log.chunk_size = None
+        log.directory = None
+        log.columns = None
+        log.saved_file = np.load(file)
+        log.saved_columns = {}
+        return log
+
+    def close(self):
+        """
+        Closes the file of a loaded log. Columns that were already queried stay available.
+        """
+        if self.saved_file is not None:
+            self.saved_file.close()
+            self.saved_file = None
+
+    def flush(self):
+        """
+        Writes the partially filled chunks to the log directory.
+        """
+        for buffer in self.columns.values():
+            buffer.flush()
+
+    @classmethod
+    def open(cls, directory, chunk_size, length):
+        """
+        Opens a log that was streamed to a directory and flushed.
+        """
+        log = cls.__new__(cls)
+        log.chunk_size = chunk_size
+        log.directory = directory
+        log.saved_file = None
+        log.saved_columns = None
+        log.columns = {name: ChunkedBuffer.open(directory, "record_" + name, cls.RECORD_DTYPE[name], chunk_size, length)
+                       for name in cls.RECORD_DTYPE.names}
+        return log
+
+
+class WalkerHistory:
+    """
+    Stores the full history of a Monte Carlo simulation without dense grids.
+    For each walker only its path as a list of coordinates and a WalkerRecordLog record are stored,
+    and the cluster only changes by the single cell a successful walker sticks to.
+    The dense seed growth and walker grids are rebuilt on demand by the views
+    returned from cluster_states and walker_states.
+
+    Parameters
+    ----------
+    initial_grid : np.ndarray
+        The seed growth grid before the first walker.
+    chunk_size : int
+        The number of values per storage chunk.
+    directory : str
+        Optional directory that the history is streamed to.
+    """
+    def __init__(self, initial_grid, chunk_size=65536, directory=None):
+        self.initial_grid = np.array(initial_grid, dtype=np.int8)
+        self.grid_size = self.initial_grid.shape[0]
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self.cluster_size = int(np.sum(self.initial_grid))
+
+        coordinate_type = np.int16 if self.grid_size < 2**15 else np.int32
+        self.path_dtype = np.dtype([("x", coordinate_type), ("y", coordinate_type)])
+
+        self.records = WalkerRecordLog(chunk_size, directory)
+        self.paths = ChunkedBuffer(self.path_dtype, chunk_size, directory, "paths")
+        self.path_ends = ChunkedBuffer(np.int64, chunk_size, directory, "path_ends")
+        self.sticks = None
+
+        if directory is not None:
+            np.save(os.path.join(directory, "initial_grid.npy"), self.initial_grid)
+
+    def __len__(self):
+        return len(self.records)
+
+    def append(self, path_x, path_y, walk_length, outcome):
+        """
+        Stores a single walker.
+
+        Parameters
+        ----------
+        path_x : np.ndarray
+            The x positions visited by the walker, starting with the initial position.
+        path_y : np.ndarray
+            The y positions visited by the walker, starting with the initial position.
+        walk_length : int
+            The number of steps the walker took before sticking or failing.
+        outcome : int
+            The EnumWalkOutcome that ended the walk.
+        """
+        path = np.empty(len(path_x), dtype=self.path_dtype)
+        path["x"] = path_x
+        path["y"] = path_y
+        self.paths.append(path)
+        self.path_ends.append_value(len(self.paths))
+
+        if outcome == 1: # EnumWalkOutcome.STICK
+            self.records.append(path_x[0], outcome, walk_length, path_y[-1], path_x[-1], self.cluster_size)
+            self.cluster_size += 1
+            self.sticks = None
+        else:
+            self.records.append(path_x[0], outcome, walk_length, -1, -1, self.cluster_size)
+
+    @property
+    def walk_lengths(self):
+        return self.records.column("walk_length")
+
+    @property
+    def outcomes(self):
+        return self.records.column("outcome")
+
+    @property
+    def successful_walkers(self):
+        return np.flatnonzero(self.outcomes == 1) # EnumWalkOutcome.STICK
+
+    def _stick_cells(self):
+        # Cached (walker, row, column) of every stick, recomputed after new sticks
+        if self.sticks is None:
+            walkers = self.successful_walkers
+            self.sticks = (walkers, 
+                           self.records.column("stick_row")[walkers], 
+                           self.records.column("stick_col")[walkers])
+        return self.sticks
+
+    def cluster_state(self, walker):
+        """
+        Rebuilds the seed growth grid after a walker has finished.
+        """
+        stick_walkers, stick_rows, stick_cols = self._stick_cells()
+        num_sticks = np.searchsorted(stick_walkers, walker, side="right")
+        grid = self.initial_grid.copy()
+        grid[stick_rows[:num_sticks], stick_cols[:num_sticks]] = 1 # EnumCellTypes.GROWTH_BLACK
+        return grid
+
+    def walker_state(self, walker):
+        """
+        Rebuilds the final walker grid of a walker, showing its path, start and end.
+        """
+        outcome = self.records.columns["outcome"].read(walker, walker + 1)[0]
+        path_start = self.path_ends.read(walker - 1, walker)[0] if walker > 0 else 0
+        path = self.paths.read(path_start, self.path_ends.read(walker, walker + 1)[0])
+
+        grid = np.zeros((self.grid_size, self.grid_size), dtype=np.int8)
+        grid[path["y"][1:], path["x"][1:]] = 2 # EnumCellTypes.WALK_PATH_GREY
+
+        # EnumCellTypes.NEW_GROWTH_GREEN, WALK_BOUNDARY_RED or WALK_FAIL_ORANGE
+        end_marker = {1: 5, 2: 4, 3: 3}[int(outcome)]
+        grid[path["y"][-1], path["x"][-1]] = end_marker
+        grid[path["y"][0], path["x"][0]] = 6 # EnumCellTypes.WALK_START_BLUE
+        return grid
+
+    def cluster_states(self, successful_only=False):
+        """
+        Returns a lazy sequence of the seed growth grids after each (successful) walker.
+        """
+        walkers = self.successful_walkers if successful_only else np.arange(len(self))
+        return HistoryView(self.cluster_state, walkers, self.grid_size)
+
+    def walker_states(self, successful_only=False):
+        """
+        Returns a lazy sequence of the final walker grids of each (successful) walker.
+        """
+        walkers = self.successful_walkers if successful_only else np.arange(len(self))
+        return HistoryView(self.walker_state, walkers, self.grid_size)
+
+    def flush(self):
+        """
+        Writes everything still held in memory to the history directory.
+        """
+        if self.directory is None:
+            return
+        self.records.flush()
+        self.paths.flush()
+        self.path_ends.flush()
+        with open(os.path.join(self.directory, "manifest.json"), "w") as f:
+            json.dump({"chunk_size": self.chunk_size,
+                       "num_walkers": len(self.records),
+                       "path_length": len(self.paths)}, f)
+
+    @classmethod
+    def open(cls, directory):
+        """
+        Opens a history that was streamed to a directory and flushed.
+        """
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+
+        history = cls.__new__(cls)
+        history.initial_grid = np.load(os.path.join(directory, "initial_grid.npy"))
+        history.grid_size = history.initial_grid.shape[0]
+        history.chunk_size = manifest["chunk_size"]
+        history.directory = directory
+        history.sticks = None
+
+        coordinate_type = np.int16 if history.grid_size < 2**15 else np.int32
+        history.path_dtype = np.dtype([("x", coordinate_type), ("y", coordinate_type)])
+        history.records = WalkerRecordLog.open(directory, history.chunk_size, manifest["num_walkers"])
+        history.paths = ChunkedBuffer.open(directory, "paths", history.path_dtype,
+                                           history.chunk_size, manifest["path_length"])
+        history.path_ends = ChunkedBuffer.open(directory, "path_ends", np.int64,
+                                               history.chunk_size, manifest["num_walkers"])
+        history.cluster_size = int(np.sum(history.initial_grid)) + len(history.successful_walkers)
+        return history
+
+
+class HistoryView:
+    """
+    Read-only sequence of grids that are rebuilt from a WalkerHistory when indexed.
+    Behaves like a [num_frames x grid_size x grid_size] array for indexing, len, shape
+    and np.sum along the first axis, so it can be passed to animate_monte_carlo_sim
+    and the plotting functions without materializing the whole history.
+    """
+    def __init__(self, build_frame, walkers, grid_size):
+        self.build_frame = build_frame
+        self.walkers = walkers
+        self.shape = (len(walkers), grid_size, grid_size)
+
+    def __len__(self):
+        return len(self.walkers)
+
+    def __getitem__(self, frame):
+        if isinstance(frame, slice):
+            return np.array([self.build_frame(walker) for walker in self.walkers[frame]])
+        return self.build_frame(self.walkers[frame])
+
+    def __iter__(self):
+        for walker in self.walkers:
+            yield self.build_frame(walker)
+
+    def sum(self, axis=None, dtype=None, out=None, **kwargs):
+        total = np.zeros(self.shape[1:], dtype=np.int64)
+        for frame in self:
+            total += frame
+        if axis is None:
+            return total.sum()
+        if axis != 0:
+            raise ValueError("HistoryView can only be summed over the frame axis.")
+        return total
+
+    def __array__(self, dtype=None, copy=None):
+        frames = np.zeros(self.shape, dtype=np.int8)
+        for i, frame in enumerate(self):
+            frames[i] = frame
+        return frames if dtype is None else frames.astype(dtype)
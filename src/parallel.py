@@ -0,0 +1,246 @@
+import os
+import atexit
+import tempfile
+import multiprocessing
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.utils import spawn_seeds
+
+# Files in /dev/shm live in memory, so mapping them is the same as shared memory.
+# Without /dev/shm (macOS, Windows) the files are ordinary temporary files
+SHARED_DIRECTORY = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+def worker_context(preload=None):
+    """
+    Returns the multiprocessing context of the worker processes. Workers forked from a parent that already started
+    the numba threading layer inherit its threads, and hang on exit with TBB, so the workers are started from
+    a fresh forkserver process instead, or spawned where there is no forkserver.
+    Their jobs and initializers need to be importable functions.
+
+    Parameters
+    ----------
+    preload : list
+        Optional names of modules the forkserver imports once when it starts, so the workers forked from it
+        do not import them again. Ignored for spawned workers, or when the forkserver is already running.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+
+    context = multiprocessing.get_context("forkserver")
+    if preload:
+        context.set_forkserver_preload(list(preload))
+    return context
+
+class SharedArrays:
+    """
+    Named result arrays shared between a parent process and its worker processes.
+    Each array is a memory-mapped file, by default in /dev/shm. Workers attach to the arrays
+    from their picklable specs and write their results in place, so only small
+    completion messages are sent back through the process pool.
+    Works on Linux, macOS and Windows. Only Linux has /dev/shm, elsewhere the files are
+    ordinary temporary files, which the page cache holds in memory unless memory runs short.
+    Windows cannot remove a file that is still mapped, so the release drops the arrays of the
+    collection first. Arrays needed after the release are copied out with collect, and the
+    caller should not keep references to the shared arrays themselves past the release.
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the backing files. If None, /dev/shm or the system temporary directory.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory if directory is not None else SHARED_DIRECTORY
+        self.arrays = {}
+        self.specs = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def create(self, name, shape, dtype):
+        """
+        Allocates a zero-filled shared array.
+
+        Parameters
+        ----------
+        name : str
+            The name of the array.
+        shape : tuple
+            The shape of the array.
+        dtype : np.dtype
+            The dtype of the array.
+
+        Returns
+        -------
+        array : np.memmap
+            The shared array.
+        """
+        file_descriptor, path = tempfile.mkstemp(prefix="shared_{}_".format(name), suffix=".dat", dir=self.directory)
+        os.close(file_descriptor)
+
+        shape = tuple(int(size) for size in np.atleast_1d(shape))
+        # A memory map cannot be empty, so empty arrays get a single spare element
+        size = max(int(np.prod(shape)), 1)
+        array = np.memmap(path, dtype=dtype, mode="w+", shape=(size,))[:int(np.prod(shape))].reshape(shape)
+
+        self.arrays[name] = array
+        self.specs[name] = (path, shape, np.dtype(dtype).str)
+        return array
+
+    def collect(self, name):
+        """
+        Returns an in-memory copy of a shared array, which stays valid after the release.
+        """
+        return np.array(self.arrays[name])
+
+    def release(self):
+        """
+        Drops the arrays of this process and removes the backing files.
+        """
+        self.arrays = {}
+        for path, _, _ in self.specs.values():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                # Windows keeps files that are still mapped, e.g. by arrays held by a traceback
+                atexit.register(remove_file, path)
+        self.specs = {}
+
+def remove_file(path):
+    """
+    Removes a file if it still exists.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def attach_shared_arrays(specs):
+    """
+    Attaches to the arrays of a SharedArrays collection from a worker process.
+
+    Parameters
+    ----------
+    specs : dict
+        The specs of the SharedArrays collection.
+
+    Returns
+    -------
+    arrays : dict
+        The shared arrays by name, writes go straight to the parent's arrays.
+    """
+    arrays = {}
+    for name, (path, shape, dtype) in specs.items():
+        size = max(int(np.prod(shape)), 1)
+        arrays[name] = np.memmap(path, dtype=dtype, mode="r+", shape=(size,))[:int(np.prod(shape))].reshape(shape)
+    return arrays
+
+def run_shared_job(job, parameter, seed, result_specs, parameter_index, replicate):
+    """
+    Runs one job of a parameter sweep in a worker process, and writes its results into the slot
+    of the job in the shared result arrays. Only the slot is sent back through the process pool.
+    """
+    arrays = attach_shared_arrays(result_specs)
+    for name, value in job(parameter, seed).items():
+        arrays[name][parameter_index, replicate] = value
+    return parameter_index, replicate
+
+def run_parameter_sweep(job, 
+                        parameters, 
+                        num_replicates, 
+                        expected_cost=None, 
+                        seed=None, 
+                        max_workers=None, 
+                        initializer=None, 
+                        on_parameter_done=None,
+                        result_arrays=None):
+    """
+    Runs every (parameter, replicate) pair of a sweep as one job in a single process pool.
+    Jobs are submitted longest expected first, and idle workers take the next waiting job,
+    so the cores stay busy until the last job instead of waiting at every parameter.
+    The parameters can be anything picklable, e.g. sticking probabilities, DLA eta values or Gray-Scott (f, k) points.
+
+    Parameters
+    ----------
+    job : callable
+        A picklable function called as job(parameter, seed).
+    parameters : list
+        The parameter values of the sweep.
+    num_replicates : int
+        The number of replicates per parameter.
+    expected_cost : callable
+        Optional function giving the relative run time of a job for a parameter.
+        If None, the jobs run in parameter order.
+    seed : int
+        The root seed. Every job gets its own seed from spawn_seeds, which only depends on the
+        parameter index and the replicate, not on the scheduling.
+    max_workers : int
+        The number of worker processes. If None, one per CPU core.
+    initializer : callable
+        Optional initializer of the worker processes, e.g. to compile numba kernels.
+    on_parameter_done : callable
+        Optional function called as on_parameter_done(parameter, results) in the parent as soon as
+        all replicates of a parameter are finished, e.g. to save them.
+    result_arrays : dict
+        Optional shape and dtype of every result of one job, as name: (shape, dtype). The job then returns
+        a dict of these results, and the workers write them into shared arrays with one slot per job,
+        so large results such as grids are not sent back through the process pool.
+
+    Returns
+    -------
+    results : list or dict
+        For every parameter, the list of job results in replicate order. With result_arrays, a dict of
+        arrays [parameters x replicates x shape] by name, and on_parameter_done gets a dict of arrays
+        [replicates x shape] of the parameter.
+    """
+    seeds = spawn_seeds(seed, len(parameters) * num_replicates)
+    results = [[None] * num_replicates for _ in parameters]
+    remaining = [num_replicates] * len(parameters)
+
+    jobs = [(parameter_index, replicate) for parameter_index in range(len(parameters)) for replicate in range(num_replicates)]
+    if expected_cost is not None:
+        costs = [expected_cost(parameter) for parameter in parameters]
+        # Stable sort, so replicates of equally expensive parameters stay in order
+        jobs.sort(key=lambda parameter_job: -costs[parameter_job[0]])
+
+    with SharedArrays() as shared, ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, mp_context=worker_context()) as executor:
+        if result_arrays is not None:
+            for name, (shape, dtype) in result_arrays.items():
+                shared.create(name, (len(parameters), num_replicates, *np.atleast_1d(shape)), dtype)
+
+        futures = {}
+        for parameter_index, replicate in jobs:
+            job_seed = int(seeds[parameter_index * num_replicates + replicate])
+            if result_arrays is None:
+                future = executor.submit(job, parameters[parameter_index], job_seed)
+            else:
+                future = executor.submit(run_shared_job, job, parameters[parameter_index], job_seed, 
+                                         shared.specs, parameter_index, replicate)
+            futures[future] = (parameter_index, replicate)
+
+        for future in as_completed(futures):
+            parameter_index, replicate = futures[future]
+            result = future.result()
+            if result_arrays is None:
+                results[parameter_index][replicate] = result
+            remaining[parameter_index] -= 1
+
+            if remaining[parameter_index] == 0 and on_parameter_done is not None:
+                if result_arrays is None:
+                    on_parameter_done(parameters[parameter_index], results[parameter_index])
+                else:
+                    on_parameter_done(parameters[parameter_index], 
+                                      {name: np.array(shared[name][parameter_index]) for name in result_arrays})
+
+        if result_arrays is not None:
+            results = {name: shared.collect(name) for name in result_arrays}
+
+    return results
@@ -0,0 +1,131 @@
+import json
+import numpy as np
+
+MAGIC = b"GSNAP\x01"
+HEADER_SIZE = 4096
+
+ENCODINGS = {
+    "float64": np.float64,
+    "float32": np.float32,
+    "float16": np.float16,
+    "uint8": np.uint8,
+}
+
+def _write_header(file, header):
+    encoded = json.dumps(header).encode("ascii")
+    file.seek(0)
+    file.write(MAGIC + encoded.ljust(HEADER_SIZE - len(MAGIC)))
+
+def _read_header(file):
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("{} is not a snapshot file".format(file.name))
+    return json.loads(file.read(HEADER_SIZE - len(MAGIC)).decode("ascii"))
+
+class SnapshotWriter:
+    """
+    Streams the snapshots of a run into a memory-mapped snapshot file, frame by frame, so the history never has to fit in memory.
+    Works in place of the snapshots_U and snapshots_V arrays of solve_gray_scott, which then writes every snapshot
+    as soon as it is reached. The frames can be stored as floats, or quantized to 8 bits over a fixed value range,
+    with the scale and offset stored in the header. Values outside of the range are clipped.
+
+    Parameters
+    ----------
+    file : str
+        The path of the file, an existing file is overwritten.
+    shape : tuple
+        The shape of all snapshots [num_snapshots x n_steps x n_steps], see num_snapshots.
+    encoding : str
+        "float64", "float32", "float16" or "uint8".
+    value_range : tuple
+        The lowest and highest value of the uint8 encoding. U and V of the Gray-Scott model stay between 0 and 1.
+    """
+    def __init__(self, file, shape, encoding="float16", value_range=(0, 1)):
+        if encoding not in ENCODINGS:
+            raise ValueError("Unknown encoding {}, use one of {}".format(encoding, sorted(ENCODINGS)))
+        self.file = file
+        self.shape = tuple(int(size) for size in shape)
+        self.encoding = encoding
+        if encoding == "uint8":
+            self.offset = float(value_range[0])
+            self.scale = (float(value_range[1]) - float(value_range[0]))/255
+        else:
+            self.offset, self.scale = 0.0, 1.0
+
+        with open(file, "wb") as open_file:
+            _write_header(open_file, {"shape": list(self.shape), "encoding": encoding, "scale": self.scale, "offset": self.offset})
+            # The frames are allocated without being written, the file only takes disk space as they are filled
+            open_file.truncate(HEADER_SIZE + int(np.prod(self.shape))*np.dtype(ENCODINGS[encoding]).itemsize)
+        self.frames = np.memmap(file, dtype=ENCODINGS[encoding], mode="r+", offset=HEADER_SIZE, shape=self.shape) if np.prod(self.shape) > 0 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def encode(self, values):
+        """
+        Returns the values in the encoding of the file.
+        """
+        if self.encoding == "uint8":
+            return np.clip(np.rint((np.asarray(values) - self.offset)/self.scale), 0, 255).astype(np.uint8)
+        return np.asarray(values, dtype=ENCODINGS[self.encoding])
+
+    def __setitem__(self, index, values):
+        self.frames[index] = self.encode(values)
+
+    def flush(self):
+        if self.frames is not None:
+            self.frames.flush()
+
+    def close(self):
+        self.flush()
+        self.frames = None
+
+class SnapshotReader:
+    """
+    Reads the snapshots of a snapshot file lazily. Only the requested frames are read from the memory-mapped
+    file and decoded to float64, so long histories can be analysed and animated frame by frame.
+    Works in place of a [num_snapshots x n_steps x n_steps] array with plot_animation and last_frame_gray_scott_save.
+
+    Parameters
+    ----------
+    file : str
+        The path of the file.
+    """
+    dtype = np.dtype(np.float64)
+
+    def __init__(self, file):
+        self.file = file
+        with open(file, "rb") as open_file:
+            self.header = _read_header(open_file)
+        self.shape = tuple(self.header["shape"])
+        self.encoding = self.header["encoding"]
+        self.scale = self.header["scale"]
+        self.offset = self.header["offset"]
+        self.frames = np.memmap(file, dtype=ENCODINGS[self.encoding], mode="r", offset=HEADER_SIZE, shape=self.shape) if np.prod(self.shape) > 0 else np.zeros(self.shape)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def decode(self, values):
+        """
+        Returns stored values as float64.
+        """
+        if self.encoding == "uint8":
+            return self.offset + self.scale*values.astype(np.float64)
+        return values.astype(np.float64)
+
+    def __getitem__(self, index):
+        return self.decode(self.frames[index])
+
+    def __array__(self, dtype=None, copy=None):
+        frames = self.decode(self.frames[:])
+        return frames if dtype is None else frames.astype(dtype)
@@ -4,6 +4,8 @@ import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import numpy as np
 
+from numba import njit
+from concurrent.futures import ThreadPoolExecutor
 from matplotlib.cm import get_cmap
 
 def plot_grid(c, growth=None, file=None, title='', make_cbar=True, fig=None, ax=None ):
@@ -62,24 +64,128 @@ def plot_animation(c, g = None, frame_steps=1):
     
     
     
-def mean_abs_diff(grids):
+"""
+Ensemble statistics
+"""
+ENSEMBLE_BATCH_RUNS = 256
+
+def open_ensemble(grids):
+    """
+    opens an ensemble of grids stored on disk without loading it: .npy files are memory-mapped and
+    .bgrid files are opened with a BinaryGridReader. Arrays, readers and accumulators are returned as they are.
+    """
+    if not isinstance(grids, str):
+        return grids
+    if grids.endswith('.bgrid'):
+        from src.binary_grids import BinaryGridReader
+        return BinaryGridReader(grids)
+    return np.load(grids, mmap_mode='r')
+
+def map_ensemble_batches(function, grids, batch_runs=ENSEMBLE_BATCH_RUNS, num_threads=1):
+    """
+    applies a function to consecutive batches of runs of an ensemble, so at most num_threads batches are in memory at once.
+    numpy releases the GIL in the reductions, so the batches can be processed by several threads.
+
+    params:
+        function:   function of a batch of grids [batch_runs x grid_size x grid_size]
+        grids:      ensemble of grids [num_runs x grid_size x grid_size], e.g. memory-mapped
+        batch_runs: number of runs per batch
+        num_threads: number of threads processing batches
+
+    returns:
+        results: the results of the batches in order of the runs
+    """
+    starts = range(0, len(grids), batch_runs)
+    run_batch = lambda start: function(np.asarray(grids[start:start + batch_runs]))
+    if num_threads <= 1:
+        return [run_batch(start) for start in starts]
+    with ThreadPoolExecutor(num_threads) as executor:
+        return list(executor.map(run_batch, starts))
+
+def occupancy_sum(grids, batch_runs=ENSEMBLE_BATCH_RUNS, num_threads=1):
+    """
+    sums an ensemble of grids over the runs, one batch of runs at a time. Integer and boolean grids
+    are summed in int64, float grids in float64, the same sum as np.sum(grids, axis=0) for binary grids.
+
+    params:
+        grids:      ensemble of grids [num_runs x grid_size x grid_size], a file name, a BinaryGridReader or an EnsembleAccumulator
+        batch_runs: number of runs per batch
+        num_threads: number of threads processing batches
+
+    returns:
+        sum_grid: number of runs in which each cell is occupied [grid_size x grid_size]
+    """
+    grids = open_ensemble(grids)
+    if not isinstance(grids, np.ndarray):
+        return grids.sum(axis=0)
+
+    dtype = np.float64 if np.issubdtype(grids.dtype, np.floating) else np.int64
+    sum_grid = np.zeros(grids.shape[1:], dtype=dtype)
+    for batch_sum in map_ensemble_batches(lambda batch: np.sum(batch, axis=0, dtype=dtype), grids, batch_runs, num_threads):
+        sum_grid += batch_sum
+    return sum_grid
+
+def row_sums(grids, weights=None, batch_runs=ENSEMBLE_BATCH_RUNS, num_threads=1):
+    """
+    sums every row of every run of an ensemble, one batch of runs at a time, without any temporary of the size of the ensemble.
+
+    params:
+        grids:      ensemble of grids [num_runs x grid_size x grid_size], a file name or a BinaryGridReader
+        weights:    optional weight of every column [grid_size], without weights the occupied cells N_y are counted
+        batch_runs: number of runs per batch
+        num_threads: number of threads processing batches
+
+    returns:
+        row_sums: (weighted) sum of every row [num_runs x grid_size]
+    """
+    grids = open_ensemble(grids)
+    if hasattr(grids, 'row_sums'):
+        return grids.row_sums(weights)
+
+    if weights is None:
+        function = lambda batch: np.sum(batch != 0, axis=-1, dtype=np.int64)
+    else:
+        function = lambda batch: batch @ np.asarray(weights, dtype=np.float64)
+    batches = map_ensemble_batches(function, grids, batch_runs, num_threads)
+    return np.concatenate(batches) if batches else np.zeros((0, grids.shape[1]))
+
+def mean_abs_diff(grids, batch_runs=ENSEMBLE_BATCH_RUNS, num_threads=1, occupied_runs_only=False):
     """computes the mean absolute difference from the center line for all rows of a time series of boolean grids 
+    the grids are processed one batch of runs at a time, so ensembles on disk are never loaded as a whole.
+    a row that is empty in a run has no mean distance in that run, so by default the row is NaN. with occupied_runs_only
+    it is averaged over the runs in which it is occupied instead, and only rows that are empty in every run are NaN.
+    the result does not depend on batch_runs or num_threads.
     
     params:
-        grids:      time series of boolean grid [num_steps x grid_size x grid_size]
+        grids:      time series of boolean grid [num_steps x grid_size x grid_size], a file name, a BinaryGridReader or an EnsembleAccumulator
+        batch_runs: number of runs per batch
+        num_threads: number of threads processing batches
+        occupied_runs_only: average every row over the runs in which it is occupied
 
     returns:
         mean_abs_diff: |x - 1/2| at each horizontal cross-section [grid_size]
 
     """
+    grids = open_ensemble(grids)
+    if hasattr(grids, 'mean_abs_diff'):
+        # an EnsembleAccumulator already holds the statistic
+        return grids.mean_abs_diff(occupied_runs_only)
+
     num_runs, _, grid_size = grids.shape
     x_ind = np.array(range(grid_size))
     xdiff = np.abs(x_ind - grid_size//2)
-    diff_grids = xdiff[None, None, :] * grids
-    sum_abs_diff = np.sum(diff_grids, axis=-1)
-    Ny = np.sum(grids, axis=-1)
-    
-    mean_abs_diff = np.mean(sum_abs_diff / Ny, axis=0)
+    sum_abs_diff = row_sums(grids, xdiff, batch_runs, num_threads)
+    Ny = row_sums(grids, None, batch_runs, num_threads)
+
+    ratio = np.full(Ny.shape, np.nan)
+    np.divide(sum_abs_diff, Ny, out=ratio, where=Ny > 0)
+
+    if occupied_runs_only:
+        nonempty_runs = np.sum(Ny > 0, axis=0)
+        mean_abs_diff = np.full(Ny.shape[1], np.nan)
+        np.divide(np.nansum(ratio, axis=0), nonempty_runs, out=mean_abs_diff, where=nonempty_runs > 0)
+    else:
+        mean_abs_diff = np.mean(ratio, axis=0)
     mean_abs_diff /= grid_size
     
     return mean_abs_diff
@@ -112,7 +218,7 @@ def plot_cross_section_and_deviation_multiple(parameter_array,
 
         num_runs, _, grid_size = data.shape
 
-        sum_grid = np.sum(data, axis=0)
+        sum_grid = occupancy_sum(data)
         ys = np.linspace(1,0,grid_size)
         # xs = ys.copy()
         # center = xs[grid_size//2]
@@ -142,7 +248,7 @@ def generate_heatmap(all_seed_growth_grids,
                      xlabel="X", 
                      save_plot=False, 
                      file_path="heatmap.png"):
-    summed_grid = np.sum(all_seed_growth_grids, axis=0)
+    summed_grid = occupancy_sum(all_seed_growth_grids)
     normalized_grid = summed_grid / all_seed_growth_grids.shape[0]
     
     plt.figure(figsize=(10, 8))
@@ -206,7 +312,7 @@ def plot_cross_section(data,
                         file_path="flat_histogram.png"):
     num_runs, _, grid_size = data.shape
 
-    sum_grid = np.sum(data, axis=0)
+    sum_grid = occupancy_sum(data)
     ys = np.linspace(0,1,grid_size)
     xs = ys.copy()
     center = xs[grid_size//2]
@@ -234,7 +340,7 @@ def plot_deviation(data,
                     file_path="flat_histogram.png"):
     num_runs, _, grid_size = data.shape
 
-    sum_grid = np.sum(data, axis=0)
+    sum_grid = occupancy_sum(data)
     ys = np.linspace(0,1,grid_size)
     xs = ys.copy()
     center = xs[grid_size//2]
@@ -262,7 +368,7 @@ def flat_histogram(data,
                   save_plot=False, 
                   file_path="flat_histogram.png"):
     num_runs = data.shape[0]
-    sum_grid = np.sum(data, axis=0).reshape([-1]) / num_runs
+    sum_grid = occupancy_sum(data).reshape([-1]) / num_runs
     hist, bins = np.histogram(sum_grid, np.linspace(0,1,20))
     
     plt.figure(figsize=(8, 4))
@@ -291,7 +397,7 @@ def flat_histogram_multiple(parameter_array,
 
     for parameter, data in zip(parameter_array, array_of_arrays):
         num_runs = data.shape[0]
-        sum_grid = np.sum(data, axis=0).reshape([-1]) / num_runs
+        sum_grid = occupancy_sum(data).reshape([-1]) / num_runs
         hist, bins = np.histogram(sum_grid, np.linspace(0,1,20))
         plt.bar(bins[:-1], hist, width=0.05, alpha=0.5, label=str(parameter))
 
@@ -311,7 +417,7 @@ def flat_histogram_multiple(parameter_array,
 def plot_single_y_slice_density(data, save_plot=False, file_path="y_slice_density.png"):
     num_runs, _, grid_size = data.shape
 
-    sum_grid = np.sum(data, axis=0)
+    sum_grid = occupancy_sum(data)
     ys = np.linspace(0, 1, grid_size)
     xs = ys.copy()
     center = xs[grid_size // 2]
@@ -339,7 +445,7 @@ def plot_y_slice_density_multiple(parameter_array, array_of_arrays, save_plot=Fa
     for parameter, data in zip(parameter_array, array_of_arrays):
         num_runs, _, grid_size = data.shape
 
-        sum_grid = np.sum(data, axis=0)
+        sum_grid = occupancy_sum(data)
         ys = np.linspace(0, 1, grid_size)
         xs = ys.copy()
         center = xs[grid_size // 2]
@@ -360,10 +466,379 @@ def plot_y_slice_density_multiple(parameter_array, array_of_arrays, save_plot=Fa
 
     plt.show()
 
+"""
+Growth over time recording
+"""
+@njit
+def downsample_samples(times, values, count, stride):
+    """
+    Keeps only the samples whose time is a multiple of stride, compacted to the front of the buffers.
+    params:
+        times:      times of the samples, updated in place
+        values:     values of the samples, updated in place
+        count:      number of stored samples
+        stride:     new sampling stride
+    returns:
+        count:      number of samples kept
+    """
+    kept = 0
+    for i in range(count):
+        if times[i] % stride == 0:
+            times[kept] = times[i]
+            values[kept] = values[i]
+            kept += 1
+    return kept
+
+@njit
+def record_growth(times, values, state, time, value):
+    """
+    Records a sample in fixed-size growth buffers, for use inside compiled kernels.
+    Only times that are a multiple of the current stride are kept. When the buffers are full,
+    every other sample is dropped and the stride doubles, so memory stays bounded for any run length.
+    params:
+        times:      times of the samples, updated in place
+        values:     values of the samples, updated in place
+        state:      number of stored samples and current stride [2], updated in place
+        time:       time of the sample, e.g. the number of walkers
+        value:      value of the sample, e.g. the cluster size
+    returns:
+        nothing
+    """
+    if time % state[1] != 0:
+        return
+    if state[0] == len(times):
+        state[1] *= 2
+        state[0] = downsample_samples(times, values, state[0], state[1])
+        if time % state[1] != 0:
+            return
+    times[state[0]] = time
+    values[state[0]] = value
+    state[0] += 1
+
+class GrowthRecorder:
+    """
+    Time series of a growing quantity, e.g. the cluster size after each walker
+    or after each DLA growth step, with bounded memory.
+    The buffers grow geometrically up to capacity. Once full, every other sample is dropped
+    and the sampling stride doubles, so the kept samples are always evenly spaced
+    over the whole run no matter how long it becomes.
+    params:
+        capacity:        maximum number of samples kept
+        sample_interval: initial sampling stride
+    """
+    def __init__(self, capacity=1024, sample_interval=1):
+        self.capacity = capacity
+        self.stride = sample_interval
+        self.count = 0
+        self._times = np.zeros(min(capacity, 64), dtype=np.int64)
+        self._values = np.zeros(min(capacity, 64), dtype=np.float64)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def times(self):
+        return self._times[:self.count]
+
+    @property
+    def values(self):
+        return self._values[:self.count]
+
+    def record(self, time, value):
+        """
+        Records a sample if its time is a multiple of the current stride.
+        """
+        if time % self.stride:
+            return
+        if self.count == len(self._times):
+            if self.count < self.capacity:
+                size = min(2 * self.count, self.capacity)
+                self._times = np.concatenate((self._times, np.zeros(size - self.count, dtype=np.int64)))
+                self._values = np.concatenate((self._values, np.zeros(size - self.count, dtype=np.float64)))
+            else:
+                self.stride *= 2
+                self.count = downsample_samples(self._times, self._values, self.count, self.stride)
+                if time % self.stride:
+                    return
+        self._times[self.count] = time
+        self._values[self.count] = value
+        self.count += 1
+
+    def to_array(self):
+        """
+        Returns the samples as an array of length capacity, NaN after the last sample.
+        Before any downsampling, entry i is the sample at time i * sample_interval.
+        """
+        values = np.full(self.capacity, np.nan)
+        values[:self.count] = self.values
+        return values
+
+    @classmethod
+    def from_buffers(cls, times, values, state):
+        """
+        Creates a recorder from buffers filled by record_growth.
+        """
+        recorder = cls(len(times), int(state[1]))
+        recorder.count = int(state[0])
+        recorder._times = np.array(times, dtype=np.int64)
+        recorder._values = np.array(values, dtype=np.float64)
+        return recorder
+
+"""
+Streaming ensemble statistics
+"""
+class RunningStats:
+    """
+    Running count, mean and variance of a scalar with Welford's algorithm.
+    Batches and other RunningStats are combined with the parallel update of Chan et al.,
+    so the result does not depend on how the values were split up.
+    params:
+        count:      number of values already summarized
+        mean:       mean of these values
+        m2:         sum of the squared differences of these values from their mean
+    """
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = int(count)
+        self.mean = float(mean)
+        self.m2 = float(m2)
+
+    def update(self, values):
+        """
+        Adds one value or an array of values.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        if len(values):
+            batch_mean = np.mean(values)
+            self.merge(RunningStats(len(values), batch_mean, np.sum((values - batch_mean)**2)))
+        return self
+
+    def merge(self, other):
+        """
+        Adds the values summarized by another RunningStats.
+        """
+        count = self.count + other.count
+        if count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta**2 * self.count * other.count / count
+            self.count = count
+        return self
+
+    @property
+    def variance(self):
+        """
+        The sample variance, NaN for less than two values.
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+class EnsembleAccumulator:
+    """
+    Statistics of an ensemble of binary grids, updated one run at a time so the grids never
+    have to be kept. Holds the occupancy sum grid, the sum of N_y (the occupied cells of each row),
+    for each row the sum over runs of the mean |x - x_c| of its occupied cells and the number
+    of runs in which the row is occupied, and RunningStats of named scalars like walk counts.
+    Accumulators of separate processes or machines are combined with merge, and saved with save.
+    Works in place of the ensemble with the plotting functions above, which use its shape and
+    its sum over the runs, and with mean_abs_diff.
+    params:
+        grid_shape: shape of the grids (rows, columns)
+    """
+    def __init__(self, grid_shape):
+        self.grid_shape = tuple(int(size) for size in grid_shape)
+        rows, columns = self.grid_shape
+        self.num_runs = 0
+        self.occupancy_sum = np.zeros((rows, columns), dtype=np.int64)
+        self.row_count_sum = np.zeros(rows, dtype=np.int64)
+        self.abs_diff_ratio_sum = np.zeros(rows, dtype=np.float64)
+        self.nonempty_runs = np.zeros(rows, dtype=np.int64)
+        self.scalars = {}
+
+    @property
+    def shape(self):
+        return (self.num_runs,) + self.grid_shape
+
+    def __len__(self):
+        return self.num_runs
+
+    def add_grids(self, grids):
+        """
+        Adds a batch of grids [num_runs x rows x columns], non-zero cells are occupied.
+        """
+        grids = np.asarray(grids) != 0
+        columns = self.grid_shape[1]
+        xdiff = np.abs(np.arange(columns) - columns//2)
+
+        row_counts = np.sum(grids, axis=-1)
+        sum_abs_diff = grids @ xdiff
+        nonempty = row_counts > 0
+
+        self.num_runs += len(grids)
+        self.occupancy_sum += np.sum(grids, axis=0, dtype=np.int64)
+        self.row_count_sum += np.sum(row_counts, axis=0)
+        self.abs_diff_ratio_sum += np.sum(np.divide(sum_abs_diff, row_counts, out=np.zeros(row_counts.shape), where=nonempty), axis=0)
+        self.nonempty_runs += np.sum(nonempty, axis=0)
+        return self
+
+    def add_scalars(self, **values):
+        """
+        Adds values of named scalars, e.g. add_scalars(walk_counts=[...]).
+        """
+        for name, value in values.items():
+            self.scalars.setdefault(name, RunningStats()).update(value)
+        return self
+
+    def merge(self, other):
+        """
+        Adds the runs summarized by another accumulator with the same grid shape.
+        """
+        if other.grid_shape != self.grid_shape:
+            raise ValueError("Cannot merge grids of shape {} into {}".format(other.grid_shape, self.grid_shape))
+        self.num_runs += other.num_runs
+        self.occupancy_sum += other.occupancy_sum
+        self.row_count_sum += other.row_count_sum
+        self.abs_diff_ratio_sum += other.abs_diff_ratio_sum
+        self.nonempty_runs += other.nonempty_runs
+        for name, stats in other.scalars.items():
+            self.scalars.setdefault(name, RunningStats()).merge(stats)
+        return self
+
+    def sum(self, axis=None, dtype=None, out=None, **kwargs):
+        """
+        The occupancy sum grid for axis=0, the only sum the accumulator can give.
+        """
+        if axis != 0 or out is not None or kwargs:
+            raise ValueError("An EnsembleAccumulator only holds the sum over the runs (axis=0)")
+        return self.occupancy_sum if dtype is None else self.occupancy_sum.astype(dtype)
+
+    def occupancy_mean(self):
+        """
+        The fraction of runs in which each cell is occupied [rows x columns].
+        """
+        return self.occupancy_sum / max(self.num_runs, 1)
+
+    def mean_row_counts(self):
+        """
+        The mean number of occupied cells of each row, <N_y> [rows].
+        """
+        return self.row_count_sum / max(self.num_runs, 1)
+
+    def mean_abs_diff(self, occupied_runs_only=False):
+        """
+        The mean |x - x_c| of each row, divided by the number of columns like utils.mean_abs_diff [rows].
+        NaN for rows that are empty in any run, or with occupied_runs_only averaged over the runs in which
+        the row is occupied and NaN for rows that are empty in every run.
+        """
+        runs = self.nonempty_runs if occupied_runs_only else np.full(self.grid_shape[0], self.num_runs)
+        mean = np.full(self.grid_shape[0], np.nan)
+        np.divide(self.abs_diff_ratio_sum, runs, out=mean, where=(self.nonempty_runs > 0) & (self.nonempty_runs == runs))
+        return mean / self.grid_shape[1]
+
+    def save(self, file):
+        """
+        Saves the accumulator to an .npz file.
+        """
+        names = sorted(self.scalars)
+        np.savez(file,
+                 grid_shape=np.array(self.grid_shape),
+                 num_runs=self.num_runs,
+                 occupancy_sum=self.occupancy_sum,
+                 row_count_sum=self.row_count_sum,
+                 abs_diff_ratio_sum=self.abs_diff_ratio_sum,
+                 nonempty_runs=self.nonempty_runs,
+                 scalar_names=np.array(names, dtype=str),
+                 scalar_stats=np.array([[self.scalars[name].count, self.scalars[name].mean, self.scalars[name].m2] for name in names]).reshape(-1, 3))
+
+    @classmethod
+    def load(cls, file):
+        """
+        Loads an accumulator saved with save.
+        """
+        with np.load(file) as saved:
+            accumulator = cls(saved["grid_shape"])
+            accumulator.num_runs = int(saved["num_runs"])
+            accumulator.occupancy_sum = saved["occupancy_sum"]
+            accumulator.row_count_sum = saved["row_count_sum"]
+            accumulator.abs_diff_ratio_sum = saved["abs_diff_ratio_sum"]
+            accumulator.nonempty_runs = saved["nonempty_runs"]
+            accumulator.scalars = {str(name): RunningStats(*stats) for name, stats in zip(saved["scalar_names"], saved["scalar_stats"])}
+        return accumulator
+
+"""
+Random seeds
+"""
+@njit
+def set_numba_seed(seed):
+    """
+    To set the seed for calls to np.random inside numba jit, the seed also needs to be set inside a jit function
+    """
+    np.random.seed(seed)
+
+def spawn_seeds(seed, num_seeds):
+    """
+    Derives independent seeds for parallel tasks from one root seed, using numpy's SeedSequence.
+    The seeds only depend on the root seed and the task index, not on which worker runs the task.
+    params:
+        seed:       root seed, None draws fresh entropy from the OS
+        num_seeds:  number of task seeds
+    returns:
+        seeds:      array of uint32 seeds, one per task
+    """
+    children = np.random.SeedSequence(seed).spawn(num_seeds)
+    return np.array([child.generate_state(1)[0] for child in children], dtype=np.uint32)
+
 """
 Save/Load npy files
 """
+def append_npy(file_location, data):
+    """
+    Appends data along the first axis of an existing .npy file without reading the existing data.
+    The new rows are written at the end of the file and the shape in the header is then rewritten in place,
+    which fits because numpy pads every .npy header with room for a longer first axis.
+    params:
+        file_location:  path of the existing .npy file
+        data:           array to append, with the same trailing shape as the stored array
+    returns:
+        appended:       True if the data was appended in place, False if the file has to be rewritten instead
+                        (Fortran order, a different trailing shape, a dtype the data cannot be cast to safely,
+                        or a header without room for the new shape)
+    """
+    with open(file_location, "r+b") as file:
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        data_offset = file.tell()
+
+        if (fortran_order or len(shape) == 0 or data.shape[1:] != shape[1:] 
+            or dtype.hasobject or not np.can_cast(data.dtype, dtype, casting="safe")):
+            return False
+
+        new_shape = (shape[0] + data.shape[0],) + shape[1:]
+        header = "{{'descr': {!r}, 'fortran_order': False, 'shape': {!r}, }}".format(np.lib.format.dtype_to_descr(dtype), new_shape)
+        magic_length = 10 if version == (1, 0) else 12
+        header_length = data_offset - magic_length
+        if len(header) + 1 > header_length:
+            return False
+
+        # Write the rows before the header, so an interrupted append leaves the old array intact
+        file.seek(data_offset + int(np.prod(shape)) * dtype.itemsize)
+        file.write(np.ascontiguousarray(data, dtype=dtype).tobytes())
+        file.truncate()
+        file.seek(magic_length)
+        file.write((header.ljust(header_length - 1) + "\n").encode("latin1"))
+
+    return True
+
 def save_data(data, filename):
+    """
+    Saves an array to the data folder. If the file exists, the data is appended along the first axis,
+    in place when possible so the cost only depends on the size of the new data.
+    """
     os.makedirs("data", exist_ok=True)
     
     # Ensure filename is a string
@@ -371,13 +846,21 @@ def save_data(data, filename):
         filename = "_".join(map(str, filename))
     
     file_location = os.path.join("data", filename)
+    data = np.asanyarray(data)
     
     if os.path.exists(file_location):
-        existing_data = np.load(file_location)
+        if append_npy(file_location, data):
+            return
+        # Loaded into memory, a memory map would keep the file open while it is overwritten, which fails on Windows
+        existing_data = np.load(file_location, mmap_mode=None)
         data = np.concatenate((existing_data, data))
     
     np.save(file_location, data)
 
-def load_data(filename):
+def load_data(filename, mmap_mode=None):
+    """
+    Loads an array from the data folder into memory. Pass mmap_mode="r" to memory-map the file read-only instead,
+    so only the parts that are used are read from disk.
+    """
     file_location = os.path.join("data", filename)
-    return np.load(file_location)
+    return np.load(file_location, mmap_mode=mmap_mode)
@@ -0,0 +1,41 @@
+import os
+import unittest
+import tempfile
+import numpy as np
+
+from src.binary_grids import BinaryGridReader, write_binary_grids, append_binary_grids
+from src.utils import mean_abs_diff
+
+class TestBinaryGrids(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.grids = (np.random.default_rng(1).random((50, 12, 13)) < 0.3).astype(np.int8)
+        self.grids[:, :, 6] = 1
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_round_trip_and_statistics(self):
+        # every container gives back the grids, and the statistics match the unpacked arrays
+        for compression in [None, "zlib", "lzma"]:
+            file = os.path.join(self.temporary_directory.name, "grids_{}.bgrid".format(compression))
+            write_binary_grids(file, self.grids, compression=compression, chunk_runs=16)
+            reader = BinaryGridReader(file, chunk_runs=8)
+
+            self.assertEqual(reader.shape, self.grids.shape)
+            np.testing.assert_array_equal(np.asarray(reader), self.grids)
+            np.testing.assert_array_equal(reader.row_sums(), np.sum(self.grids, axis=-1))
+            np.testing.assert_array_equal(np.sum(reader, axis=0), np.sum(self.grids, axis=0))
+            np.testing.assert_allclose(mean_abs_diff(reader), mean_abs_diff(self.grids))
+            np.testing.assert_array_equal(reader.subset([40, 3])[1], self.grids[3])
+
+    def test_append(self):
+        # appending only adds the new grids to an uncompressed file
+        file = os.path.join(self.temporary_directory.name, "grids.bgrid")
+        self.assertEqual(append_binary_grids(file, self.grids[:20]), 0)
+        self.assertEqual(append_binary_grids(file, self.grids[20:]), 20)
+        np.testing.assert_array_equal(BinaryGridReader(file).to_array(), self.grids)
+
+if __name__ == '__main__':
+    unittest.main()
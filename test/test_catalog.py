@@ -0,0 +1,51 @@
+import os
+import unittest
+import tempfile
+import numpy as np
+
+from src.catalog import ResultsCatalog
+
+class TestResultsCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.directory = self.temporary_directory.name
+        self.catalog = ResultsCatalog(os.path.join(self.directory, "catalog"), code_version="test")
+
+    def tearDown(self):
+        self.catalog.close()
+        self.temporary_directory.cleanup()
+
+    def test_query_load_and_deduplicate(self):
+        # seeded runs are only added once, and loading returns the rows of the matching runs in order
+        grids = np.arange(3 * 4 * 4, dtype=np.int8).reshape(3, 4, 4)
+        run_ids = self.catalog.add_runs("monte_carlo", {"grid_size": 4, "sticking_prob": 0.3}, 
+                                        {"final_seed_growth_states": grids, "all_walk_counts": [10, 20, 30]}, seeds=[1, 2, 3])
+        self.assertNotIn(None, run_ids)
+        self.catalog.add_runs("monte_carlo", {"grid_size": 4, "sticking_prob": 0.5}, 
+                              {"final_seed_growth_states": grids[:1], "all_walk_counts": [40]}, seeds=[1])
+        duplicate_ids = self.catalog.add_runs("monte_carlo", {"sticking_prob": 0.3, "grid_size": 4}, 
+                                              {"final_seed_growth_states": grids[1:], "all_walk_counts": [21, 31]}, seeds=[2, 4])
+
+        self.assertIsNone(duplicate_ids[0])
+        self.assertEqual(len(self.catalog.query("monte_carlo", sticking_prob=0.3)), 4)
+        self.assertEqual(self.catalog.parameter_values("monte_carlo", "sticking_prob"), [0.3, 0.5])
+        np.testing.assert_array_equal(self.catalog.load("monte_carlo", "all_walk_counts", sticking_prob=0.3), [10, 20, 30, 31])
+        np.testing.assert_array_equal(self.catalog.load("monte_carlo", "final_seed_growth_states", sticking_prob=0.5), grids[:1])
+
+    def test_import_legacy_files(self):
+        # parameter-encoded files are imported once, with the parameters parsed from their names
+        legacy_directory = os.path.join(self.directory, "data")
+        os.makedirs(legacy_directory)
+        np.save(os.path.join(legacy_directory, "all_walk_counts_0_3_sp.npy"), np.array([5, 6]))
+        np.save(os.path.join(legacy_directory, "final_seed_growth_states_0_3_sp.npy"), np.zeros((2, 7, 7), dtype=np.int8))
+        np.save(os.path.join(legacy_directory, "many_runs_eta_0.5.npy"), np.ones((3, 6, 6)))
+
+        self.assertEqual(self.catalog.import_legacy_files(legacy_directory), 5)
+        self.assertEqual(self.catalog.import_legacy_files(legacy_directory), 0)
+        self.assertEqual(self.catalog.query("monte_carlo")[0]["parameters"], {"grid_size": 7, "sticking_prob": 0.3})
+        np.testing.assert_array_equal(self.catalog.load("monte_carlo", "all_walk_counts", sticking_prob=0.3), [5, 6])
+        self.assertEqual(self.catalog.load("dla", "final_grids", eta=0.5, code_version="legacy").shape, (3, 6, 6))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,12 @@
 
+import os
+import tempfile
 import unittest
 import numpy as np
 
-from src.gray_scott import init_grids, solve_gray_scott, plot_animation, last_frame_gray_scott_save
+from src.utils import set_numba_seed
+
+from src.gray_scott import init_grids, init_state, num_snapshots, solve_gray_scott, solve_gray_scott_adaptive, solve_gray_scott_batch, solve_gray_scott_processes, plot_animation, last_frame_gray_scott_save
 
 class TestGrayScott(unittest.TestCase):
 
@@ -34,6 +38,187 @@ class TestGrayScott(unittest.TestCase):
         self.assertEqual(chemical_U.shape, (total_time, n_steps, n_steps))
         self.assertEqual(chemical_V.shape, (total_time, n_steps, n_steps))
 
+    def test_init_state(self):
+        chemical_U, chemical_V = init_state(100)
+        grid_U, grid_V = init_grids(1, 1, 100)
+
+        self.assertTrue(np.array_equal(chemical_U, grid_U[0]))
+        self.assertTrue(np.array_equal(chemical_V, grid_V[0]))
+
+    def test_snapshots_match_full_grids(self):
+        parameters = (50, 1, 100, 100, 0.16, 0.08, 0.035, 0.06, 0)
+        grid_U, grid_V = init_grids(50, 1, 100)
+        solve_gray_scott(grid_U, grid_V, *parameters)
+
+        chemical_U, chemical_V = init_state(100)
+        snapshots_V = np.zeros((num_snapshots(50, 1, 7), 100, 100))
+        snapshots_U, returned_V, _ = solve_gray_scott(chemical_U, chemical_V, *parameters, snapshot_interval=7, snapshots_V=snapshots_V)
+
+        self.assertIs(returned_V, snapshots_V)
+        self.assertTrue(np.array_equal(snapshots_U, grid_U[::7]))
+        self.assertTrue(np.array_equal(snapshots_V, grid_V[::7]))
+        # The states end in the final time step
+        self.assertTrue(np.array_equal(chemical_U, grid_U[-1]))
+        self.assertTrue(np.array_equal(chemical_V, grid_V[-1]))
+
+    def test_noise_reproducible(self):
+        parameters = (20, 1, 32, 32, 0.16, 0.08, 0.035, 0.06, 0.01)
+        final_states = []
+        for _ in range(2):
+            set_numba_seed(5)
+            chemical_U, chemical_V = init_state(32)
+            solve_gray_scott(chemical_U, chemical_V, *parameters)
+            final_states.append(chemical_V)
+
+        noise_free_U, noise_free_V = init_state(32)
+        solve_gray_scott(noise_free_U, noise_free_V, *parameters[:-1], 0)
+
+        self.assertTrue(np.array_equal(final_states[0], final_states[1]))
+        self.assertFalse(np.array_equal(final_states[0], noise_free_V))
+
+    def test_parallel_solver(self):
+        parameters = (20, 1, 32, 32, 0.16, 0.08, 0.035, 0.06)
+        serial_U, serial_V = init_state(32)
+        solve_gray_scott(serial_U, serial_V, *parameters, 0)
+        parallel_U, parallel_V = init_state(32)
+        solve_gray_scott(parallel_U, parallel_V, *parameters, 0, parallel=True)
+
+        # Without noise the parallel solver does the same arithmetic
+        self.assertTrue(np.array_equal(serial_V, parallel_V))
+
+        noisy_states = []
+        for num_threads in (None, 1):
+            chemical_U, chemical_V = init_state(32)
+            solve_gray_scott(chemical_U, chemical_V, *parameters, 0.01, parallel=True, num_threads=num_threads, seed=3)
+            noisy_states.append(chemical_V)
+
+        self.assertTrue(np.array_equal(noisy_states[0], noisy_states[1]))
+        self.assertFalse(np.array_equal(noisy_states[0], serial_V))
+
+    def test_process_solver(self):
+        parameters = (31, 1, 48, 48, 0.16, 0.08, 0.035, 0.06, 0.01)
+        parallel_U, parallel_V = init_state(48)
+        _, parallel_snapshots_V, _ = solve_gray_scott(parallel_U, parallel_V, *parameters, snapshot_interval=10, parallel=True, seed=4)
+
+        # The strips give the same result as the parallel solver, also with strips of unequal sizes
+        for num_processes in (1, 5):
+            chemical_U, chemical_V = init_state(48)
+            snapshots_V = np.zeros_like(parallel_snapshots_V)
+            _, returned_V, run_info = solve_gray_scott_processes(chemical_U, chemical_V, *parameters, num_processes=num_processes,
+                                                                 snapshot_interval=10, snapshots_V=snapshots_V, seed=4)
+            self.assertIs(returned_V, snapshots_V)
+            self.assertEqual(run_info["num_steps"], 30)
+            self.assertTrue(np.array_equal(chemical_U, parallel_U))
+            self.assertTrue(np.array_equal(chemical_V, parallel_V))
+            self.assertTrue(np.array_equal(snapshots_V, parallel_snapshots_V))
+
+        # An unstable time step leaves the state unchanged, like solve_gray_scott
+        chemical_U, chemical_V = init_state(48)
+        initial_V = chemical_V.copy()
+        _, _, run_info = solve_gray_scott_processes(chemical_U, chemical_V, 31, 2, *parameters[2:], num_processes=2)
+        self.assertEqual(run_info["stop_reason"], "unstable")
+        self.assertTrue(np.array_equal(chemical_V, initial_V))
+
+    def test_spectral_solvers(self):
+        # With a grid spacing of 0.25 the explicit method is unstable for time steps above 0.1
+        parameters = (8, 32, 0.16, 0.08, 0.035, 0.06, 0)
+        explicit_U, explicit_V = init_state(32)
+        snapshots_U, snapshots_V, _ = solve_gray_scott(explicit_U, explicit_V, 10.05, 0.05, *parameters, snapshot_interval=20)
+
+        for method, tolerance in (("imex", 5e-3), ("etdrk2", 5e-4)):
+            chemical_U, chemical_V = init_state(32)
+            spectral_U, spectral_V, _ = solve_gray_scott(chemical_U, chemical_V, 11, 1, *parameters, snapshot_interval=1, method=method)
+
+            self.assertEqual(spectral_V.shape, snapshots_V.shape)
+            self.assertTrue(np.allclose(spectral_V[-1], chemical_V))
+            self.assertLess(np.max(np.abs(chemical_U - explicit_U)), tolerance)
+            self.assertLess(np.max(np.abs(chemical_V - explicit_V)), tolerance)
+
+        with self.assertRaises(ValueError):
+            solve_gray_scott(*init_state(32), 11, 1, *parameters, method="rk4")
+
+    def test_adaptive_solver(self):
+        parameters = (64, 64, 0.16, 0.08, 0.035, 0.06)
+        reference_U, reference_V = init_state(64)
+        solve_gray_scott(reference_U, reference_V, 200.015, 0.01, *parameters, 0)
+
+        chemical_U, chemical_V = init_state(64)
+        initial_V = chemical_V.copy()
+        snapshots_U, snapshots_V, run_info = solve_gray_scott_adaptive(chemical_U, chemical_V, 200, *parameters, snapshot_times=[0, 50, 200])
+
+        self.assertEqual(run_info["stop_reason"], "completed")
+        self.assertEqual(run_info["stop_time"], 200)
+        # Small steps at the sharp initial square, larger ones up to the stability bound afterwards
+        self.assertLess(run_info["smallest_step"], 0.1)
+        self.assertGreater(run_info["largest_step"], 1)
+        self.assertLessEqual(run_info["largest_step"], 1/(4*0.16))
+        self.assertLess(run_info["num_steps"], 2000)
+
+        self.assertEqual(snapshots_V.shape, (3, 64, 64))
+        self.assertTrue(np.array_equal(snapshots_V[0], initial_V))
+        self.assertTrue(np.array_equal(snapshots_V[-1], chemical_V))
+        self.assertLess(np.max(np.abs(chemical_U - reference_U)), 1e-3)
+        self.assertLess(np.max(np.abs(chemical_V - reference_V)), 1e-3)
+
+        with self.assertRaises(ValueError):
+            solve_gray_scott_adaptive(*init_state(64), 200, *parameters, snapshot_times=[50, 0])
+
+    def test_batch_matches_single_runs(self):
+        U_supply = np.array([0.035, 0.03, 0.018])
+        k = np.array([0.06, 0.055, 0.051])
+        states_U, states_V, _, snapshots_V, _ = solve_gray_scott_batch(U_supply, k, [0, 0.01, 0], 21, 1, 32, 32, 0.16, 0.08,
+                                                                       snapshot_interval=10, seed=[1, 2, 3])
+        self.assertEqual(snapshots_V.shape, (3, 3, 32, 32))
+        self.assertTrue(np.array_equal(snapshots_V[-1], states_V))
+
+        for member, noise_boundry in enumerate([0, 0.01, 0]):
+            chemical_U, chemical_V = init_state(32)
+            solve_gray_scott(chemical_U, chemical_V, 21, 1, 32, 32, 0.16, 0.08, U_supply[member], k[member], noise_boundry,
+                             parallel=True, seed=member + 1)
+            self.assertTrue(np.array_equal(chemical_U, states_U[member]))
+            self.assertTrue(np.array_equal(chemical_V, states_V[member]))
+
+        # An unstable time step leaves every member at the initial state, like solve_gray_scott
+        states_U, states_V, _, _, run_info = solve_gray_scott_batch(U_supply, k, 0, 21, 2, 32, 32, 0.16, 0.08)
+        self.assertEqual(list(run_info["stop_reason"]), ["unstable"]*3)
+        self.assertFalse(np.any(run_info["num_steps"]))
+        self.assertTrue(np.array_equal(states_V[0], init_state(32)[1]))
+
+    def test_early_stop(self):
+        # With f = 0.01 and k = 0.06 the initial square decays to the trivial state, with f = 0.035 it grows into a pattern
+        parameters = (2000, 1, 64, 64, 0.16, 0.08, 0.01, 0.06, 0)
+        chemical_U, chemical_V = init_state(64)
+        snapshots_U, snapshots_V, run_info = solve_gray_scott(chemical_U, chemical_V, *parameters, snapshot_interval=100, monitor_interval=100)
+
+        self.assertEqual(run_info["stop_reason"], "decayed")
+        self.assertLess(run_info["num_steps"], 1999)
+        self.assertEqual(run_info["stop_time"], run_info["num_steps"])
+        self.assertLess(np.max(chemical_V), 1e-6)
+
+        # Up to the stop the monitored run is the same as a full run
+        full_U, full_V = init_state(64)
+        full_snapshots_U, full_snapshots_V, full_info = solve_gray_scott(full_U, full_V, *parameters, snapshot_interval=100)
+        stop_snapshot = run_info["num_steps"]//100 + 1
+        self.assertEqual(full_info["stop_reason"], "completed")
+        self.assertEqual(full_info["num_steps"], 1999)
+        self.assertTrue(np.array_equal(snapshots_V[:stop_snapshot], full_snapshots_V[:stop_snapshot]))
+        self.assertFalse(np.any(snapshots_V[stop_snapshot:]))
+
+        # Grids from init_grids hold the final state in the time steps after the stop
+        grids_U, grids_V = init_grids(2000, 1, 100)
+        _, _, grids_info = solve_gray_scott(grids_U, grids_V, 2000, 1, 100, 100, 0.16, 0.08, 0.01, 0.06, 0, monitor_interval=100)
+        self.assertEqual(grids_info["stop_reason"], "decayed")
+        self.assertTrue(np.all(grids_U[grids_info["num_steps"]:] == grids_U[-1]))
+        self.assertTrue(np.all(grids_U[-1] > 0))
+
+        # Only the decaying member of a batch stops early
+        states_U, states_V, _, _, batch_info = solve_gray_scott_batch([0.01, 0.035], [0.06, 0.06], 0, 2000, 1, 64, 64, 0.16, 0.08, monitor_interval=100)
+        self.assertEqual(list(batch_info["stop_reason"]), ["decayed", "completed"])
+        self.assertEqual(batch_info["num_steps"][0], run_info["num_steps"])
+        self.assertEqual(batch_info["num_steps"][1], 1999)
+        self.assertTrue(np.array_equal(states_V[0], chemical_V))
+        self.assertTrue(np.array_equal(states_V[1], solve_gray_scott_batch(0.035, 0.06, 0, 2000, 1, 64, 64, 0.16, 0.08)[1][0]))
+
     def test_plot_animation(self):
         total_time = 10
         time_step_size = 1
@@ -48,9 +233,11 @@ class TestGrayScott(unittest.TestCase):
         time_step_size = 1
         n_steps = 10
         chemical_U, chemical_V = init_grids(total_time, time_step_size, n_steps)
-        filename = "test_output.png"
-        last_frame = last_frame_gray_scott_save(chemical_U, filename)
-        
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "test_output.png")
+            last_frame = last_frame_gray_scott_save(chemical_U, filename)
+            self.assertTrue(os.path.exists(filename))
+
         self.assertEqual(last_frame.shape, (n_steps, n_steps))
         self.assertTrue(np.all(last_frame == chemical_U[-1]))
 
@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+
+from src.gray_scott import init_state, solve_gray_scott, solve_gray_scott_batch
+from src.gray_scott_patterns import EnumPatternClass, PATTERN_METRICS_DTYPE, PatternMetricsRecorder, label_periodic, classify_pattern, pattern_metrics, phase_map
+
+class TestGrayScottPatterns(unittest.TestCase):
+
+    def test_label_periodic(self):
+        mask = np.zeros((10, 10), dtype=bool)
+        # One region wrapping around the corner, and one in the middle
+        mask[0, 0] = mask[0, 9] = mask[9, 0] = True
+        mask[4:6, 4:6] = True
+
+        labels, num_labels = label_periodic(mask)
+
+        self.assertEqual(num_labels, 2)
+        self.assertEqual(len({labels[0, 0], labels[0, 9], labels[9, 0]}), 1)
+        self.assertNotEqual(labels[0, 0], labels[4, 4])
+        self.assertTrue(np.all(labels[~mask] == 0))
+
+    def test_classify_pattern(self):
+        rows, columns = np.indices((64, 64))
+        spots = 0.3*(((rows%16 - 8)**2 + (columns%16 - 8)**2) < 9)
+        stripes = 0.3*(columns%16 < 5)
+
+        self.assertEqual(classify_pattern(np.full((64, 64), 0.2)), EnumPatternClass.UNIFORM)
+        self.assertEqual(classify_pattern(spots), EnumPatternClass.SPOTS)
+        self.assertEqual(classify_pattern(0.3 - spots), EnumPatternClass.HOLES)
+        self.assertEqual(classify_pattern(stripes), EnumPatternClass.STRIPES)
+        self.assertEqual(classify_pattern(np.where(columns < 32, spots, stripes)), EnumPatternClass.MIXED)
+
+    def test_pattern_metrics(self):
+        rows, columns = np.indices((64, 64))
+        spots = 0.3*(((rows%16 - 8)**2 + (columns%16 - 8)**2) < 9)
+
+        spot_count, dominant_wavelength, mean_V, variance_V = pattern_metrics(spots, 128)
+        self.assertEqual(spot_count, 16)
+        self.assertAlmostEqual(dominant_wavelength, 32)
+        self.assertAlmostEqual(mean_V, np.mean(spots))
+        self.assertAlmostEqual(variance_V, np.var(spots))
+
+        spot_count, dominant_wavelength, _, _ = pattern_metrics(np.full((64, 64), 0.2), 64)
+        self.assertEqual(spot_count, 0)
+        self.assertTrue(np.isnan(dominant_wavelength))
+
+    def test_metrics_recorder(self):
+        parameters = (31, 1, 48, 48, 0.16, 0.08, 0.035, 0.06, 0)
+        recorder = PatternMetricsRecorder(10)
+        chemical_U, chemical_V = init_state(48)
+        solve_gray_scott(chemical_U, chemical_V, *parameters, metrics_recorder=recorder)
+
+        # The records do not change the run
+        plain_U, plain_V = init_state(48)
+        solve_gray_scott(plain_U, plain_V, *parameters)
+        self.assertTrue(np.array_equal(chemical_V, plain_V))
+
+        self.assertEqual(recorder.series.dtype, PATTERN_METRICS_DTYPE)
+        self.assertEqual(list(recorder.series["step"]), [0, 10, 20, 30])
+        self.assertEqual(tuple(recorder.series[-1])[2:], pattern_metrics(chemical_V, 48))
+
+        # A batch member records the same series
+        recorders = [PatternMetricsRecorder(10), PatternMetricsRecorder(10)]
+        solve_gray_scott_batch([0.035, 0.01], [0.06, 0.06], 0, 31, 1, 48, 48, 0.16, 0.08, metrics_recorders=recorders)
+        self.assertTrue(np.array_equal(recorders[0].series, recorder.series))
+
+    def test_phase_map(self):
+        U_supply_values = np.array([0.01, 0.035])
+        k_values = np.array([0.06, 0.07])
+        classes, final_V = phase_map(U_supply_values, k_values, 11, 1, 32, 32, 0.16, 0.08, batch_size=3)
+
+        self.assertEqual(classes.shape, (2, 2))
+        self.assertEqual(final_V.shape, (2, 2, 32, 32))
+        self.assertTrue(np.all(classes == [[classify_pattern(chemical_V) for chemical_V in row] for row in final_V]))
+
+if __name__ == '__main__':
+    unittest.main()
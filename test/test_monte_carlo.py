@@ -1,8 +1,11 @@
+import os
 import unittest
+import tempfile
 import numpy as np
 
 from unittest.mock import patch, call, MagicMock
 from src.monte_carlo import *
+from src.monte_carlo_storage import ChunkedBuffer, WalkerHistory, WalkerRecordLog
 from src.dla_fin_diff import neighbors_grid
 
 class TestMonteCarlo(unittest.TestCase):
@@ -41,6 +44,133 @@ class TestMonteCarlo(unittest.TestCase):
                                 save_animation=False, 
                                 filename="monte_carlo_animation_all.mp4", 
                                 animation_speed=10)
+
+    def test_ensemble_cluster_sizes(self):
+        # every member grows by exactly one cell per successful walker and ends at the top row
+        num_simulations = 5
+        (final_grids, walk_counts, successful_walks, *_) = run_ensemble_simulations(self.grid_size, 
+                                                                                    self.sticking_prob, 
+                                                                                    num_simulations)
+        self.assertEqual(final_grids.shape, (num_simulations, self.grid_size, self.grid_size))
+        for i in range(num_simulations):
+            self.assertEqual(np.sum(final_grids[i]), successful_walks[i] + 1)
+            self.assertTrue(np.any(final_grids[i, 0]))
+            self.assertGreaterEqual(walk_counts[i], successful_walks[i])
+
+    def test_speculative_independent_of_batching(self):
+        # committing speculative walkers in launch order must reproduce the serial walk sequence
+        serial = monte_carlo_sim_speculative(self.grid_size, self.sticking_prob, 
+                                             num_threads=1, walkers_per_batch=1, seed=7)
+        batched = monte_carlo_sim_speculative(self.grid_size, self.sticking_prob, 
+                                              num_threads=4, walkers_per_batch=16, seed=7)
+        np.testing.assert_array_equal(serial[0], batched[0])
+        self.assertEqual(serial[1:5], batched[1:5])
+        # a single walker per batch never sees an earlier commit of its batch
+        self.assertEqual(serial[6], 0)
+        self.assertLessEqual(batched[6], batched[1])
+
+    def test_history_streamed_to_disk(self):
+        # a history streamed in small chunks rebuilds the same grids after reopening
+        with tempfile.TemporaryDirectory() as directory:
+            results, walk_count, successful_walks = monte_carlo_sim(self.grid_size, 
+                                                                    self.sticking_prob, 
+                                                                    chunk_size=16, 
+                                                                    history_directory=directory)
+            reopened = WalkerHistory.open(directory)
+            self.assertEqual(len(reopened), walk_count)
+
+            final_grid = reopened.cluster_states(successful_only=True)[-1]
+            np.testing.assert_array_equal(final_grid, results["seed_growth_grid_states"][walk_count - 1])
+            self.assertEqual(np.sum(final_grid), successful_walks + 1)
+
+            walker_grid = reopened.walker_states()[walk_count - 1]
+            self.assertEqual(np.sum(walker_grid == EnumCellTypes.WALK_START_BLUE), 1)
+            np.testing.assert_array_equal(walker_grid, results["walker_final_states"][walk_count - 1])
+
+    def test_reopened_buffer_appends(self):
+        # a reopened buffer with a partial chunk keeps appending across chunk boundaries
+        with tempfile.TemporaryDirectory() as directory:
+            buffer = ChunkedBuffer(np.int64, chunk_size=4, directory=directory, name="values")
+            buffer.append(np.arange(6))
+            buffer.flush()
+
+            reopened = ChunkedBuffer.open(directory, "values", np.int64, 4, 6)
+            reopened.append(np.arange(6, 9))
+            reopened.append_value(9)
+            self.assertEqual(len(reopened), 10)
+            np.testing.assert_array_equal(reopened.to_array(), np.arange(10))
+
+    def test_walker_record_log(self):
+        # the columnar log agrees with the simulation counts and survives a save/load round trip
+        log = WalkerRecordLog()
+        _, walk_count, successful_walks, avg_walk_length, _, _ = monte_carlo_sim_final_state_only(self.grid_size, 
+                                                                                                  self.sticking_prob, 
+                                                                                                  walker_log=log)
+        self.assertEqual(len(log), walk_count)
+        self.assertEqual(log.outcome_counts().get(EnumWalkOutcome.STICK), successful_walks)
+        self.assertAlmostEqual(log.mean_walk_length(), avg_walk_length)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, "walkers.npz")
+            log.save(file)
+            with WalkerRecordLog.load(file) as loaded:
+                sticks = loaded.select(EnumWalkOutcome.STICK)
+            self.assertIsNone(loaded.saved_file)
+            np.testing.assert_array_equal(sticks["cluster_size"], np.arange(1, successful_walks + 1))
+            self.assertTrue(np.all(sticks["stick_row"] >= 0))
+
+    def test_radial_cluster_is_connected(self):
+        # every attached cell touches an earlier cell, and the grid grows to fit the cluster
+        num_particles = 1500
+        grid, positions, walk_count, _ = monte_carlo_radial_sim(num_particles, self.sticking_prob, initial_grid_size=33)
+        self.assertEqual(np.sum(grid), num_particles)
+        self.assertGreater(grid.shape[0], 33)
+        self.assertGreaterEqual(walk_count, num_particles - 1)
+
+        occupied = {(0, 0)}
+        for dx, dy in positions[1:]:
+            self.assertTrue(any((dx + ox, dy + oy) in occupied for ox, oy in [(0,1),(0,-1),(1,0),(-1,0)]))
+            occupied.add((dx, dy))
+
+        self.assertTrue(1.4 < mass_radius_dimension(positions) < 2.0)
+
+    def test_bit_packed_grid_matches_dense(self):
+        # packing round trips, and the same walker gives the same walk on both grids
+        grid_size = 70
+        grid = (np.random.default_rng(0).random((grid_size, grid_size)) < 0.3).astype(np.int8)
+        packed_grid = pack_grid(grid)
+        self.assertEqual(packed_grid.shape, (grid_size, 2))
+        np.testing.assert_array_equal(unpack_grid(packed_grid, grid_size), grid)
+
+        for y, x in [(0, 0), (5, 63), (5, 64), (69, 69), (30, 1)]:
+            self.assertEqual(is_occupied(packed_grid, y, x), bool(grid[y, x]))
+            # the accessors also work uncompiled, e.g. with NUMBA_DISABLE_JIT
+            self.assertEqual(is_occupied.py_func(packed_grid, y, x), bool(grid[y, x]))
+            self.assertEqual(neighbour_mask.py_func(packed_grid, x, y, grid_size), neighbour_mask.py_func(grid, x, y, grid_size))
+            self.assertEqual(neighbour_mask(packed_grid, x, y, grid_size), neighbour_mask.py_func(grid, x, y, grid_size))
+
+        grid = initialize_grid(grid_size)
+        grid[grid_size // 2:, ::3] = 1
+        for walker_seed in range(20):
+            dense_walk = seeded_walk_with_path(grid, grid_size, 0.5, walker_seed)
+            packed_walk = seeded_walk_with_path(pack_grid(grid), grid_size, 0.5, walker_seed)
+            np.testing.assert_array_equal(dense_walk[0], packed_walk[0])
+            np.testing.assert_array_equal(dense_walk[1], packed_walk[1])
+            self.assertEqual(dense_walk[3], packed_walk[3])
+
+        final_grid = monte_carlo_sim_final_state_only(self.grid_size, self.sticking_prob, bit_packed=True)[0]
+        self.assertEqual(final_grid.dtype, np.int8)
+        self.assertTrue(np.any(final_grid[0]))
+
+    def test_seeded_simulation_is_reproducible(self):
+        # the same seed gives the same cluster and walker count, on dense and packed grids
+        first = monte_carlo_sim_final_state_only(self.grid_size, 0.5, seed=11)
+        second = monte_carlo_sim_final_state_only(self.grid_size, 0.5, seed=11)
+        packed = monte_carlo_sim_final_state_only(self.grid_size, 0.5, seed=11, bit_packed=True)
+        np.testing.assert_array_equal(first[0], second[0])
+        np.testing.assert_array_equal(first[0], packed[0])
+        self.assertEqual(first[1], second[1])
+        self.assertEqual(first[1], packed[1])
             
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
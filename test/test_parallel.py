@@ -0,0 +1,61 @@
+import os
+import unittest
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from src.parallel import SharedArrays, attach_shared_arrays, run_parameter_sweep, worker_context
+
+def fill_row(result_specs, row):
+    results = attach_shared_arrays(result_specs)
+    results["grid"][row] = row
+    return row
+
+def echo_job(parameter, seed):
+    return parameter, seed
+
+def grid_job(parameter, seed):
+    return {"grid": np.full((2, 3), parameter), "seed": seed}
+
+class TestSharedArrays(unittest.TestCase):
+
+    def test_workers_write_in_place(self):
+        # rows written by worker processes show up in the parent's array, and its files are removed on release
+        with SharedArrays() as results:
+            results.create("grid", (4, 3), np.int32)
+            paths = [path for path, _, _ in results.specs.values()]
+            with ProcessPoolExecutor(max_workers=2, mp_context=worker_context()) as executor:
+                rows = list(executor.map(fill_row, [results.specs] * 4, range(4)))
+            grid = results.collect("grid")
+
+        self.assertEqual(rows, [0, 1, 2, 3])
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        np.testing.assert_array_equal(grid, np.repeat(np.arange(4), 3).reshape(4, 3))
+
+    def test_sweep_groups_results_by_parameter(self):
+        # results are grouped per parameter in replicate order, with seeds independent of the job order
+        finished = []
+        results = run_parameter_sweep(echo_job, [0.1, 0.5, 1.0], 4, expected_cost=lambda sticking_prob: 1 / sticking_prob, 
+                                      seed=3, max_workers=2, on_parameter_done=lambda parameter, _: finished.append(parameter))
+        unordered = run_parameter_sweep(echo_job, [0.1, 0.5, 1.0], 4, seed=3, max_workers=1)
+
+        self.assertEqual(sorted(finished), [0.1, 0.5, 1.0])
+        self.assertEqual(results, unordered)
+        for parameter, replicates in zip([0.1, 0.5, 1.0], results):
+            self.assertEqual([result[0] for result in replicates], [parameter] * 4)
+        self.assertEqual(len({seed for replicates in results for _, seed in replicates}), 12)
+
+    def test_sweep_writes_shared_results(self):
+        # jobs with result arrays fill one slot each, with the same seeds as jobs returning their results
+        finished = {}
+        results = run_parameter_sweep(grid_job, [1.0, 2.0], 3, seed=3, max_workers=2, 
+                                      on_parameter_done=lambda parameter, results: finished.update({parameter: results}),
+                                      result_arrays={"grid": ((2, 3), np.float64), "seed": ((), np.uint32)})
+        returned = run_parameter_sweep(echo_job, [1.0, 2.0], 3, seed=3, max_workers=1)
+
+        self.assertEqual(results["grid"].shape, (2, 3, 2, 3))
+        np.testing.assert_array_equal(results["grid"][:, :, 0, 0], [[1.0] * 3, [2.0] * 3])
+        np.testing.assert_array_equal(results["seed"], [[seed for _, seed in replicates] for replicates in returned])
+        np.testing.assert_array_equal(finished[2.0]["grid"], results["grid"][1])
+
+if __name__ == '__main__':
+    unittest.main()
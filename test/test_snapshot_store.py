@@ -0,0 +1,58 @@
+import os
+import unittest
+import tempfile
+import numpy as np
+
+from src.gray_scott import init_state, num_snapshots, solve_gray_scott, last_frame_gray_scott_save
+from src.snapshot_store import SnapshotWriter, SnapshotReader
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.frames = np.random.default_rng(1).random((6, 16, 16))
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_round_trip(self):
+        # Every encoding gives back the frames up to its precision, frame by frame or all at once
+        for encoding, tolerance, itemsize in (("float64", 0, 8), ("float32", 1e-7, 4), ("float16", 5e-4, 2), ("uint8", 0.5/255, 1)):
+            file = os.path.join(self.temporary_directory.name, "{}.gsnap".format(encoding))
+            with SnapshotWriter(file, self.frames.shape, encoding) as writer:
+                for index, frame in enumerate(self.frames):
+                    writer[index] = frame
+            reader = SnapshotReader(file)
+
+            self.assertEqual(reader.shape, self.frames.shape)
+            self.assertEqual(os.path.getsize(file) - 4096, self.frames.size*itemsize)
+            self.assertLessEqual(np.max(np.abs(reader[3] - self.frames[3])), tolerance + 1e-12)
+            self.assertLessEqual(np.max(np.abs(np.asarray(reader) - self.frames)), tolerance + 1e-12)
+
+    def test_quantized_range(self):
+        file = os.path.join(self.temporary_directory.name, "range.gsnap")
+        with SnapshotWriter(file, (1, 2, 2), "uint8", value_range=(-1, 1)) as writer:
+            writer[0] = [[-2, -1], [0.5, 3]]
+        np.testing.assert_allclose(SnapshotReader(file)[0], [[-1, -1], [0.5, 1]], atol=1/255)
+
+    def test_streamed_solver(self):
+        parameters = (50, 1, 32, 32, 0.16, 0.08, 0.035, 0.06, 0)
+        shape = (num_snapshots(50, 1, 7), 32, 32)
+        chemical_U, chemical_V = init_state(32)
+        snapshots_U, snapshots_V, _ = solve_gray_scott(chemical_U, chemical_V, *parameters, snapshot_interval=7)
+
+        # Snapshots streamed between the kernel calls are the same as those written by the kernels
+        files = [os.path.join(self.temporary_directory.name, "{}.gsnap".format(chemical)) for chemical in ("U", "V")]
+        streamed_U, streamed_V = init_state(32)
+        with SnapshotWriter(files[0], shape, "float64") as writer_U, SnapshotWriter(files[1], shape, "uint8") as writer_V:
+            solve_gray_scott(streamed_U, streamed_V, *parameters, snapshot_interval=7, snapshots_U=writer_U, snapshots_V=writer_V)
+
+        self.assertTrue(np.array_equal(streamed_V, chemical_V))
+        self.assertTrue(np.array_equal(np.asarray(SnapshotReader(files[0])), snapshots_U))
+        self.assertLessEqual(np.max(np.abs(np.asarray(SnapshotReader(files[1])) - snapshots_V)), 0.5/255 + 1e-12)
+
+        last_frame = last_frame_gray_scott_save(SnapshotReader(files[1]), os.path.join(self.temporary_directory.name, "last_frame.png"))
+        self.assertEqual(last_frame.shape, (32, 32))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import unittest
+import tempfile
+import numpy as np
+
+from src.utils import GrowthRecorder, record_growth, spawn_seeds, save_data, load_data, EnsembleAccumulator, RunningStats, mean_abs_diff, occupancy_sum, row_sums
+
+class TestGrowthRecorder(unittest.TestCase):
+
+    def test_downsampling_keeps_memory_bounded(self):
+        # a long run keeps evenly spaced samples that still start at zero and end near the last time
+        recorder = GrowthRecorder(capacity=100, sample_interval=10)
+        for time in range(300001):
+            recorder.record(time, time)
+
+        self.assertLessEqual(len(recorder), 100)
+        self.assertEqual(recorder.times[0], 0)
+        self.assertTrue(np.all(np.diff(recorder.times) == recorder.stride))
+        self.assertGreater(recorder.times[-1], 300000 - recorder.stride)
+        np.testing.assert_array_equal(recorder.times, recorder.values)
+
+    def test_compiled_buffers_match_recorder(self):
+        # record_growth on fixed buffers keeps the same samples as the recorder
+        recorder = GrowthRecorder(capacity=32, sample_interval=3)
+        times = np.zeros(32, dtype=np.int64)
+        values = np.zeros(32, dtype=np.float64)
+        state = np.array([0, 3], dtype=np.int64)
+        for time in range(1000):
+            recorder.record(time, 2 * time)
+            record_growth(times, values, state, time, 2 * time)
+
+        compiled = GrowthRecorder.from_buffers(times, values, state)
+        np.testing.assert_array_equal(compiled.times, recorder.times)
+        np.testing.assert_array_equal(compiled.values, recorder.values)
+
+    def test_dense_array_matches_sample_times(self):
+        # before downsampling, entry i of the dense array is the sample at time i * sample_interval
+        recorder = GrowthRecorder(capacity=50, sample_interval=10)
+        for time in range(205):
+            recorder.record(time, time + 1)
+
+        values = recorder.to_array()
+        self.assertEqual(len(values), 50)
+        np.testing.assert_array_equal(values[:21], np.arange(0, 201, 10) + 1)
+        self.assertTrue(np.all(np.isnan(values[21:])))
+
+class TestSeeds(unittest.TestCase):
+
+    def test_spawned_seeds_are_reproducible_and_distinct(self):
+        seeds = spawn_seeds(42, 100)
+        np.testing.assert_array_equal(seeds, spawn_seeds(42, 100))
+        self.assertEqual(len(np.unique(seeds)), 100)
+        self.assertFalse(np.array_equal(seeds, spawn_seeds(43, 100)))
+
+class TestSaveLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        os.chdir(self.temporary_directory.name)
+
+    def tearDown(self):
+        os.chdir(self.working_directory)
+        self.temporary_directory.cleanup()
+
+    def test_append_in_place(self):
+        # appending grows the stored array along the first axis, and loading can memory-map it
+        grids = np.arange(24, dtype=np.int8).reshape(2, 3, 4)
+        save_data(grids, "grids.npy")
+        file_size = os.path.getsize(os.path.join("data", "grids.npy"))
+        save_data(grids + 1, "grids.npy")
+
+        loaded = load_data("grids.npy", mmap_mode="r")
+        self.assertIsInstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, np.concatenate((grids, grids + 1)))
+        del loaded
+        self.assertNotIsInstance(load_data("grids.npy"), np.memmap)
+        self.assertEqual(os.path.getsize(os.path.join("data", "grids.npy")), file_size + grids.nbytes)
+
+    def test_append_with_new_dtype_rewrites(self):
+        # data that does not fit the stored dtype is concatenated like before
+        save_data(np.arange(3, dtype=np.int8), "values.npy")
+        save_data(np.array([0.5]), "values.npy")
+        np.testing.assert_array_equal(load_data("values.npy"), [0, 1, 2, 0.5])
+
+class TestEnsembleAccumulator(unittest.TestCase):
+
+    def test_merged_accumulators_match_the_ensemble(self):
+        # accumulating in separate parts, merging and saving gives the statistics of the whole ensemble
+        rng = np.random.default_rng(2)
+        grids = (rng.random((30, 8, 9)) < 0.4).astype(np.int8)
+        grids[:, :, 4] = 1
+        walk_counts = rng.integers(100, 1000, 30)
+
+        first = EnsembleAccumulator((8, 9)).add_grids(grids[:10]).add_scalars(walk_counts=walk_counts[:10])
+        second = EnsembleAccumulator((8, 9))
+        for grid, walk_count in zip(grids[10:], walk_counts[10:]):
+            second.add_grids(grid[None]).add_scalars(walk_counts=walk_count)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, "stats.npz")
+            second.save(file)
+            accumulator = first.merge(EnsembleAccumulator.load(file))
+
+        self.assertEqual(accumulator.shape, grids.shape)
+        np.testing.assert_array_equal(np.sum(accumulator, axis=0), np.sum(grids, axis=0))
+        np.testing.assert_allclose(accumulator.mean_row_counts(), np.mean(np.sum(grids, axis=-1), axis=0))
+        np.testing.assert_allclose(mean_abs_diff(accumulator), mean_abs_diff(grids))
+        self.assertAlmostEqual(accumulator.scalars["walk_counts"].mean, np.mean(walk_counts))
+        self.assertAlmostEqual(accumulator.scalars["walk_counts"].variance, np.var(walk_counts, ddof=1))
+
+    def test_running_stats_of_few_values(self):
+        self.assertTrue(np.isnan(RunningStats().update(3.0).variance))
+        self.assertEqual(RunningStats().update([]).count, 0)
+
+class TestChunkedStatistics(unittest.TestCase):
+
+    def test_batches_and_threads_give_identical_results(self):
+        # statistics of a memory-mapped file in batches match the in-memory ones exactly
+        grids = (np.random.default_rng(3).random((40, 10, 11)) < 0.3).astype(np.float64)
+        grids[:, :, 5] = 1
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, "grids.npy")
+            np.save(file, grids)
+            expected = mean_abs_diff(grids, batch_runs=len(grids))
+            for batch_runs, num_threads in [(1, 1), (7, 3), (64, 2)]:
+                np.testing.assert_array_equal(mean_abs_diff(file, batch_runs, num_threads), expected)
+                np.testing.assert_array_equal(occupancy_sum(file, batch_runs, num_threads), np.sum(grids, axis=0))
+                np.testing.assert_array_equal(row_sums(file, None, batch_runs, num_threads), np.sum(grids, axis=-1))
+
+    def test_empty_rows(self):
+        # by default a row empty in any run is NaN, with occupied_runs_only it is averaged over the other runs
+        grids = np.zeros((2, 3, 5), dtype=np.int8)
+        grids[0, 0, 0] = 1
+        grids[:, 1, 2] = 1
+        with np.errstate(all="raise"):
+            result = mean_abs_diff(grids)
+            occupied_result = mean_abs_diff(grids, occupied_runs_only=True)
+            accumulator = EnsembleAccumulator((3, 5)).add_grids(grids)
+        self.assertTrue(np.isnan(result[0]))
+        self.assertEqual(result[1], 0)
+        self.assertTrue(np.isnan(result[2]))
+        np.testing.assert_allclose(occupied_result[:2], [2 / 5, 0])
+        self.assertTrue(np.isnan(occupied_result[2]))
+        np.testing.assert_array_equal(accumulator.mean_abs_diff(), result)
+        np.testing.assert_array_equal(mean_abs_diff(accumulator, occupied_runs_only=True), occupied_result)
+
+    def test_default_matches_in_memory_statistic(self):
+        # the default is the original in-memory computation, including NaN for rows empty in some runs
+        grids = (np.random.default_rng(4).random((20, 12, 9)) < 0.15).astype(np.int8)
+        grids[:, :6, 4] = 1
+        grid_size = grids.shape[2]
+        xdiff = np.abs(np.arange(grid_size) - grid_size//2)
+        with np.errstate(invalid="ignore"):
+            expected = np.mean(np.sum(xdiff[None, None, :] * grids, axis=-1) / np.sum(grids, axis=-1), axis=0) / grid_size
+        self.assertTrue(np.any(np.isnan(expected)) and not np.all(np.isnan(expected)))
+        np.testing.assert_array_equal(mean_abs_diff(grids, batch_runs=7, num_threads=2), expected)
+
+if __name__ == '__main__':
+    unittest.main()